@@ -0,0 +1,166 @@
+"""
+Memory use of attachment transfers.
+
+Downloads a synthetic attachment (500 MB by default) from the mock Graph
+server with ``download_attachment``, cutting the connection once midway
+so the download has to resume with a Range request, checks the file
+byte for byte, then forwards it with ``forward_email`` through an upload
+session. RSS is sampled throughout; the growth over the idle baseline
+must stay under --budget-mb for both directions. --buffered also reads
+the same attachment into memory in one response, for comparison.
+
+    uv run python -m benchmarks.bench_attachments --size-mb 500 --budget-mb 64
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import pathlib
+import sys
+import tempfile
+import threading
+import time
+
+from m365_assistant.core.config import Settings
+from m365_assistant.core.graph_client import GraphClient
+from m365_assistant.services.mail_service import MailService
+
+from .bench_concurrency import StaticAuth
+from .mock_graph import MockGraph, attachment_bytes
+
+MB = 1024 * 1024
+
+
+def rss() -> int:
+    # Current resident set size; ru_maxrss only ever grows
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class PeakRss:
+    """
+    Samples RSS on a thread while the block runs; ``growth`` is the peak
+    above the RSS at entry.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.baseline = self.peak = 0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss())
+
+    def __enter__(self):
+        self.baseline = self.peak = rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss())
+
+    @property
+    def growth(self) -> int:
+        return self.peak - self.baseline
+
+
+def file_digest(path: pathlib.Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while block := file.read(MB):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def expected_digest(size: int) -> str:
+    digest = hashlib.sha256()
+    for block in attachment_bytes(0, size):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+def report(label: str, size: int, seconds: float, peak: PeakRss):
+    print(f"{label:<22} {size / MB:>6.0f} MB  {seconds:>6.2f} s  "
+          f"{size / MB / seconds:>7.1f} MB/s  RSS {peak.baseline / MB:>6.1f} → "
+          f"{peak.peak / MB:>6.1f} MB (+{peak.growth / MB:.1f} MB)")
+
+
+async def main(size: int, budget: int, buffered: bool) -> bool:
+    ok = True
+
+    with MockGraph(messages=5, events=0, attachment_size=size) as graph, \
+            tempfile.TemporaryDirectory() as tmp:
+        settings = Settings(
+            client_id="bench",
+            authority="https://login.microsoftonline.com/common",
+            graph_base_url=graph.base_url,
+            attachment_dir=pathlib.Path(tmp),
+        )
+        client = GraphClient(StaticAuth(), settings)
+        mail = MailService(client)
+
+        # Warm up the connection pool, threads and imports
+        graph.attachment_size = MB
+        await mail.download_attachment("msg-0", "att-0", "warmup.bin")
+        graph.attachment_size = size
+
+        graph.drop_value_after = size // 2
+        start = time.perf_counter()
+        with PeakRss() as download:
+            result = await mail.download_attachment("msg-1", "att-0", "large.bin")
+        report("download (1 resume)", result["bytes"], time.perf_counter() - start, download)
+
+        path = pathlib.Path(result["path"])
+        if result["bytes"] != size or file_digest(path) != expected_digest(size):
+            print("FAIL: downloaded file does not match the attachment")
+            ok = False
+
+        start = time.perf_counter()
+        with PeakRss() as upload:
+            await mail.forward_email("msg-1", ["someone@example.com"], attachments=["large.bin"])
+        report("forward (upload)", graph.uploaded_bytes, time.perf_counter() - start, upload)
+
+        if graph.uploaded_bytes != size:
+            print(f"FAIL: uploaded {graph.uploaded_bytes} of {size} bytes")
+            ok = False
+
+        if buffered:
+            start = time.perf_counter()
+            with PeakRss() as whole:
+                response = await client._request("GET", "/me/messages/msg-2/attachments/att-0/$value")
+                received = len(response.content)
+                del response
+            report("buffered GET", received, time.perf_counter() - start, whole)
+
+        await client.aclose()
+
+    for label, peak in (("download", download), ("upload", upload)):
+        if peak.growth > budget:
+            print(f"FAIL: {label} grew RSS by {peak.growth / MB:.1f} MB, "
+                  f"budget {budget / MB:.0f} MB")
+            ok = False
+
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=500)
+    parser.add_argument("--budget-mb", type=int, default=64,
+                        help="RSS growth allowed for a streamed transfer")
+    parser.add_argument("--buffered", action="store_true",
+                        help="also time a fully buffered GET of the attachment")
+    args = parser.parse_args()
+
+    if not asyncio.run(main(args.size_mb * MB, args.budget_mb * MB, args.buffered)):
+        sys.exit(1)
@@ -0,0 +1,81 @@
+"""
+find_free_slots latency on large calendars.
+
+Random (overlapping) meetings over a 30-day window plus a share of
+weekly recurring series that have to be expanded locally.
+
+    uv run python -m benchmarks.bench_availability --sizes 1000 10000 100000
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from m365_assistant.services.availability import WorkingHours, find_free_slots
+
+WINDOW_DAYS = 30
+
+
+def make_calendar(rng: random.Random, count: int, start: datetime):
+    events = []
+
+    for i in range(count):
+        begin = start + timedelta(minutes=15 * rng.randrange(WINDOW_DAYS * 96))
+        end = begin + timedelta(minutes=rng.choice((15, 30, 30, 60, 90)))
+        event = {
+            "start": {"dateTime": begin.strftime("%Y-%m-%dT%H:%M:%S.0000000"), "timeZone": "UTC"},
+            "end": {"dateTime": end.strftime("%Y-%m-%dT%H:%M:%S.0000000"), "timeZone": "UTC"},
+            "showAs": rng.choice(("busy", "busy", "tentative", "free")),
+        }
+
+        # 1 in 20 is a weekly series that started a year ago
+        if i % 20 == 0:
+            first = begin - timedelta(weeks=52)
+            event.update({
+                "type": "seriesMaster",
+                "start": dict(event["start"], dateTime=first.strftime("%Y-%m-%dT%H:%M:%S")),
+                "end": dict(event["end"], dateTime=(first + (end - begin)).strftime("%Y-%m-%dT%H:%M:%S")),
+                "recurrence": {
+                    "pattern": {"type": "weekly", "interval": 1,
+                                "daysOfWeek": [first.strftime("%A").lower()]},
+                    "range": {"type": "noEnd", "startDate": first.strftime("%Y-%m-%d")},
+                },
+            })
+
+        events.append(event)
+
+    return events
+
+
+def main(sizes, runs: int):
+    rng = random.Random(7)
+    start = datetime(2026, 1, 5, tzinfo=timezone.utc)
+    window = (start, start + timedelta(days=WINDOW_DAYS))
+    hours = WorkingHours()
+
+    print(f"{'events':>8} {'p50 ms':>8} {'p95 ms':>8} {'slots':>6}")
+    for size in sizes:
+        events = make_calendar(rng, size, start)
+        timings = []
+
+        for _ in range(runs):
+            begin = time.perf_counter()
+            slots = find_free_slots(events, window, timedelta(minutes=30), hours,
+                                    min_gap=timedelta(minutes=5))
+            timings.append(time.perf_counter() - begin)
+
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"{size:>8} {statistics.median(timings) * 1000:>8.1f} "
+              f"{p95 * 1000:>8.1f} {len(slots):>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    main(args.sizes, args.runs)
@@ -0,0 +1,77 @@
+"""
+Throughput of concurrent list_emails-style calls against the mock Graph server.
+
+One caller is the old behaviour of a sync tool blocking the FastMCP event
+loop: calls run strictly one after another. 8 and 64 callers show how far the
+async GraphClient lets independent tool calls overlap.
+
+    uv run python -m benchmarks.bench_concurrency --latency 0.05
+"""
+
+import argparse
+import asyncio
+import time
+
+from m365_assistant.core.config import Settings
+from m365_assistant.core.graph_client import GraphClient
+from m365_assistant.services.mail_service import MailService
+
+from .mock_graph import MockGraph
+
+
+class StaticAuth:
+    """Auth stand-in that always returns the same token."""
+
+    def acquire_token(self):
+        return {"status": "success", "access_token": "bench-token"}
+
+    def cached_token(self):
+        return "bench-token"
+
+    async def wait_for_sign_in(self, timeout=None):
+        return {"status": "no_sign_in_pending", "message": "Already signed in."}
+
+    def cancel_device_flow(self):
+        pass
+
+
+async def _run(service: MailService, callers: int, calls: int):
+    semaphore = asyncio.Semaphore(callers)
+
+    async def one():
+        async with semaphore:
+            await service.list_last_n_days(days=5, limit=20)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return time.perf_counter() - start
+
+
+async def main(latency: float, calls: int, http2: bool):
+    with MockGraph(latency=latency) as graph:
+        settings = Settings(
+            client_id="bench",
+            authority="https://login.microsoftonline.com/common",
+            graph_base_url=graph.base_url,
+            http2=http2,
+        )
+        client = GraphClient(StaticAuth(), settings)
+        service = MailService(client)
+
+        print(f"{'callers':>8} {'calls':>6} {'seconds':>8} {'req/s':>8}")
+
+        for callers in (1, 8, 64):
+            elapsed = await _run(service, callers, calls)
+            print(f"{callers:>8} {calls:>6} {elapsed:>8.2f} {calls / elapsed:>8.1f}")
+
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--calls", type=int, default=256)
+    parser.add_argument("--http2", action="store_true")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.latency, args.calls, args.http2))
@@ -0,0 +1,86 @@
+"""
+Executor prompt size over a long synthetic tool loop, with and without
+HistoryManager compaction.
+
+Each round the "model" calls list_emails and get_email; the loop sends
+the whole message list again every round, as fetch_context does. The
+script also checks that compaction keeps every tool call paired with its
+result, and reports how many email IDs later rounds can still see.
+
+    uv run python -m benchmarks.bench_history --rounds 30 --budget 8000
+"""
+
+import argparse
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from m365_assistant.agent.history import HistoryManager
+from m365_assistant.agent.prompts import EXECUTOR_SYSTEM_PROMPT
+from m365_assistant.core.config import MAIL_SELECT
+from m365_assistant.services.serialization import serialize
+
+from .mock_graph import make_messages
+
+
+def tool_round(round_: int, emails: list):
+    full = emails[round_ * 20:(round_ + 1) * 20]
+    # list_emails returns the $select projection, get_email the full message
+    batch = [{key: email[key] for key in MAIL_SELECT if key in email} for email in full]
+    calls = [
+        {"name": "list_emails", "args": {"limit": 20}, "id": f"call-{round_}-list"},
+        {"name": "get_email", "args": {"email_id": batch[0]["id"]}, "id": f"call-{round_}-get"},
+    ]
+    results = [
+        ToolMessage(tool_call_id=calls[0]["id"], name="list_emails", content=serialize(batch)),
+        ToolMessage(tool_call_id=calls[1]["id"], name="get_email", content=serialize(full[0])),
+    ]
+    return AIMessage(content="", tool_calls=calls), results, [item["id"] for item in batch]
+
+
+def check(messages: list, ids: list) -> int:
+    calls = {
+        call["id"] for message in messages
+        if isinstance(message, AIMessage) for call in message.tool_calls
+    }
+    results = {message.tool_call_id for message in messages if isinstance(message, ToolMessage)}
+    assert calls == results, "tool calls and results out of pair"
+
+    text = "".join(str(message.content) for message in messages)
+    return sum(f'"{item_id}"' in text for item_id in ids)
+
+
+def main(rounds: int, budget: int):
+    emails = make_messages(rounds * 20)
+    counter = HistoryManager(budget=budget)
+
+    for label, history in (("full", None), ("compacted", HistoryManager(budget=budget))):
+        messages = [SystemMessage(content=EXECUTOR_SYSTEM_PROMPT), HumanMessage(content="Plan my day")]
+        ids = []
+        sent = []
+
+        for round_ in range(rounds):
+            if history is not None:
+                messages = history.compact(messages)
+            sent.append(counter.count(messages))
+
+            response, results, batch_ids = tool_round(round_, emails)
+            messages.append(response)
+            messages.extend(results)
+            ids.extend(batch_ids)
+
+        if history is not None:
+            messages = history.compact(messages)
+        visible = check(messages, ids)
+
+        print(f"{label:<10} last prompt {sent[-1]:>7} tokens, "
+              f"all rounds {sum(sent):>9} tokens, "
+              f"email IDs visible {visible}/{len(ids)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=30)
+    parser.add_argument("--budget", type=int, default=8000)
+    args = parser.parse_args()
+
+    main(args.rounds, args.budget)
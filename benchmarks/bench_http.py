@@ -0,0 +1,231 @@
+"""
+Load test of the HTTP transport with 1..N worker processes.
+
+Starts the server (``serve``, as ``m365-assistant --transport http``) on a
+free port against the mock Graph server, with a pre-authenticated account
+in each worker, and drives it with concurrent MCP clients for a fixed
+time. Reports throughput and latency per worker count, then sends SIGTERM
+while calls are in flight to check that shutdown lets them finish.
+
+    uv run python -m benchmarks.bench_http --workers 1 2 4 --clients 32 --seconds 10
+"""
+
+import argparse
+import asyncio
+import os
+import pathlib
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from .mock_graph import MockGraph
+
+APP_FACTORY = "benchmarks.bench_http:create_bench_app"
+
+
+def create_bench_app():
+    """
+    Worker app factory: the real server app, with the account pool
+    replaced by one account that needs no sign-in.
+    """
+
+    from m365_assistant.mcp import server, tools
+    from .harness import _Accounts, _context
+
+    store = os.getenv("BENCH_STORE_PATH")
+    context = _context(tools.get_settings(), pathlib.Path(store) if store else None, 1e9)
+    tools.accounts = _Accounts(context)
+
+    return server.create_app()
+
+
+def start_server(port: int, workers: int, graph_url: str, store_path) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "MICROSOFT_CLIENT_ID": "bench",
+        "M365_GRAPH_BASE_URL": graph_url,
+        "M365_LOG_LEVEL": "warning",
+        "M365_TRACE": "off",
+    })
+    if store_path is not None:
+        env["BENCH_STORE_PATH"] = str(store_path)
+
+    code = (
+        "from m365_assistant.mcp.server import serve; "
+        f"serve(port={port}, workers={workers}, app_factory={APP_FACTORY!r})"
+    )
+    return subprocess.Popen([sys.executable, "-c", code], env=env)
+
+
+async def wait_ready(base: str, workers: int, timeout: float = 60.0):
+    # Every worker must answer /readyz. A new connection per poll, since a
+    # kept-alive one always reaches the same worker.
+    deadline = time.monotonic() + timeout
+    ready = set()
+
+    async with httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=0)) as client:
+        while len(ready) < workers:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{len(ready)}/{workers} workers ready")
+            try:
+                response = await client.get(f"{base}/readyz", timeout=1)
+                if response.status_code == 200:
+                    ready.add(response.json()["pid"])
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.05)
+
+
+async def load(url: str, clients: int, seconds: float, tool: str, args: dict):
+    from fastmcp import Client
+
+    latencies = []
+    errors = 0
+    stop = time.monotonic() + seconds
+
+    async def one_client():
+        nonlocal errors
+        async with Client(url) as client:
+            while time.monotonic() < stop:
+                start = time.perf_counter()
+                try:
+                    await client.call_tool(tool, args)
+                except Exception:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_client() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "calls": len(latencies),
+        "errors": errors,
+        "ops_per_s": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+    }
+
+
+async def shutdown_under_load(process: subprocess.Popen, graph: MockGraph, url: str,
+                              calls: int, slow: float = 1.0):
+    """
+    SIGTERM while ``calls`` tool calls are waiting on a slow Graph;
+    returns how many failed and how long the server took to exit.
+
+    Uses plain JSON-RPC over HTTP: an MCP client also holds a GET event
+    stream, which the server ends at shutdown, and FastMCP's client then
+    abandons its pending calls even though the server answers them.
+    """
+
+    async with httpx.AsyncClient(timeout=60) as http:
+        sessions = [await _initialize(http, url) for _ in range(calls)]
+
+        graph.latency = slow
+        tasks = [
+            asyncio.create_task(_call_tool(
+                http, url, headers, "get_email", {"email_id": f"msg-{100 + i}"},
+            ))
+            for i, headers in enumerate(sessions)
+        ]
+        await asyncio.sleep(slow / 4)
+
+        start = time.perf_counter()
+        process.send_signal(signal.SIGTERM)
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.to_thread(process.wait, 60)
+
+    failed = sum(result is not True for result in results)
+    return failed, time.perf_counter() - start
+
+
+async def _initialize(http: httpx.AsyncClient, url: str) -> dict:
+    headers = {"Accept": "application/json, text/event-stream"}
+    response = await http.post(url, headers=headers, json={
+        "jsonrpc": "2.0", "id": 0, "method": "initialize",
+        "params": {
+            "protocolVersion": "2025-06-18",
+            "capabilities": {},
+            "clientInfo": {"name": "bench", "version": "0"},
+        },
+    })
+    response.raise_for_status()
+
+    # Stateless workers do not issue a session id
+    if "mcp-session-id" in response.headers:
+        headers["Mcp-Session-Id"] = response.headers["mcp-session-id"]
+    headers["MCP-Protocol-Version"] = response.json()["result"]["protocolVersion"]
+
+    await http.post(url, headers=headers, json={
+        "jsonrpc": "2.0", "method": "notifications/initialized",
+    })
+    return headers
+
+
+async def _call_tool(http: httpx.AsyncClient, url: str, headers: dict,
+                     name: str, arguments: dict) -> bool:
+    response = await http.post(url, headers=headers, json={
+        "jsonrpc": "2.0", "id": 1, "method": "tools/call",
+        "params": {"name": name, "arguments": arguments},
+    })
+    response.raise_for_status()
+    result = response.json().get("result") or {}
+    return not result.get("isError", True)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def main(args):
+    tool_args = {"limit": 20} if args.tool == "list_emails" else {"email_id": "msg-1"}
+
+    with MockGraph(messages=args.messages, events=50, latency=args.latency) as graph, \
+            tempfile.TemporaryDirectory() as tmp:
+
+        for workers in args.workers:
+            port = _free_port()
+            base = f"http://127.0.0.1:{port}"
+            store = None if args.no_store else pathlib.Path(tmp) / f"store-{workers}.db"
+            process = start_server(port, workers, graph.base_url, store)
+
+            try:
+                await wait_ready(base, workers)
+                result = await load(f"{base}/mcp", args.clients, args.seconds, args.tool, tool_args)
+                print(f"workers {workers:>2}  clients {args.clients:>3}  "
+                      f"{result['ops_per_s']:>7.1f} op/s  p50 {result['p50_ms']:>7.1f} ms  "
+                      f"p95 {result['p95_ms']:>7.1f} ms  calls {result['calls']}  "
+                      f"errors {result['errors']}")
+
+                failed, seconds = await shutdown_under_load(
+                    process, graph, f"{base}/mcp", args.clients,
+                )
+                graph.latency = args.latency
+                print(f"           SIGTERM with {args.clients} calls in flight: "
+                      f"{failed} failed, exited in {seconds:.2f}s (code {process.returncode})")
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--tool", choices=("list_emails", "get_email"), default="get_email")
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--no-store", action="store_true",
+                        help="read from Graph directly instead of the local store")
+    args = parser.parse_args()
+    asyncio.run(main(args))
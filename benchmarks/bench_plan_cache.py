@@ -0,0 +1,107 @@
+"""
+Plan cache hit rate and the agent time it saves over a simulated day.
+
+Starts the HTTP server against the mock Graph server, pre-generates the
+morning plan, then asks for the plan --requests times through the agent
+runner, with stub models standing in for the executor and planner
+(--llm-latency seconds per model call). Before each request, with
+probability --change-rate, a message changes (new changeKey), which must
+give a fresh plan. Reports hit rate, latency of hits and misses, and the
+agent time saved.
+
+    uv run python -m benchmarks.bench_plan_cache --requests 40 --change-rate 0.25 --llm-latency 1.0
+"""
+
+import argparse
+import asyncio
+import pathlib
+import random
+import statistics
+import tempfile
+import time
+
+from m365_assistant.agent.plan_cache import PlanCache
+from m365_assistant.agent.runner import PLAN_PROMPT, AgentRunner, SERVER_NAME
+
+from .bench_http import _free_port, start_server, wait_ready
+from .mock_graph import MockGraph
+from .stub_llm import executor_stub, planner_stub
+
+
+async def day(url: str, graph: MockGraph, cache: PlanCache, requests: int,
+              change_rate: float, llm_latency: float, seed: int):
+    rng = random.Random(seed)
+    runner = AgentRunner(
+        {SERVER_NAME: {"transport": "streamable_http", "url": url}},
+        plan_cache=cache,
+        executor_llm=executor_stub(llm_latency),
+        planner_llm=planner_stub(llm_latency),
+    )
+
+    hits, misses = [], []
+
+    async with runner:
+        start = time.perf_counter()
+        await runner.pregenerate(PLAN_PROMPT)
+        print(f"pre-generated morning plan in {time.perf_counter() - start:.2f}s")
+
+        for _ in range(requests):
+            if rng.random() < change_rate:
+                graph.touch(f"msg-{rng.randrange(50)}")
+
+            before = cache.stats()["hits"]
+            start = time.perf_counter()
+            await runner.run_agent(PLAN_PROMPT)
+            elapsed = time.perf_counter() - start
+
+            (hits if cache.stats()["hits"] > before else misses).append(elapsed)
+
+    return hits, misses
+
+
+def _ms(samples) -> str:
+    if not samples:
+        return "    n/a"
+    return f"{statistics.median(samples) * 1000:>7.0f}"
+
+
+async def main(args):
+    with MockGraph(messages=args.messages, events=50, latency=args.latency) as graph, \
+            tempfile.TemporaryDirectory() as tmp:
+        port = _free_port()
+        base = f"http://127.0.0.1:{port}"
+        process = start_server(port, 1, graph.base_url, pathlib.Path(tmp) / "store.db")
+        cache = PlanCache(pathlib.Path(tmp) / "plans.db")
+
+        try:
+            await wait_ready(base, 1)
+            hits, misses = await day(
+                f"{base}/mcp", graph, cache, args.requests,
+                args.change_rate, args.llm_latency, args.seed,
+            )
+        finally:
+            process.terminate()
+            process.wait()
+
+        stats = cache.stats()
+        cache.close()
+
+    print(f"requests {args.requests}  hits {len(hits)}  misses {len(misses)}  "
+          f"hit rate {stats['hit_rate']:.0%} (change rate {args.change_rate:.0%})")
+    print(f"median latency: hit {_ms(hits)} ms   miss {_ms(misses)} ms")
+    print(f"agent time saved {stats['saved_seconds']:.1f}s "
+          f"(plans built in {stats['mean_build_seconds']:.2f}s on average)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--change-rate", type=float, default=0.25,
+                        help="chance a message changes before each request")
+    parser.add_argument("--llm-latency", type=float, default=1.0,
+                        help="seconds per stub model call")
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(main(args))
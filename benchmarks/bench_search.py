@@ -0,0 +1,105 @@
+"""
+Build time and query latency of the local full-text mail index.
+
+    uv run python -m benchmarks.bench_search --sizes 10000 100000 1000000
+"""
+
+import argparse
+import itertools
+import pathlib
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from m365_assistant.sync.store import LocalStore
+
+WORDS = (
+    "budget review quarterly report invoice deadline contract renewal "
+    "meeting agenda roadmap launch customer escalation security audit "
+    "offsite travel expenses hiring interview feedback release notes "
+    "migration outage postmortem design proposal approval"
+).split()
+
+QUERIES = ["invoice", "quarterly report", "security audit", "postmortem outage", "renew"]
+
+
+def word_pool(rng: random.Random, vocab_size: int = 20_000, size: int = 1_000_000):
+    # Filler words with a Zipf-like distribution, so topic words stay
+    # selective the way they are in a real mailbox. Drawn once and sliced,
+    # since per-message weighted sampling dominates the build otherwise.
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = ["".join(rng.choices(letters, k=rng.randint(3, 9))) for _ in range(vocab_size)]
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(vocab_size)))
+    return rng.choices(words, cum_weights=cum_weights, k=size)
+
+
+def text(rng: random.Random, pool, k: int) -> str:
+    offset = rng.randrange(len(pool) - k)
+    words = pool[offset:offset + k]
+    # roughly one topic word per sentence
+    for _ in range(max(1, k // 15)):
+        words[rng.randrange(k)] = rng.choice(WORDS)
+    return " ".join(words)
+
+
+def synthetic_messages(count: int, batch: int = 5000):
+    rng = random.Random(7)
+    pool = word_pool(rng)
+    now = datetime.now(timezone.utc)
+
+    for start in range(0, count, batch):
+        chunk = []
+        for i in range(start, min(start + batch, count)):
+            sender = rng.randrange(500)
+            chunk.append({
+                "id": f"msg-{i}",
+                "subject": text(rng, pool, 6),
+                "receivedDateTime": (now - timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "from": {"emailAddress": {
+                    "name": f"Sender {sender}",
+                    "address": f"sender{sender}@example.com",
+                }},
+                "isRead": bool(i % 3),
+                "importance": "normal",
+                "flag": {"flagStatus": "notFlagged"},
+                "bodyPreview": text(rng, pool, 40),
+                "parentFolderId": "inbox",
+            })
+        yield chunk
+
+
+def run(size: int, queries: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalStore(pathlib.Path(tmp) / "bench.db")
+
+        start = time.perf_counter()
+        for chunk in synthetic_messages(size):
+            store.upsert_messages(chunk)
+        build = time.perf_counter() - start
+
+        latencies = []
+        for i in range(queries):
+            query = QUERIES[i % len(QUERIES)]
+            sender = "sender42" if i % 4 == 0 else None
+            start = time.perf_counter()
+            store.search_messages(query, sender=sender, limit=20)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        store.close()
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{size:>9} {build:>9.1f} {statistics.median(latencies):>9.2f} {p95:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'messages':>9} {'build s':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for size in args.sizes:
+        run(size, args.queries)
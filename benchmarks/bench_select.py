@@ -0,0 +1,61 @@
+"""
+Payload size of list_emails / list_upcoming_events with and without $select.
+
+Reports bytes over the wire (as served by the mock Graph server) and an
+estimate of the prompt tokens the result costs once it is turned into a
+ToolMessage by ``str(result)`` in the agent graph.
+
+    uv run python -m benchmarks.bench_select --limit 50
+"""
+
+import argparse
+import asyncio
+from dataclasses import replace
+
+from m365_assistant.core.config import Settings
+from m365_assistant.core.graph_client import GraphClient
+from m365_assistant.services.calendar_service import CalendarService
+from m365_assistant.services.mail_service import MailService
+from m365_assistant.services.serialization import estimate_tokens
+
+from .bench_concurrency import StaticAuth
+from .mock_graph import MockGraph
+
+
+async def measure(graph: MockGraph, settings: Settings, limit: int):
+    client = GraphClient(StaticAuth(), settings)
+    rows = []
+
+    for name, call in (
+        ("list_emails", lambda: MailService(client).list_last_n_days(limit=limit)),
+        ("list_upcoming_events", lambda: CalendarService(client).list_upcoming_events(limit=limit)),
+    ):
+        before = graph.bytes_sent
+        result = await call()
+        rows.append((name, graph.bytes_sent - before, estimate_tokens(str(result))))
+
+    await client.aclose()
+    return rows
+
+
+async def main(limit: int):
+    with MockGraph(messages=limit, events=limit) as graph:
+        base = Settings(
+            client_id="bench",
+            authority="https://login.microsoftonline.com/common",
+            graph_base_url=graph.base_url,
+        )
+        full = await measure(graph, replace(base, mail_select=(), event_select=()), limit)
+        trimmed = await measure(graph, base, limit)
+
+    print(f"{'tool':<22} {'bytes full':>11} {'bytes $select':>14} {'tokens full':>12} {'tokens $select':>15}")
+    for (name, full_bytes, full_tokens), (_, sel_bytes, sel_tokens) in zip(full, trimmed):
+        print(f"{name:<22} {full_bytes:>11} {sel_bytes:>14} {full_tokens:>12} {sel_tokens:>15}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.limit))
@@ -0,0 +1,72 @@
+"""
+Prompt tokens per item of the read tools, before and after compact
+serialization.
+
+"repr" is what the agent graph used to put into a ToolMessage
+(``str(result)``), "json" the plain JSON FastMCP sends for a raw result,
+and "compact" / "rows" the two styles of services/serialization.py.
+
+    uv run python -m benchmarks.bench_serialization --limit 50
+"""
+
+import argparse
+import asyncio
+import json
+
+from m365_assistant.core.config import Settings
+from m365_assistant.core.graph_client import GraphClient
+from m365_assistant.services.calendar_service import CalendarService
+from m365_assistant.services.mail_service import MailService
+from m365_assistant.services.serialization import estimate_tokens, serialize
+
+from .bench_concurrency import StaticAuth
+from .mock_graph import MockGraph
+
+STYLES = ("repr", "json", "compact", "rows")
+
+
+def render(result, style: str) -> str:
+    if style == "repr":
+        return str(result)
+    if style == "json":
+        return json.dumps(result, separators=(",", ":"))
+    return serialize(result, "rows" if style == "rows" else "json")
+
+
+async def main(limit: int):
+    with MockGraph(messages=limit, events=limit) as graph:
+        settings = Settings(
+            client_id="bench",
+            authority="https://login.microsoftonline.com/common",
+            graph_base_url=graph.base_url,
+        )
+        client = GraphClient(StaticAuth(), settings)
+        mail = MailService(client)
+        calendar = CalendarService(client)
+
+        emails = await mail.list_last_n_days(limit=limit)
+        events = await calendar.list_upcoming_events(days_ahead=limit, limit=limit)
+        bodies = [await mail.get_email(email["id"]) for email in emails[:10]]
+
+        await client.aclose()
+
+    cases = (
+        ("list_emails", emails),
+        ("get_email", bodies),
+        ("list_upcoming_events", events),
+    )
+
+    print("tokens per item " + " ".join(f"{style:>9}" for style in STYLES))
+    for name, items in cases:
+        per_item = [
+            estimate_tokens(render(items, style)) / len(items) for style in STYLES
+        ]
+        print(f"{name:<20} " + " ".join(f"{value:>9.1f}" for value in per_item))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.limit))
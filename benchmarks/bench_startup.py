@@ -0,0 +1,137 @@
+"""
+Startup time of the MCP server, which Claude Desktop and the agent runner
+spawn over stdio.
+
+Reports, as the median of several fresh interpreters:
+
+- import time of m365_assistant.mcp.tools from ``python -X importtime``,
+  split into FastMCP itself and what this package adds on top
+- wall time from spawning ``python -m m365_assistant.main`` to the
+  answer to ``initialize`` and ``tools/list``
+
+Fails if the package's own import time exceeds --budget-ms or if a module
+that should load lazily (MSAL, tiktoken, the account stack) is imported
+at startup:
+
+    uv run python -m benchmarks.bench_startup --runs 5 --budget-ms 150
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+MODULE = "m365_assistant.mcp.tools"
+FRAMEWORK = "fastmcp"
+
+# Loaded on first tool use, never at startup
+LAZY_MODULES = (
+    "msal",
+    "tiktoken",
+    "m365_assistant.core.auth_manager",
+    "m365_assistant.services.accounts",
+)
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _env():
+    env = dict(os.environ)
+    env.setdefault("MICROSOFT_CLIENT_ID", "bench")
+    # Keep the server from writing traces during the benchmark
+    env["M365_TRACE"] = "off"
+    return env
+
+
+def import_profile():
+    """
+    One fresh interpreter's import: (total ms, framework ms, module names).
+    """
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {MODULE}"],
+        capture_output=True,
+        text=True,
+        env=_env(),
+        check=True,
+    )
+
+    cumulative = {}
+    for match in _LINE.finditer(result.stderr):
+        # First occurrence is the real import; later ones are cache hits
+        cumulative.setdefault(match.group(4), int(match.group(2)) / 1000)
+
+    return cumulative[MODULE], cumulative.get(FRAMEWORK, 0.0), set(cumulative)
+
+
+async def initialize_time() -> tuple:
+    from fastmcp import Client
+    from fastmcp.client.transports import StdioTransport
+
+    transport = StdioTransport(
+        command=sys.executable,
+        args=["-m", "m365_assistant.main"],
+        env=_env(),
+        keep_alive=False,
+    )
+
+    start = time.perf_counter()
+    async with Client(transport) as client:
+        initialized = time.perf_counter() - start
+        tools = await client.list_tools()
+        listed = time.perf_counter() - start
+
+    return initialized * 1000, listed * 1000, len(tools)
+
+
+def main(runs: int, budget_ms: float, spawn: bool) -> bool:
+    totals, frameworks, modules = [], [], set()
+
+    for _ in range(runs):
+        total, framework, loaded = import_profile()
+        totals.append(total)
+        frameworks.append(framework)
+        modules |= loaded
+
+    total = statistics.median(totals)
+    framework = statistics.median(frameworks)
+    own = statistics.median(t - f for t, f in zip(totals, frameworks))
+
+    print(f"import {MODULE}: {total:.0f} ms "
+          f"({FRAMEWORK} {framework:.0f} ms, this package {own:.0f} ms)")
+
+    if spawn:
+        samples = [asyncio.run(initialize_time()) for _ in range(runs)]
+        print(f"spawn → initialize: {statistics.median(s[0] for s in samples):.0f} ms, "
+              f"→ tools/list: {statistics.median(s[1] for s in samples):.0f} ms "
+              f"({samples[0][2]} tools)")
+
+    ok = True
+
+    eager = [name for name in LAZY_MODULES if name in modules]
+    if eager:
+        print(f"FAIL: imported at startup: {', '.join(eager)}")
+        ok = False
+
+    if own > budget_ms:
+        print(f"FAIL: {own:.0f} ms over the {budget_ms:.0f} ms budget")
+        ok = False
+
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=150,
+                        help="import time this package may add on top of FastMCP")
+    parser.add_argument("--no-spawn", action="store_true",
+                        help="skip the stdio initialize measurement")
+    args = parser.parse_args()
+
+    if not main(args.runs, args.budget_ms, not args.no_spawn):
+        sys.exit(1)
@@ -0,0 +1,63 @@
+"""
+Sustained list_emails throughput while the mock Graph server throttles.
+
+A share of all requests (``--throttle-rate``) is answered with 429 and a
+Retry-After; the scheduler in GraphClient should absorb them so that every
+tool call still succeeds.
+
+    uv run python -m benchmarks.bench_throttling --throttle-rate 0.2
+"""
+
+import argparse
+import asyncio
+import time
+
+from m365_assistant.core.config import Settings
+from m365_assistant.core.graph_client import GraphClient
+from m365_assistant.services.mail_service import MailService
+
+from .bench_concurrency import StaticAuth
+from .mock_graph import MockGraph
+
+
+async def main(calls: int, callers: int, throttle_rate: float, retry_after: float):
+    with MockGraph(latency=0.02, throttle_rate=throttle_rate, retry_after=retry_after) as graph:
+        settings = Settings(
+            client_id="bench",
+            authority="https://login.microsoftonline.com/common",
+            graph_base_url=graph.base_url,
+        )
+        client = GraphClient(StaticAuth(), settings)
+        service = MailService(client)
+        semaphore = asyncio.Semaphore(callers)
+        failures = 0
+
+        async def one():
+            nonlocal failures
+            async with semaphore:
+                try:
+                    await service.list_last_n_days(limit=20)
+                except Exception:
+                    failures += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(calls)))
+        elapsed = time.perf_counter() - start
+
+        await client.aclose()
+
+    print(f"calls={calls} callers={callers} throttle_rate={throttle_rate}")
+    print(f"  {calls / elapsed:.1f} calls/s, {failures} failed tool calls")
+    print(f"  server: {graph.requests} requests, {graph.throttled} answered 429")
+    print(f"  scheduler: {client.metrics()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--callers", type=int, default=32)
+    parser.add_argument("--throttle-rate", type=float, default=0.2)
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.calls, args.callers, args.throttle_rate, args.retry_after))
@@ -0,0 +1,108 @@
+"""
+Many processes writing tokens to one shared cache at once.
+
+Each worker adds ``--rounds`` token responses (a distinct scope per round,
+as a refresh for a new resource would) through its own
+PersistentTokenCache. Afterwards the cache must parse and hold every
+worker's tokens. ``--backend unsafe`` replays the previous behaviour
+(load once, plain write_text) for comparison.
+
+    uv run python -m benchmarks.bench_token_cache --workers 16 --rounds 50
+"""
+
+import argparse
+import json
+import multiprocessing
+import pathlib
+import tempfile
+import time
+
+import msal
+
+from m365_assistant.core.token_store import PersistentTokenCache, token_store_for
+
+TOKEN_ENDPOINT = "https://login.microsoftonline.com/common/oauth2/v2.0/token"
+
+
+def token_event(worker: int, round_: int) -> dict:
+    return {
+        "client_id": "bench",
+        "scope": [f"api://worker{worker}/round{round_}"],
+        "token_endpoint": TOKEN_ENDPOINT,
+        "response": {
+            "access_token": f"at-{worker}-{round_}",
+            "token_type": "Bearer",
+            "expires_in": 3600,
+        },
+    }
+
+
+def worker(backend: str, cache_file: str, index: int, rounds: int, start):
+    path = pathlib.Path(cache_file)
+    start.wait()
+
+    if backend == "unsafe":
+        cache = msal.SerializableTokenCache()
+        if path.exists():
+            cache.deserialize(path.read_text())
+        for round_ in range(rounds):
+            cache.add(token_event(index, round_))
+            path.write_text(cache.serialize())
+        return
+
+    cache = PersistentTokenCache(token_store_for(backend, path))
+    for round_ in range(rounds):
+        cache.add(token_event(index, round_))
+
+
+def check(backend: str, cache_file: pathlib.Path) -> tuple:
+    try:
+        if backend == "unsafe":
+            cache = msal.SerializableTokenCache()
+            cache.deserialize(cache_file.read_text())
+        else:
+            cache = PersistentTokenCache(token_store_for(backend, cache_file))
+    except (json.JSONDecodeError, FileNotFoundError) as exc:
+        return 0, f"corrupt ({type(exc).__name__})"
+
+    tokens = list(cache.search(msal.TokenCache.CredentialType.ACCESS_TOKEN))
+    return len(tokens), "ok"
+
+
+def main(backend: str, workers: int, rounds: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = pathlib.Path(tmp) / "token_cache.json"
+
+        start = multiprocessing.Event()
+        processes = [
+            multiprocessing.Process(
+                target=worker,
+                args=(backend, str(cache_file), index, rounds, start),
+            )
+            for index in range(workers)
+        ]
+        for process in processes:
+            process.start()
+
+        began = time.perf_counter()
+        start.set()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - began
+
+        found, state = check(backend, cache_file)
+
+    expected = workers * rounds
+    print(f"backend={backend} workers={workers} rounds={rounds}")
+    print(f"  {expected / elapsed:.0f} writes/s, cache {state}, "
+          f"{found}/{expected} tokens kept ({expected - found} lost)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=("file", "sqlite", "unsafe"), default="file")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    main(args.backend, args.workers, args.rounds)
@@ -0,0 +1,72 @@
+"""
+Cost of tracing spans on the hot path.
+
+Times an empty ``with tracing.span(...)`` with tracing off, with the
+in-memory histograms only, and with the JSONL exporter, then a Graph GET
+through GraphClient against the mock server in each mode.
+
+    uv run python -m benchmarks.bench_tracing --spans 200000 --requests 500
+"""
+
+import argparse
+import asyncio
+import pathlib
+import tempfile
+import time
+
+from m365_assistant.core import tracing
+from m365_assistant.core.config import Settings
+from m365_assistant.core.graph_client import GraphClient
+
+from .bench_concurrency import StaticAuth
+from .mock_graph import MockGraph
+
+MODES = ("off", "prometheus", "jsonl")
+
+
+def span_cost(spans: int) -> float:
+    start = time.perf_counter()
+    for _ in range(spans):
+        with tracing.span("bench", kind="bench", method="GET") as span:
+            span.set(status=200)
+    return (time.perf_counter() - start) / spans
+
+
+async def request_cost(base_url: str, requests: int) -> float:
+    settings = Settings(
+        client_id="bench",
+        authority="https://login.microsoftonline.com/common",
+        graph_base_url=base_url,
+        response_cache_bytes=0,
+    )
+    client = GraphClient(StaticAuth(), settings)
+
+    await client.get("/me/messages/msg-0")
+    start = time.perf_counter()
+    for i in range(requests):
+        await client.get(f"/me/messages/msg-{i % 100}")
+    elapsed = time.perf_counter() - start
+
+    await client.aclose()
+    return elapsed / requests
+
+
+def main(spans: int, requests: int):
+    with MockGraph(messages=100, events=0, latency=0.0) as graph, \
+            tempfile.TemporaryDirectory() as tmp:
+        for mode in MODES:
+            tracing.configure(mode, pathlib.Path(tmp) / "traces.jsonl")
+            per_span = span_cost(spans)
+            per_request = asyncio.run(request_cost(graph.base_url, requests))
+            print(f"{mode:<11} span {per_span * 1e6:>7.2f} µs   "
+                  f"Graph GET {per_request * 1e3:>6.3f} ms")
+
+        tracing.configure("off")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--spans", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+    main(args.spans, args.requests)
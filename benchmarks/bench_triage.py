@@ -0,0 +1,64 @@
+"""
+Fetch-phase cost of the rule-based triage that replaces the executor
+model loop in build_graph(triage=True).
+
+Times triage_day end to end against the mock Graph server, and the
+scoring alone over a larger mailbox. No model is called, so the fetch
+phase costs no LLM tokens.
+
+    uv run python -m benchmarks.bench_triage --emails 100 --events 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from m365_assistant.core.config import Settings
+from m365_assistant.core.graph_client import GraphClient
+from m365_assistant.services.calendar_service import CalendarService
+from m365_assistant.services.mail_service import MailService
+from m365_assistant.services.triage import triage, triage_day
+
+from .bench_concurrency import StaticAuth
+from .mock_graph import MockGraph, make_events, make_messages
+
+
+async def main(emails: int, events: int, runs: int):
+    with MockGraph(messages=emails, events=events, latency=0.02) as graph:
+        settings = Settings(
+            client_id="bench",
+            authority="https://login.microsoftonline.com/common",
+            graph_base_url=graph.base_url,
+            response_cache_bytes=0,
+        )
+        client = GraphClient(StaticAuth(), settings)
+        mail, calendar = MailService(client), CalendarService(client)
+
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = await triage_day(mail, calendar, days_ahead=events, limit=emails)
+            timings.append(time.perf_counter() - start)
+
+        await client.aclose()
+
+    print(f"triage_day ({emails} emails, {events} events, 20 ms Graph latency): "
+          f"p50 {statistics.median(timings) * 1000:.0f} ms")
+    print("  " + ", ".join(f"{key}={len(value)}" for key, value in result.items()))
+
+    messages, meetings = make_messages(10_000), make_events(500)
+    start = time.perf_counter()
+    triage(messages, meetings)
+    print(f"scoring alone, 10000 emails + 500 events: "
+          f"{(time.perf_counter() - start) * 1000:.0f} ms, 0 LLM tokens")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--emails", type=int, default=100)
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.emails, args.events, args.runs))
@@ -0,0 +1,332 @@
+"""
+Workload benchmark of every MCP tool, bulk triage and the agent pipeline.
+
+Runs the real FastMCP server in-process (tools called through an MCP
+client session) against the mock Graph server, with a stub LLM in place
+of the Groq models. Each scenario reports p50/p95/p99 latency,
+throughput, Graph requests and bytes per operation. Results are written
+as JSON and can be compared with an earlier baseline:
+
+    uv run python -m benchmarks.harness --output baseline.json
+    uv run python -m benchmarks.harness --compare baseline.json
+
+Exits non-zero with --compare when a scenario's p95 regresses by more
+than --tolerance.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import pathlib
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import replace
+
+from m365_assistant.core.config import Settings
+from m365_assistant.core.graph_client import GraphClient, new_scheduler
+from m365_assistant.core.scheduler import MAILBOX_RATE
+from m365_assistant.services.calendar_service import CalendarService
+from m365_assistant.services.mail_service import MailService
+from m365_assistant.sync.engine import SyncEngine
+from m365_assistant.sync.store import LocalStore
+
+from .bench_concurrency import StaticAuth
+from .mock_graph import MockGraph
+from .stub_llm import executor_stub, planner_stub
+
+
+def tool_scenarios(messages: int):
+    # name → (tool, args for iteration i); mutations use separate ranges
+    # of IDs so moved messages are never read again.
+    def email(i):
+        return f"msg-{i % (messages // 2)}"
+
+    def batch(i, size=20, base=0):
+        start = base + (i * size) % (messages // 4)
+        return [f"msg-{start + j}" for j in range(size)]
+
+    return {
+        "list_emails": ("list_emails", lambda i: {"limit": 20}),
+        "get_email": ("get_email", lambda i: {"email_id": email(i)}),
+        "search_emails": ("search_emails", lambda i: {"query": "synthetic message"}),
+        "list_upcoming_events": ("list_upcoming_events", lambda i: {"days_ahead": 7}),
+        "list_calendar_events": ("list_calendar_events", lambda i: {"days_ahead": 7}),
+        "find_free_slots": ("find_free_slots", lambda i: {"duration_minutes": 30}),
+        "forward_email": ("forward_email", lambda i: {
+            "email_id": email(i), "to": ["someone@example.com"],
+        }),
+        "list_attachments": ("list_attachments", lambda i: {"email_id": email(i)}),
+        "download_attachment": ("download_attachment", lambda i: {
+            "email_id": email(i), "attachment_id": "att-0", "dest": f"bench-{i}.bin",
+        }),
+        "reply_all_email": ("reply_all_email", lambda i: {"email_id": email(i), "body": "Thanks"}),
+        "reply_to_specific_recipient": ("reply_to_specific_recipient", lambda i: {
+            "original_email_id": email(i), "recipient": "someone@example.com", "body": "Thanks",
+        }),
+        "flag_email": ("flag_email", lambda i: {"email_id": email(i)}),
+        "mark_email_as_read": ("mark_email_as_read", lambda i: {"email_id": email(i)}),
+        "mark_email_as_unread": ("mark_email_as_unread", lambda i: {"email_id": email(i)}),
+        "mark_emails_as_read": ("mark_emails_as_read", lambda i: {"email_ids": batch(i)}),
+        "mark_emails_as_unread": ("mark_emails_as_unread", lambda i: {"email_ids": batch(i)}),
+        "flag_emails": ("flag_emails", lambda i: {"email_ids": batch(i)}),
+        "move_emails": ("move_emails", lambda i: {
+            "email_ids": batch(i, base=messages // 2), "folder": "archive",
+        }),
+        "create_mail_folder": ("create_mail_folder", lambda i: {"folder_name": f"bench-{i}"}),
+        "triage_day": ("triage_day", lambda i: {}),
+        "context_fingerprint": ("context_fingerprint", lambda i: {}),
+        "wait_for_sign_in": ("wait_for_sign_in", lambda i: {"timeout_seconds": 0}),
+    }
+
+
+class _Accounts:
+    """Stands in for AccountRegistry with one pre-authenticated account."""
+
+    def __init__(self, context):
+        self.context = context
+
+    def get(self, account=None):
+        return self.context
+
+    @contextlib.asynccontextmanager
+    async def lease(self, account=None):
+        yield self.context
+
+    async def aclose(self):
+        self.context.close()
+        await self.context.client.aclose()
+
+
+def _context(settings: Settings, store_path, mailbox_rate: float):
+    from m365_assistant.services.accounts import AccountContext
+
+    auth = StaticAuth()
+    # Split across workers like the real server's (see new_scheduler)
+    scheduler = new_scheduler(settings, mailbox_rate)
+    client = GraphClient(auth, settings, scheduler=scheduler)
+    sync = None
+    if store_path is not None:
+        sync = SyncEngine(client, LocalStore(store_path))
+
+    return AccountContext(
+        name="bench",
+        auth=auth,
+        client=client,
+        mail=MailService(client, sync),
+        calendar=CalendarService(client, sync),
+        sync=sync,
+    )
+
+
+async def measure(graph: MockGraph, operation, runs: int, concurrency: int):
+    # One warm-up call (initial sync, connection setup) is not counted
+    await operation(-1)
+
+    requests, sent = graph.requests, graph.bytes_sent
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await operation(i)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(runs)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "runs": runs,
+        "errors": errors,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "ops_per_s": round(runs / elapsed, 1),
+        "graph_requests_per_op": round((graph.requests - requests) / runs, 2),
+        "bytes_per_op": round((graph.bytes_sent - sent) / runs),
+    }
+
+
+async def run(args) -> dict:
+    # tools.py builds its settings from the environment
+    os.environ.setdefault("MICROSOFT_CLIENT_ID", "bench")
+
+    from fastmcp import Client
+    from langchain_mcp_adapters.tools import load_mcp_tools
+    from m365_assistant.agent.graph_builder import build_graph
+    from m365_assistant.mcp import tools
+
+    results = {}
+
+    with MockGraph(
+        messages=args.messages,
+        events=args.events,
+        latency=args.latency,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+    ) as graph, tempfile.TemporaryDirectory() as tmp:
+
+        settings = replace(
+            tools.get_settings(),
+            graph_base_url=graph.base_url,
+            graph_page_size=args.page_size,
+            attachment_dir=pathlib.Path(tmp) / "attachments",
+        )
+        store_path = None if args.no_store else pathlib.Path(tmp) / "bench.db"
+        # Graph's per-mailbox rate limit would otherwise cap every
+        # scenario at ~17 requests/s after the first burst
+        mailbox_rate = MAILBOX_RATE if args.graph_rate_limit else 1e9
+        context = _context(settings, store_path, mailbox_rate)
+        tools.accounts = _Accounts(context)
+
+        async with Client(tools.mcp) as client:
+            scenarios = tool_scenarios(args.messages)
+
+            listed = {tool.name for tool in await client.list_tools()}
+            missing = listed - {tool for tool, _ in scenarios.values()}
+            if missing:
+                print(f"warning: no scenario for tools {sorted(missing)}", file=sys.stderr)
+
+            def call(tool, make_args):
+                async def operation(i):
+                    await client.call_tool(tool, make_args(max(i, 0)))
+                return operation
+
+            operations = {
+                name: call(tool, make_args)
+                for name, (tool, make_args) in scenarios.items()
+            }
+
+            async def bulk_triage(i):
+                result = await client.call_tool("triage_day", {})
+                triaged = json.loads(result.content[0].text)
+                ids = [item["id"] for item in triaged.get("pending_actions", [])][:50]
+                await client.call_tool("mark_emails_as_read", {"email_ids": ids or ["msg-0"]})
+
+            operations["bulk_triage"] = bulk_triage
+
+            mcp_tools = await load_mcp_tools(client.session)
+            pipelines = {
+                "agent_pipeline": build_graph(
+                    mcp_tools,
+                    executor_llm=executor_stub(args.llm_latency),
+                    planner_llm=planner_stub(args.llm_latency),
+                ),
+                "agent_pipeline_triage": build_graph(
+                    mcp_tools,
+                    triage=True,
+                    planner_llm=planner_stub(args.llm_latency),
+                ),
+            }
+            for name, agent in pipelines.items():
+                async def invoke(i, agent=agent):
+                    await agent.ainvoke({"user_input": "Plan my workday today"})
+                operations[name] = invoke
+
+            for name, operation in operations.items():
+                if args.scenarios and name not in args.scenarios:
+                    continue
+
+                results[name] = await measure(graph, operation, args.runs, args.concurrency)
+                row = results[name]
+                print(f"{name:<28} p50 {row['p50_ms']:>8.1f} ms  p95 {row['p95_ms']:>8.1f} ms  "
+                      f"p99 {row['p99_ms']:>8.1f} ms  {row['ops_per_s']:>7.1f} op/s  "
+                      f"{row['bytes_per_op']:>8} B/op  errors {row['errors']}")
+
+        context.close()
+        await context.client.aclose()
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": f"{platform.system()} {platform.machine()}",
+            "messages": args.messages,
+            "events": args.events,
+            "latency": args.latency,
+            "throttle_rate": args.throttle_rate,
+            "page_size": args.page_size,
+            "runs": args.runs,
+            "concurrency": args.concurrency,
+            "llm_latency": args.llm_latency,
+            "local_store": not args.no_store,
+            "graph_rate_limit": args.graph_rate_limit,
+        },
+        "scenarios": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> bool:
+    ok = True
+    print(f"\n{'scenario':<28} {'p50':>10} {'p95':>10} {'bytes/op':>10}")
+
+    for name, row in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            print(f"{name:<28} {'new':>10}")
+            continue
+
+        changes = [
+            _change(row[key], before[key]) for key in ("p50_ms", "p95_ms", "bytes_per_op")
+        ]
+        regressed = changes[1] is not None and changes[1] > tolerance
+        ok = ok and not regressed
+
+        print(f"{name:<28} " + " ".join(
+            f"{change:>+9.0%}" if change is not None else f"{'-':>10}" for change in changes
+        ) + ("  REGRESSED" if regressed else ""))
+
+    return ok
+
+
+def _change(now: float, before: float):
+    return (now - before) / before if before else None
+
+
+def _percentile(sorted_values, percent: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(percent / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.1)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--no-store", action="store_true",
+                        help="read from Graph directly instead of the local store")
+    parser.add_argument("--graph-rate-limit", action="store_true",
+                        help="apply Graph's per-mailbox request rate")
+    parser.add_argument("--scenarios", nargs="*", help="only run these scenarios")
+    parser.add_argument("--output", type=pathlib.Path)
+    parser.add_argument("--compare", type=pathlib.Path)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        if not compare(report, baseline, args.tolerance):
+            sys.exit(1)
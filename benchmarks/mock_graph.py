@@ -0,0 +1,543 @@
+"""
+Minimal in-process mock of the Microsoft Graph endpoints used by m365_assistant.
+
+Serves a synthetic mailbox and calendar over plain HTTP/1.1 (keep-alive) with
+an optional fixed per-request latency, so client-side changes can be measured
+without a tenant. Point the client at it with ``M365_GRAPH_BASE_URL``.
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+# Attachment content is generated, never held: byte n is n % 251
+_BLOCK = bytes(i % 251 for i in range(251 * 4096))
+
+
+def attachment_bytes(start: int, end: int):
+    """
+    Yield the synthetic attachment content from ``start`` to ``end``.
+    """
+
+    offset = start
+    while offset < end:
+        skip = offset % 251
+        block = _BLOCK[skip:skip + min(len(_BLOCK) - skip, end - offset)]
+        yield block
+        offset += len(block)
+
+
+def make_messages(count: int):
+    now = datetime.now(timezone.utc)
+    messages = []
+
+    for i in range(count):
+        messages.append({
+            "@odata.etag": f'W/"etag-{i}"',
+            "id": f"msg-{i}",
+            "changeKey": f"ck-{i}",
+            "subject": f"Synthetic message {i}",
+            "receivedDateTime": (now - timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "importance": "high" if i % 17 == 0 else "normal",
+            "isRead": i % 3 == 0,
+            "flag": {"flagStatus": "flagged" if i % 11 == 0 else "notFlagged"},
+            "from": {"emailAddress": {
+                "name": f"Sender {i % 50}",
+                "address": f"sender{i % 50}@example.com",
+            }},
+            "toRecipients": [{"emailAddress": {
+                "name": "Me", "address": "me@example.com",
+            }}],
+            "bodyPreview": f"Preview of synthetic message {i}",
+            "body": {
+                "contentType": "html",
+                "content": "<html><body>" + ("<p>Lorem ipsum dolor sit amet.</p>" * 40) + "</body></html>",
+            },
+            "internetMessageHeaders": None,
+            "parentFolderId": "inbox",
+        })
+
+    return messages
+
+
+def make_events(count: int):
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    events = []
+
+    for i in range(count):
+        start = now + timedelta(hours=i * 3)
+        events.append({
+            "@odata.etag": f'W/"event-etag-{i}"',
+            "id": f"evt-{i}",
+            "changeKey": f"evt-ck-{i}",
+            "subject": f"Synthetic meeting {i}",
+            "start": {"dateTime": start.strftime("%Y-%m-%dT%H:%M:%S.0000000"), "timeZone": "UTC"},
+            "end": {"dateTime": (start + timedelta(minutes=30)).strftime("%Y-%m-%dT%H:%M:%S.0000000"), "timeZone": "UTC"},
+            "isAllDay": False,
+            "showAs": "busy",
+            "isCancelled": False,
+            "location": {"displayName": "Room 1"},
+            "organizer": {"emailAddress": {"name": "Organizer", "address": "org@example.com"}},
+            "attendees": [
+                {
+                    "type": "required",
+                    "status": {"response": "accepted"},
+                    "emailAddress": {"name": f"Attendee {n}", "address": f"attendee{n}@example.com"},
+                }
+                for n in range(5)
+            ],
+            "body": {
+                "contentType": "html",
+                "content": "<html><body>" + ("<p>Agenda item.</p>" * 40) + "</body></html>",
+            },
+        })
+
+    return events
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The stdlib default backlog of 5 drops SYNs once many callers connect at once.
+    request_queue_size = 1024
+
+
+class MockGraph:
+    def __init__(
+        self,
+        messages: int = 200,
+        events: int = 50,
+        latency: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 1.0,
+        attachment_size: int = 64 * 1024,
+    ):
+        self.messages = make_messages(messages)
+        self.events = make_events(events)
+        self.latency = latency
+        # Fraction of requests answered with 429 + Retry-After
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.throttled = 0
+        self._random = random.Random(1)
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+
+        # Every message has one attachment "att-0" of this size. Setting
+        # ``drop_value_after`` cuts the next $value response after that
+        # many bytes, to exercise resumed downloads.
+        self.attachment_size = attachment_size
+        self.drop_value_after = None
+        self.drafts = set()
+        self.drafts_created = 0
+        self.uploads = {}
+        self.uploaded_bytes = 0
+
+        # Delta feed: every change bumps ``version``; tokens older than
+        # ``min_delta_token`` are answered with 410 Gone.
+        self.version = 0
+        self.min_delta_token = 0
+        self._changed = {}
+        self._removed = {}
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1.0"
+
+    def start(self) -> "MockGraph":
+        handler = _make_handler(self)
+        self._server = _Server(("127.0.0.1", 0), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _record(self, size: int):
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += size
+
+    # -- mailbox mutations -------------------------------------------------
+
+    def touch(self, item_id: str):
+        with self._lock:
+            self.version += 1
+            self._changed[item_id] = self.version
+            version = self.version
+
+        # Like Graph, every change gives the item a new changeKey and ETag
+        for item in self.messages + self.events:
+            if item["id"] == item_id:
+                item["changeKey"] = f"ck-{item_id}-{version}"
+                item["@odata.etag"] = f'W/"{item["changeKey"]}"'
+
+    def remove_message(self, message_id: str):
+        self.messages = [m for m in self.messages if m["id"] != message_id]
+
+        with self._lock:
+            self.version += 1
+            self._removed[message_id] = self.version
+
+    def expire_delta_tokens(self):
+        # Tokens handed out so far get 410 Gone; new ones start after them
+        with self._lock:
+            self.version += 1
+            self.min_delta_token = self.version
+
+    # -- routing -----------------------------------------------------------
+
+    def handle(self, method: str, path: str, query: dict, body, headers=None):
+        """
+        Return ``(status, payload, headers)`` for a request.
+        """
+
+        path = path.removeprefix("/v1.0")
+
+        if self.throttle_rate and self._random.random() < self.throttle_rate:
+            with self._lock:
+                self.throttled += 1
+            return 429, {"error": {"code": "TooManyRequests"}}, {
+                "Retry-After": f"{self.retry_after:g}",
+            }
+
+        if method == "POST" and path == "/$batch":
+            return 200, {"responses": [self._sub_request(r) for r in body["requests"]]}, {}
+
+        if method == "GET" and path == "/me/mailFolders/inbox/messages":
+            return 200, self._page(path, self.messages, query, headers), {}
+
+        if method == "GET" and path == "/me/calendarView":
+            return 200, self._page(path, self.events, query, headers), {}
+
+        if method == "GET" and path == "/me/mailFolders/inbox/messages/delta":
+            return self._delta(path, self.messages, query, headers)
+
+        if method == "GET" and path == "/me/calendarView/delta":
+            # Like Graph, calendarView/delta ignores $select
+            query = {k: v for k, v in query.items() if k != "$select"}
+            return self._delta(path, self.events, query, headers)
+
+        if method == "POST" and path == "/me/messages":
+            return 201, self._draft(), {}
+
+        if method == "POST" and re.fullmatch(r"/me/messages/[^/]+/(createForward|createReplyAll)", path):
+            return 201, self._draft(), {}
+
+        match = re.fullmatch(r"/me/messages/([^/]+)(/attachments.*|/send)?", path)
+        if match and match.group(1) in self.drafts:
+            return self._draft_request(method, match.group(1), match.group(2) or "", body)
+
+        match = re.fullmatch(r"/me/messages/([^/]+)/attachments(?:/([^/]+))?", path)
+        if method == "GET" and match:
+            message = self._find(match.group(1))
+            if message is None:
+                return 404, {"error": {"code": "ErrorItemNotFound"}}, {}
+            attachment = self._attachment(message)
+            if match.group(2) is None:
+                return 200, {"value": [_project(attachment, query)]}, {}
+            if match.group(2) != attachment["id"]:
+                return 404, {"error": {"code": "ErrorItemNotFound"}}, {}
+            return 200, _project(attachment, query), {}
+
+        match = re.fullmatch(r"/me/messages/([^/]+)", path)
+        if match:
+            message = self._find(match.group(1))
+            if message is None:
+                return 404, {"error": {"code": "ErrorItemNotFound"}}, {}
+            if method == "GET":
+                return 200, _project(message, query), {}
+            if method == "PATCH":
+                message.update(body or {})
+                self.touch(message["id"])
+                return 200, message, {}
+
+        if method == "POST" and re.fullmatch(r"/me/messages/[^/]+/(forward|replyAll)", path):
+            return 202, None, {}
+
+        match = re.fullmatch(r"/me/messages/([^/]+)/move", path)
+        if method == "POST" and match:
+            message = self._find(match.group(1))
+            if message is None:
+                return 404, {"error": {"code": "ErrorItemNotFound"}}, {}
+            message["parentFolderId"] = body["destinationId"]
+            self.touch(message["id"])
+            return 201, message, {}
+
+        if method == "POST" and path == "/me/sendMail":
+            return 202, None, {}
+
+        if method == "POST" and path == "/me/mailFolders":
+            return 201, {"id": f"folder-{body['displayName']}", **body}, {}
+
+        return 404, {"error": {"code": "NotFound", "path": path}}, {}
+
+    def _page(self, path: str, items: list, query: dict, headers) -> dict:
+        page_size = int(query.get("$top", 0))
+        prefer = (headers or {}).get("Prefer", "")
+        if "odata.maxpagesize=" in prefer:
+            max_page = int(prefer.split("odata.maxpagesize=")[1].split(",")[0])
+            page_size = min(page_size, max_page) if page_size else max_page
+        page_size = page_size or 10
+
+        skip = int(query.get("$skip", 0))
+        page = {"value": [_project(item, query) for item in items[skip:skip + page_size]]}
+
+        if skip + page_size < len(items):
+            next_query = dict(query, **{"$skip": skip + page_size})
+            page["@odata.nextLink"] = f"{self.base_url}{path}?{urlencode(next_query)}"
+
+        return page
+
+    def _delta(self, path: str, items: list, query: dict, headers):
+        delta_link = f"{self.base_url}{path}?$deltatoken={self.version}"
+        token = query.get("$deltatoken")
+
+        if token is None:
+            page = self._page(path, items, query, headers)
+            if "@odata.nextLink" not in page:
+                page["@odata.deltaLink"] = delta_link
+            return 200, page, {}
+
+        token = int(token)
+        if token < self.min_delta_token:
+            return 410, {"error": {"code": "syncStateNotFound"}}, {}
+
+        changed = [
+            _project(item, query) for item in items
+            if self._changed.get(item["id"], 0) > token
+        ]
+        removed = [
+            {"id": item_id, "@removed": {"reason": "deleted"}}
+            for item_id, version in self._removed.items() if version > token
+        ]
+        return 200, {"value": changed + removed, "@odata.deltaLink": delta_link}, {}
+
+    def _sub_request(self, request: dict):
+        parsed = urlparse(request["url"])
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        status, payload, headers = self.handle(
+            request["method"], parsed.path, query, request.get("body")
+        )
+        return {"id": request["id"], "status": status, "headers": headers, "body": payload}
+
+    def _attachment(self, message: dict) -> dict:
+        # contentBytes is left out: it would be the whole file in base64
+        return {
+            "@odata.type": "#microsoft.graph.fileAttachment",
+            "id": "att-0",
+            "name": f"report-{message['id']}.bin",
+            "contentType": "application/octet-stream",
+            "size": self.attachment_size,
+            "isInline": False,
+            "lastModifiedDateTime": message["receivedDateTime"],
+        }
+
+    def _draft(self) -> dict:
+        with self._lock:
+            draft_id = f"draft-{self.drafts_created}"
+            self.drafts_created += 1
+            self.drafts.add(draft_id)
+        return {"id": draft_id, "isDraft": True}
+
+    def _draft_request(self, method: str, draft_id: str, rest: str, body):
+        if method == "DELETE" and not rest:
+            self.drafts.discard(draft_id)
+            return 204, None, {}
+
+        if method == "POST" and rest == "/send":
+            self.drafts.discard(draft_id)
+            return 202, None, {}
+
+        if method == "POST" and rest == "/attachments":
+            return 201, {"id": f"att-{draft_id}", "name": body["name"]}, {}
+
+        if method == "POST" and rest == "/attachments/createUploadSession":
+            with self._lock:
+                session = f"session-{len(self.uploads)}"
+                self.uploads[session] = {"size": body["AttachmentItem"]["size"], "received": 0}
+            host, port = self._server.server_address[:2]
+            return 201, {
+                "uploadUrl": f"http://{host}:{port}/upload/{session}",
+                "nextExpectedRanges": ["0-"],
+            }, {}
+
+        return 404, {"error": {"code": "NotFound"}}, {}
+
+    def upload_range(self, session: str, content_range: str, length: int):
+        """
+        Take one PUT of an upload session; ranges must arrive in order.
+        """
+
+        upload = self.uploads.get(session)
+        if upload is None:
+            return 404, {"error": {"code": "ErrorItemNotFound"}}
+
+        start, end = (int(n) for n in content_range.split()[1].split("/")[0].split("-"))
+        if start != upload["received"] or end - start + 1 != length:
+            return 416, {"error": {"code": "InvalidRange"},
+                         "nextExpectedRanges": [f"{upload['received']}-"]}
+
+        with self._lock:
+            upload["received"] += length
+            self.uploaded_bytes += length
+
+        if upload["received"] >= upload["size"]:
+            return 201, None
+        return 200, {"nextExpectedRanges": [f"{upload['received']}-{upload['size'] - 1}"]}
+
+    def _find(self, message_id: str):
+        for message in self.messages:
+            if message["id"] == message_id:
+                return message
+        return None
+
+
+def _project(item: dict, query: dict) -> dict:
+    select = query.get("$select")
+
+    if not select:
+        return item
+
+    fields = set(select.split(",")) | {"id"}
+    return {k: v for k, v in item.items() if k in fields or k == "@odata.etag"}
+
+
+def _make_handler(graph: MockGraph):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _dispatch(self, method: str):
+            parsed = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            body = json.loads(raw) if raw else None
+
+            if graph.latency:
+                time.sleep(graph.latency)
+
+            status, payload, headers = graph.handle(
+                method, parsed.path, query, body, dict(self.headers)
+            )
+            data = json.dumps(payload).encode() if payload is not None else b""
+
+            if method == "GET" and status == 200:
+                etag = f'"{hashlib.md5(data).hexdigest()}"'
+                headers = dict(headers, ETag=etag)
+                if self.headers.get("If-None-Match") == etag:
+                    status, data = 304, b""
+
+            # Count before writing, so the client never sees the response first
+            graph._record(len(data))
+
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_value(self, size: int):
+            # Attachment /$value: raw bytes, honouring Range and If-Range;
+            # the content depends only on the size, and so does the ETag
+            start, status = 0, 200
+            etag = f'"attachment-{size}"'
+            requested = self.headers.get("Range")
+            if self.headers.get("If-Range", etag) != etag:
+                requested = None
+            if requested:
+                start = int(requested.removeprefix("bytes=").split("-")[0])
+                if start >= size:
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                status = 206
+
+            if graph.latency:
+                time.sleep(graph.latency)
+
+            self.send_response(status)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(size - start))
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("ETag", etag)
+            if status == 206:
+                self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+            self.end_headers()
+
+            limit, graph.drop_value_after = graph.drop_value_after, None
+            sent = 0
+            for block in attachment_bytes(start, size):
+                if limit is not None and sent + len(block) > limit:
+                    self.wfile.write(block[:limit - sent])
+                    self.close_connection = True
+                    break
+                self.wfile.write(block)
+                sent += len(block)
+
+            graph._record(sent)
+
+        def do_GET(self):
+            match = re.fullmatch(r"/v1.0/me/messages/([^/]+)/attachments/att-0/\$value", self.path)
+            if match and graph._find(match.group(1)) is not None:
+                self._send_value(graph.attachment_size)
+                return
+            self._dispatch("GET")
+
+        def do_PUT(self):
+            # Upload session chunk; the body is counted, not kept
+            length = int(self.headers.get("Content-Length") or 0)
+            remaining = length
+            while remaining:
+                remaining -= len(self.rfile.read(min(remaining, 1 << 20)))
+
+            status, payload = graph.upload_range(
+                self.path.rsplit("/", 1)[-1], self.headers.get("Content-Range", ""), length,
+            )
+            data = json.dumps(payload).encode() if payload is not None else b""
+            graph._record(len(data))
+
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            self._dispatch("POST")
+
+        def do_PATCH(self):
+            self._dispatch("PATCH")
+
+        def do_DELETE(self):
+            self._dispatch("DELETE")
+
+    return Handler
@@ -0,0 +1,68 @@
+"""
+Scripted chat model standing in for the Groq models in agent benchmarks.
+
+The executor stub asks for a fixed sequence of tool rounds and then
+answers; the planner stub just answers. An optional latency simulates
+the model's response time without any network.
+"""
+
+import asyncio
+import itertools
+from typing import Any, Dict, List, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+# list_emails and list_upcoming_events together, then the answer
+DEFAULT_ROUNDS = [[
+    ("list_emails", {"limit": 20}),
+    ("list_upcoming_events", {"days_ahead": 1, "limit": 20}),
+]]
+
+
+class StubChatModel(BaseChatModel):
+    rounds: List[List[Tuple[str, Dict[str, Any]]]] = []
+    reply: str = "{}"
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs):
+        done = sum(
+            1 for message in messages
+            if isinstance(message, AIMessage) and message.tool_calls
+        )
+
+        if done < len(self.rounds):
+            ids = itertools.count()
+            message = AIMessage(content="", tool_calls=[
+                {"name": name, "args": args, "id": f"call_{done}_{next(ids)}"}
+                for name, args in self.rounds[done]
+            ])
+        else:
+            message = AIMessage(content=self.reply)
+
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._generate(messages, stop, run_manager, **kwargs)
+
+
+def executor_stub(latency: float = 0.0, rounds=None) -> StubChatModel:
+    return StubChatModel(
+        rounds=DEFAULT_ROUNDS if rounds is None else rounds,
+        reply='{"urgent_emails":[],"deadlines":[],"meetings":[],"pending_actions":[]}',
+        latency=latency,
+    )
+
+
+def planner_stub(latency: float = 0.0) -> StubChatModel:
+    return StubChatModel(reply="08:00 Deep work\n10:00 Meetings", latency=latency)
@@ -1,104 +1,131 @@
+import asyncio
 from langgraph.graph import StateGraph
 from langchain_core.messages import SystemMessage, HumanMessage
 from .state import AgentState
 from .client import get_executor_llm, get_planner_llm
+from .history import HistoryManager
 from .prompts import EXECUTOR_SYSTEM_PROMPT, PLANNER_SYSTEM_PROMPT
-from m365_assistant.agent import state
+from ..core import tracing
+from ..services.serialization import tool_text
 from langchain_core.messages import ToolMessage
 
-def build_graph(mcp_tools):
+TRIAGE_TOOL = "triage_day"
 
-    executor_llm = get_executor_llm().bind_tools(mcp_tools)
-    planner_llm = get_planner_llm()
+
+def build_graph(mcp_tools, max_tool_concurrency: int = 4,
+                tool_timeout: float = 60.0, history_budget: int = 8000,
+                triage: bool = False, executor_llm=None, planner_llm=None):
+    """
+    With ``triage=True`` the context comes from the server's rule-based
+    triage_day tool instead of the executor model's tool loop.
+
+    executor_llm / planner_llm replace the Groq models, e.g. with a stub
+    in benchmarks.
+    """
+
+    tools_by_name = {tool.name: tool for tool in mcp_tools}
+
+    if triage and TRIAGE_TOOL not in tools_by_name:
+        raise ValueError(f"triage=True needs the {TRIAGE_TOOL!r} MCP tool")
+
+    if not triage:
+        executor_llm = (executor_llm or get_executor_llm()).bind_tools(mcp_tools)
+    planner_llm = planner_llm or get_planner_llm()
 
     graph = StateGraph(AgentState)
 
-    # Node 1 — Fetch Context
-    
+    async def run_tool_call(tool_call, semaphore: asyncio.Semaphore):
+        tool_name = tool_call["name"]
+        tool = tools_by_name.get(tool_name)
+
+        if tool is None:
+            return ToolMessage(
+                tool_call_id=tool_call["id"],
+                name=tool_name,
+                content=f"Error: unknown tool '{tool_name}'",
+                status="error",
+            )
+
+        async with semaphore:
+            try:
+                # wait_for cancels the call on timeout, so one hung tool
+                # cannot hold the whole turn.
+                with tracing.span(tool_name, kind="tool_call"):
+                    result = await asyncio.wait_for(
+                        tool.ainvoke(tool_call["args"]),
+                        timeout=tool_timeout,
+                    )
+            except asyncio.TimeoutError:
+                return ToolMessage(
+                    tool_call_id=tool_call["id"],
+                    name=tool_name,
+                    content=f"Error: {tool_name} timed out after {tool_timeout:g}s",
+                    status="error",
+                )
+            except Exception as exc:
+                return ToolMessage(
+                    tool_call_id=tool_call["id"],
+                    name=tool_name,
+                    content=f"Error: {tool_name} failed: {exc}",
+                    status="error",
+                )
 
+        return ToolMessage(
+            tool_call_id=tool_call["id"],
+            name=tool_name,
+            content=tool_text(result),
+        )
 
+    # Node 1 — Fetch Context
     async def fetch_context(state: AgentState):
 
         messages = [
             SystemMessage(content=EXECUTOR_SYSTEM_PROMPT),
             HumanMessage(content=state["user_input"])
         ]
+        semaphore = asyncio.Semaphore(max_tool_concurrency)
+        history = HistoryManager(budget=history_budget)
 
         while True:
 
-            response = await executor_llm.ainvoke(messages)
+            # Older tool results are trimmed once the loop outgrows the budget
+            messages = history.compact(messages)
+            response = await _call_model(executor_llm, messages, "executor")
 
             # No tool calls → finished
             if not response.tool_calls:
                 return {"fetched_context": response.content}
 
-            # Execute tool calls
-            for tool_call in response.tool_calls:
-
-                tool_name = tool_call["name"]
-                tool_args = tool_call["args"]
-
-                tool = next(t for t in mcp_tools if t.name == tool_name)
+            # Execute independent tool calls of this turn concurrently;
+            # gather keeps the ToolMessages in the original call order.
+            tool_messages = await asyncio.gather(
+                *(run_tool_call(tool_call, semaphore) for tool_call in response.tool_calls)
+            )
 
-                result = await tool.ainvoke(tool_args)
+            messages.append(response)
+            messages.extend(tool_messages)
 
-                messages.append(response)
-                messages.append(
-                    ToolMessage(
-                        tool_call_id=tool_call["id"],
-                        content=str(result),
-                    )
-                )
-
-    async def fetch_context(state: AgentState):
-
-        messages = state.get("messages", [])
-
-        # Add new user message
-        messages.append(HumanMessage(content=state["user_input"]))
-
-        while True:
-
-            response = await executor_llm.ainvoke(messages)
-
-            if not response.tool_calls:
-                messages.append(response)
-                return {
-                    "fetched_context": response.content,
-                    "messages": messages
-                }
-
-            for tool_call in response.tool_calls:
-
-                tool = next(t for t in mcp_tools if t.name == tool_call["name"])
-                result = await tool.ainvoke(tool_call["args"])
-
-                messages.append(response)
-                messages.append(
-                    ToolMessage(
-                        tool_call_id=tool_call["id"],
-                        content=str(result),
-                    )
-                )
+    # Node 1 (triage) — Fetch Context without the executor model
+    async def triage_context(state: AgentState):
+        with tracing.span(TRIAGE_TOOL, kind="tool_call"):
+            result = await asyncio.wait_for(
+                tools_by_name[TRIAGE_TOOL].ainvoke({}),
+                timeout=tool_timeout,
+            )
+        return {"fetched_context": tool_text(result)}
 
     # Node 2 — Create Routine
     async def create_schedule(state: AgentState):
-        response = await planner_llm.ainvoke([
+        response = await _call_model(planner_llm, [
             SystemMessage(content=PLANNER_SYSTEM_PROMPT),
             HumanMessage(content=state["fetched_context"])
-        ])
+        ], "planner")
 
         return {"final_schedule": response.content}
 
 
-        return {
-            "final_schedule": response.content,
-            "messages": messages
-        }
-
 
-
-    graph.add_node("fetch_context", fetch_context)
+    graph.add_node("fetch_context", triage_context if triage else fetch_context)
     graph.add_node("create_schedule", create_schedule)
 
     graph.set_entry_point("fetch_context")
@@ -109,3 +136,19 @@ def build_graph(mcp_tools):
 
 
     return graph.compile()
+
+
+async def _call_model(llm, messages, role: str):
+    with tracing.span(role, kind="llm") as span:
+        response = await llm.ainvoke(messages)
+
+        # Providers report usage as usage_metadata (input/output tokens)
+        usage = getattr(response, "usage_metadata", None) or {}
+        span.set(
+            model=response.response_metadata.get("model_name")
+            or getattr(llm, "model_name", None),
+            prompt_tokens=usage.get("input_tokens"),
+            completion_tokens=usage.get("output_tokens"),
+        )
+
+    return response
@@ -0,0 +1,186 @@
+import json
+import re
+from typing import Callable, Dict, List, Sequence
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from ..services.serialization import estimate_tokens
+
+# Fields of older tool results the executor still refers to: IDs to act
+# on and enough to recognise the item.
+KEEP_FIELDS = (
+    "id", "subject", "from", "receivedDateTime", "importance",
+    "start", "end", "status", "error",
+)
+
+ELIDED_MARK = "[elided]"
+PLACEHOLDER = f"{ELIDED_MARK} earlier result"
+
+
+class HistoryManager:
+    """
+    Keeps the executor's message list within a token budget.
+
+    The system prompt, the user's request and the last ``keep_rounds``
+    tool rounds stay verbatim. When the total is over ``budget`` tokens,
+    older tool results, oldest first, are reduced to ``KEEP_FIELDS``,
+    then to item IDs, and finally replaced by a one-line placeholder.
+    AIMessages are never dropped (their tool calls must stay paired with
+    results), but a repeated AIMessage is.
+    """
+
+    def __init__(
+        self,
+        budget: int = 8000,
+        keep_rounds: int = 1,
+        keep_fields: Sequence[str] = KEEP_FIELDS,
+        count_tokens: Callable[[str], int] = estimate_tokens,
+    ):
+        self.budget = budget
+        self.keep_rounds = keep_rounds
+        self.keep_fields = tuple(keep_fields)
+        self.count_tokens = count_tokens
+
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.elided = 0
+
+    def count(self, messages: Sequence[BaseMessage]) -> int:
+        return sum(self._message_tokens(message) for message in messages)
+
+    def compact(self, messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+        messages = _dedupe(messages)
+        total = self.count(messages)
+        self.tokens_in = total
+
+        if total > self.budget:
+            # Oldest results first; the most recent rounds are never touched
+            stale = _stale_tool_indexes(messages, self.keep_rounds)
+
+            for fields in (self.keep_fields, ("id",), None):
+                for index in stale:
+                    if total <= self.budget:
+                        break
+
+                    message = messages[index]
+                    replacement = self._shrink(message, fields)
+                    if replacement is None:
+                        continue
+
+                    total += self._message_tokens(replacement) - self._message_tokens(message)
+                    messages[index] = replacement
+                    self.elided += 1
+
+        self.tokens_out = total
+        return messages
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "elided": self.elided,
+        }
+
+    def _message_tokens(self, message: BaseMessage) -> int:
+        tokens = self.count_tokens(_text(message.content))
+
+        if isinstance(message, AIMessage) and message.tool_calls:
+            tokens += self.count_tokens(json.dumps(
+                [(call["name"], call["args"]) for call in message.tool_calls],
+                default=str,
+            ))
+
+        return tokens
+
+    def _shrink(self, message: ToolMessage, fields):
+        content = _text(message.content)
+        if content.startswith(PLACEHOLDER):
+            return None
+
+        if fields is None:
+            return _replace(
+                message,
+                f"{PLACEHOLDER} of {message.name or 'tool'} "
+                f"({self.count_tokens(content)} tokens) removed to save context",
+            )
+
+        trimmed = _keep_fields(content.removeprefix(f"{ELIDED_MARK} "), fields)
+        if trimmed is None or len(trimmed) + len(ELIDED_MARK) + 1 >= len(content):
+            return None
+
+        return _replace(message, f"{ELIDED_MARK} {trimmed}")
+
+
+def _dedupe(messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+    result = []
+    seen = set()
+
+    for message in messages:
+        if isinstance(message, AIMessage) and message.tool_calls:
+            key = tuple(call["id"] for call in message.tool_calls)
+            if key in seen:
+                continue
+            seen.add(key)
+
+        result.append(message)
+
+    return result
+
+
+def _stale_tool_indexes(messages: Sequence[BaseMessage], keep_rounds: int) -> List[int]:
+    rounds = [
+        index for index, message in enumerate(messages)
+        if isinstance(message, AIMessage) and message.tool_calls
+    ]
+    if len(rounds) <= keep_rounds:
+        return []
+
+    cutoff = rounds[-keep_rounds] if keep_rounds else len(messages)
+    return [
+        index for index, message in enumerate(messages[:cutoff])
+        if isinstance(message, ToolMessage)
+    ]
+
+
+def _keep_fields(content: str, fields: Sequence[str]):
+    # JSON from the read tools
+    try:
+        value = json.loads(content)
+    except ValueError:
+        value = None
+
+    if isinstance(value, dict):
+        value = {key: value[key] for key in fields if key in value}
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+    if isinstance(value, list) and all(isinstance(item, dict) for item in value):
+        value = [
+            {key: item[key] for key in fields if key in item} for item in value
+        ]
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+    # Pipe-separated rows (M365_TOOL_OUTPUT=rows)
+    lines = content.split("\n")
+    header = _cells(lines[0])
+    if len(lines) > 1 and "id" in header:
+        keep = [index for index, column in enumerate(header) if column in fields]
+        return "\n".join(
+            "|".join(cells[index] for index in keep if index < len(cells))
+            for cells in map(_cells, lines)
+        )
+
+    return None
+
+
+def _cells(line: str) -> List[str]:
+    # Cells escape a literal pipe as \|
+    return re.split(r"(?<!\\)\|", line)
+
+
+def _replace(message: ToolMessage, content: str) -> ToolMessage:
+    return message.model_copy(update={"content": content})
+
+
+def _text(content) -> str:
+    if isinstance(content, str):
+        return content
+
+    return json.dumps(content, separators=(",", ":"), default=str)
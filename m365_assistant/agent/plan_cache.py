@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import time
+from datetime import date
+from typing import Any, Dict, Optional
+from ..core.config import _env_flag
+from .prompts import EXECUTOR_SYSTEM_PROMPT, PLANNER_SYSTEM_PROMPT
+
+PLAN_CACHE_PATH = pathlib.Path.home() / ".m365_assistant.plans.db"
+
+# Plans older than this are dropped when a new one is stored
+KEEP_DAYS = 7
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    key TEXT PRIMARY KEY,
+    day TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    schedule TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    created REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS plan_stats (
+    name TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+# Prompts and pipeline mode are part of every key, so a prompt change
+# never serves a plan written under the old one
+_PROMPTS = hashlib.sha256(
+    (EXECUTOR_SYSTEM_PROMPT + PLANNER_SYSTEM_PROMPT).encode()
+).hexdigest()[:16]
+
+
+class PlanCache:
+    """
+    Daily plans keyed by what they were built from: the user's request,
+    the day, and the server's context_fingerprint (ids and changeKeys of
+    the emails and events in view). While none of those change, the
+    stored ``final_schedule`` is returned without running the executor
+    tool loop or the planner model.
+
+    Kept in SQLite so a plan pre-generated by ``m365-assistant plan`` is
+    served to the REPL, and hit/miss counters survive restarts.
+    """
+
+    def __init__(self, path: pathlib.Path | str = PLAN_CACHE_PATH):
+        self.path = path
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    @staticmethod
+    def open_default() -> Optional["PlanCache"]:
+        # M365_PLAN_CACHE=0 turns caching off
+        if not _env_flag("M365_PLAN_CACHE", True):
+            return None
+
+        return PlanCache(pathlib.Path(os.getenv("M365_PLAN_CACHE_PATH", str(PLAN_CACHE_PATH))))
+
+    def close(self):
+        self._db.close()
+
+    @staticmethod
+    def key(prompt: str, fingerprint: str, mode: str = "executor",
+            day: Optional[date] = None) -> str:
+        day = day or date.today()
+        # Case and spacing do not change what is being asked
+        prompt = " ".join(prompt.lower().split())
+        parts = (day.isoformat(), mode, _PROMPTS, fingerprint, prompt)
+        return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+    def get(self, key: str, count: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        The stored plan for ``key``, or None. Counted as a hit or a miss
+        unless ``count`` is False.
+        """
+
+        row = self._db.execute(
+            "SELECT schedule, seconds, created FROM plans WHERE key = ?", (key,),
+        ).fetchone()
+        plan = None if row is None else {
+            "final_schedule": row[0], "seconds": row[1], "created": row[2],
+        }
+
+        if count:
+            with self._db:
+                if plan is None:
+                    self._bump("misses")
+                else:
+                    self._db.execute("UPDATE plans SET hits = hits + 1 WHERE key = ?", (key,))
+                    self._bump("hits")
+                    # A hit saves the time it took to build the plan
+                    self._bump("saved_seconds", plan["seconds"])
+
+        return plan
+
+    def put(self, key: str, prompt: str, schedule: str, seconds: float,
+            pregenerated: bool = False, day: Optional[date] = None):
+        day = day or date.today()
+
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO plans (key, day, prompt, schedule, seconds, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, day.isoformat(), prompt, schedule, seconds, time.time()),
+            )
+            self._db.execute(
+                "DELETE FROM plans WHERE day < date(?, ?)",
+                (day.isoformat(), f"-{KEEP_DAYS} days"),
+            )
+            if pregenerated:
+                self._bump("pregenerated")
+
+    def stats(self) -> Dict[str, Any]:
+        counters = dict(self._db.execute("SELECT name, value FROM plan_stats"))
+        hits = int(counters.get("hits", 0))
+        misses = int(counters.get("misses", 0))
+        plans, built = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(seconds), 0) FROM plans"
+        ).fetchone()
+
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "saved_seconds": counters.get("saved_seconds", 0.0),
+            "pregenerated": int(counters.get("pregenerated", 0)),
+            "plans": plans,
+            "mean_build_seconds": built / plans if plans else 0.0,
+        }
+
+    def _bump(self, name: str, value: float = 1):
+        self._db.execute(
+            "INSERT INTO plan_stats (name, value) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+            (name, value),
+        )
@@ -1,44 +1,457 @@
 import asyncio
+import json
+import logging
+import os
+import pathlib
+import time
+from datetime import datetime, timedelta
+from datetime import time as clock_time
+from typing import Optional
 from langchain_mcp_adapters.client import MultiServerMCPClient
+from langchain_mcp_adapters.tools import load_mcp_tools
+from ..core import tracing
+from ..core.config import _env_flag
+from ..services.serialization import tool_text
 from .graph_builder import build_graph
+from .plan_cache import PlanCache
 
+logger = logging.getLogger(__name__)
 
-async def run_agent(user_input: str):
+SERVER_NAME = "m365"
+PROJECT_DIR = pathlib.Path(__file__).resolve().parents[2]
+
+# Cache key input from the server; kept from the executor model
+FINGERPRINT_TOOL = "context_fingerprint"
+
+# The request pre-generated each morning, and asked by an empty REPL line
+PLAN_PROMPT = os.getenv("M365_PLAN_PROMPT", "Plan my day")
 
-    client = MultiServerMCPClient(
-        {
-            "m365": {
-                "command": "uv",
-                "args": [
-                    "--directory",
-                    "D:\\LLMOPS_Projects\\m365_assistant",
-                    "run",
-                    "python",
-                    "-m",
-                    "m365_assistant.main"
-                ],
-                "transport": "stdio",
-            }
+
+def default_connections():
+    # A shared server started with --transport http, instead of a
+    # subprocess per runner
+    url = os.getenv("M365_MCP_URL")
+    if url:
+        connection = {"transport": "streamable_http", "url": url}
+        # The server maps this key to the accounts the runner may use
+        key = os.getenv("M365_MCP_KEY")
+        if key:
+            connection["headers"] = {"Authorization": f"Bearer {key}"}
+        return {SERVER_NAME: connection}
+
+    return {
+        SERVER_NAME: {
+            "command": "uv",
+            "args": [
+                "--directory",
+                os.getenv("M365_PROJECT_DIR", str(PROJECT_DIR)),
+                "run",
+                "python",
+                "-m",
+                "m365_assistant.main"
+            ],
+            "transport": "stdio",
         }
-    )
+    }
 
-    tools = await client.get_tools()
 
-    graph = build_graph(tools)
+class AgentRunner:
+    """
+    Keeps the MCP server session, its tools and the compiled agent graph
+    warm across requests.
 
-    result = await graph.ainvoke({
-    "user_input": user_input
-    })
+    The session is held open by a background task, so the runner can be
+    used from any task on the loop it was started on. Before each request
+    the session is pinged; if the server subprocess has died the runner
+    reconnects and rebuilds the graph.
 
+    With a ``plan_cache``, a request whose context fingerprint, day and
+    wording match a stored plan is answered from it, without the tool
+    loop or the planner model.
+    """
 
-    return result["final_schedule"]
+    def __init__(self, connections=None, plan_cache: Optional[PlanCache] = None,
+                 **graph_options):
+        self.connections = connections or default_connections()
+        self.graph_options = graph_options
+        self.plan_cache = plan_cache
 
+        self._client = MultiServerMCPClient(self.connections)
+        self._session = None
+        self._graph = None
+        self._session_task = None
+        self._stop = None
+        self._fingerprint_tool = None
+        self._lock = asyncio.Lock()
 
-# 🔥 ADD THIS PART
-if __name__ == "__main__":
-    user_input = input("What would you like to plan today? \n> ")
+        self.connects = 0
+        self.last_connect_seconds = 0.0
+
+    async def start(self):
+        async with self._lock:
+            if self._graph is None:
+                await self._connect()
+
+    async def close(self):
+        async with self._lock:
+            await self._disconnect()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def run_agent(self, user_input: str):
+        graph = await self._ensure_connected()
+
+        with tracing.span("run_agent", kind="agent") as span:
+            key = await self._plan_key(user_input)
+            cached = self.plan_cache.get(key) if key else None
+            span.set(plan_cache="off" if key is None else "hit" if cached else "miss")
+            if cached is not None:
+                return cached["final_schedule"]
+
+            start = time.perf_counter()
+            result = await graph.ainvoke({
+                "user_input": user_input
+            })
+
+            if key is not None:
+                self.plan_cache.put(key, user_input, result["final_schedule"],
+                                    time.perf_counter() - start)
+
+        return result["final_schedule"]
+
+    async def pregenerate(self, user_input: str = PLAN_PROMPT) -> bool:
+        """
+        Build and cache the plan for ``user_input`` unless the current
+        context already has one. Returns whether a plan was built.
+        """
+
+        if self.plan_cache is None:
+            raise RuntimeError("pregenerate needs a plan cache")
+
+        graph = await self._ensure_connected()
+
+        with tracing.span("pregenerate", kind="agent"):
+            key = await self._plan_key(user_input)
+            if key is None or self.plan_cache.get(key, count=False) is not None:
+                return False
+
+            start = time.perf_counter()
+            result = await graph.ainvoke({"user_input": user_input})
+            self.plan_cache.put(key, user_input, result["final_schedule"],
+                                time.perf_counter() - start, pregenerated=True)
+
+        return True
+
+    async def astream_run_agent(self, user_input: str):
+        """
+        Run the agent and yield progress events as they happen.
+
+        Yields dicts with a ``type`` of:
+        - ``tool_start`` / ``tool_end`` while fetch_context calls MCP tools
+        - ``token`` for each chunk the planner model streams
+        - ``done`` with ``final_schedule``, ``time_to_first_token``,
+          ``total_seconds`` and ``cached`` (served from the plan cache)
+        """
+
+        graph = await self._ensure_connected()
+
+        start = time.perf_counter()
+        first_token = None
+        tool_starts = {}
+        final_schedule = None
+
+        # One request id for the model calls and tool calls of this run
+        with tracing.span("run_agent", kind="agent") as span:
+            key = await self._plan_key(user_input)
+            cached = self.plan_cache.get(key) if key else None
+            span.set(plan_cache="off" if key is None else "hit" if cached else "miss")
+
+            if cached is not None:
+                yield {
+                    "type": "done",
+                    "final_schedule": cached["final_schedule"],
+                    "time_to_first_token": None,
+                    "total_seconds": time.perf_counter() - start,
+                    "cached": True,
+                    "saved_seconds": cached["seconds"],
+                }
+                return
+
+            async for event in graph.astream_events(
+                {"user_input": user_input},
+                version="v2",
+            ):
+                kind = event["event"]
+
+                if kind == "on_tool_start":
+                    tool_starts[event["run_id"]] = time.perf_counter()
+                    yield {
+                        "type": "tool_start",
+                        "name": event["name"],
+                        "args": event["data"].get("input"),
+                    }
+
+                elif kind == "on_tool_end":
+                    started = tool_starts.pop(event["run_id"], start)
+                    yield {
+                        "type": "tool_end",
+                        "name": event["name"],
+                        "seconds": time.perf_counter() - started,
+                    }
+
+                elif kind == "on_chat_model_stream":
+                    # Only the planner's tokens are user-facing
+                    if event["metadata"].get("langgraph_node") != "create_schedule":
+                        continue
+
+                    content = event["data"]["chunk"].content
+                    if not content:
+                        continue
+
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+
+                    yield {"type": "token", "content": content}
+
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    final_schedule = (event["data"].get("output") or {}).get("final_schedule")
+
+            if key is not None and final_schedule is not None:
+                self.plan_cache.put(key, user_input, final_schedule, time.perf_counter() - start)
+
+        yield {
+            "type": "done",
+            "final_schedule": final_schedule,
+            "time_to_first_token": first_token,
+            "total_seconds": time.perf_counter() - start,
+            "cached": False,
+        }
+
+    async def _plan_key(self, user_input: str) -> Optional[str]:
+        """
+        Plan cache key for this request, or None when there is no cache,
+        the server has no fingerprint tool, or it could not answer (e.g.
+        sign-in needed; the agent run then reports that).
+        """
+
+        if self.plan_cache is None or self._fingerprint_tool is None:
+            return None
+
+        try:
+            with tracing.span(FINGERPRINT_TOOL, kind="tool_call"):
+                result = json.loads(tool_text(await self._fingerprint_tool.ainvoke({})))
+        except Exception:
+            logger.warning("context_fingerprint failed; not using the plan cache", exc_info=True)
+            return None
+
+        fingerprint = result.get("fingerprint") if isinstance(result, dict) else None
+        if not fingerprint:
+            return None
+
+        mode = "triage" if self.graph_options.get("triage") else "executor"
+        return PlanCache.key(user_input, fingerprint, mode)
+
+    async def _ensure_connected(self):
+        async with self._lock:
+            if self._graph is not None and not await self._is_alive():
+                await self._disconnect()
+
+            if self._graph is None:
+                await self._connect()
+
+            return self._graph
 
-    output = asyncio.run(run_agent(user_input))
+    async def _is_alive(self) -> bool:
+        if self._session_task is None or self._session_task.done():
+            return False
 
-    print("\n\n📅 Generated Daily Routine:\n")
-    print(output)
+        try:
+            await asyncio.wait_for(self._session.send_ping(), timeout=5)
+        except Exception:
+            return False
+
+        return True
+
+    async def _connect(self):
+        start = time.perf_counter()
+
+        ready = asyncio.get_running_loop().create_future()
+        self._stop = asyncio.Event()
+        self._session_task = asyncio.create_task(self._hold_session(ready, self._stop))
+
+        try:
+            self._session, tools = await ready
+        except BaseException:
+            self._session_task = None
+            raise
+
+        self._fingerprint_tool = next(
+            (tool for tool in tools if tool.name == FINGERPRINT_TOOL), None
+        )
+        self._graph = build_graph(
+            [tool for tool in tools if tool.name != FINGERPRINT_TOOL],
+            **self.graph_options,
+        )
+
+        self.connects += 1
+        self.last_connect_seconds = time.perf_counter() - start
+
+    async def _disconnect(self):
+        if self._session_task is not None:
+            self._stop.set()
+            try:
+                await self._session_task
+            except Exception:
+                pass
+
+        self._session = None
+        self._graph = None
+        self._session_task = None
+        self._fingerprint_tool = None
+
+    async def _hold_session(self, ready: asyncio.Future, stop: asyncio.Event):
+        # The stdio transport must be entered and exited in the same task.
+        try:
+            async with self._client.session(SERVER_NAME) as session:
+                tools = await load_mcp_tools(session, server_name=SERVER_NAME)
+                ready.set_result((session, tools))
+                await stop.wait()
+        except Exception as exc:
+            if not ready.done():
+                ready.set_exception(exc)
+
+
+_default_runner = None
+
+
+async def run_agent(user_input: str):
+    global _default_runner
+
+    if _default_runner is None:
+        _default_runner = AgentRunner()
+
+    return await _default_runner.run_agent(user_input)
+
+
+async def astream_run_agent(user_input: str):
+    global _default_runner
+
+    if _default_runner is None:
+        _default_runner = AgentRunner()
+
+    async for event in _default_runner.astream_run_agent(user_input):
+        yield event
+
+
+async def plan_daily(runner: AgentRunner, at: clock_time, every: Optional[float] = None,
+                     prompt: str = PLAN_PROMPT):
+    """
+    Pre-generate the plan for ``prompt`` every day at ``at`` (local
+    time), so the first request of the morning is a cache hit. With
+    ``every`` minutes, later in the day the plan is checked again on that
+    interval and rebuilt only if the context fingerprint has changed.
+    """
+
+    while True:
+        now = datetime.now()
+        today = datetime.combine(now.date(), at)
+        next_run = today if today > now else today + timedelta(days=1)
+        if every and now >= today:
+            next_run = min(next_run, now + timedelta(minutes=every))
+
+        await asyncio.sleep((next_run - now).total_seconds())
+
+        try:
+            built = await runner.pregenerate(prompt)
+        except Exception:
+            logger.exception("Pre-generating the daily plan failed")
+        else:
+            logger.info("Daily plan %s", "built" if built else "unchanged")
+
+
+def parse_clock(value: str) -> clock_time:
+    # "07:30" → 07:30 local time
+    return clock_time.fromisoformat(value)
+
+
+async def repl():
+    # M365_TRACE / M365_TRACE_FILE, shared with the server subprocess
+    tracing.configure()
+
+    plan_cache = PlanCache.open_default()
+    planner = None
+
+    # M365_AGENT_TRIAGE=1 plans from the rule-based triage_day tool
+    async with AgentRunner(triage=_env_flag("M365_AGENT_TRIAGE"), plan_cache=plan_cache) as runner:
+        print(f"Connected to MCP server in {runner.last_connect_seconds:.2f}s "
+              "(paid once per session, not per request)")
+
+        # M365_PLAN_AT=07:30 pre-generates the morning plan while this runs
+        if plan_cache is not None and os.getenv("M365_PLAN_AT"):
+            planner = asyncio.create_task(plan_daily(
+                runner,
+                parse_clock(os.environ["M365_PLAN_AT"]),
+                float(os.getenv("M365_PLAN_EVERY", "0")) or None,
+            ))
+
+        while True:
+            try:
+                user_input = await asyncio.to_thread(
+                    input, f"\nWhat would you like to plan today? (Enter: {PLAN_PROMPT!r}) \n> "
+                )
+            except (EOFError, KeyboardInterrupt):
+                break
+
+            if user_input.strip().lower() in ("exit", "quit"):
+                break
+            if not user_input.strip():
+                user_input = PLAN_PROMPT
+
+            connects = runner.connects
+            streamed = False
+
+            print()
+            async for event in runner.astream_run_agent(user_input):
+                if event["type"] == "tool_start":
+                    print(f"🔧 {event['name']} {event['args'] or ''}", flush=True)
+
+                elif event["type"] == "tool_end":
+                    print(f"   ✓ {event['name']} ({event['seconds']:.2f}s)", flush=True)
+
+                elif event["type"] == "token":
+                    if not streamed:
+                        print("\n📅 Generated Daily Routine:\n")
+                        streamed = True
+                    print(event["content"], end="", flush=True)
+
+                elif event["type"] == "done":
+                    if not streamed:
+                        print("\n📅 Generated Daily Routine:\n")
+                        print(event["final_schedule"])
+
+                    if event["cached"]:
+                        print(f"\n\n⏱  cached plan in {event['total_seconds']:.2f}s "
+                              f"(built in {event['saved_seconds']:.2f}s; nothing has changed since)")
+                        continue
+
+                    warm = runner.connects == connects
+                    ttft = event["time_to_first_token"]
+                    ttft_text = f"{ttft:.2f}s" if ttft is not None else "n/a"
+                    print(f"\n\n⏱  first token {ttft_text} · total "
+                          f"{event['total_seconds']:.2f}s ({'warm' if warm else 'cold'})")
+
+        if planner is not None:
+            planner.cancel()
+
+    if plan_cache is not None:
+        plan_cache.close()
+
+
+# 🔥 ADD THIS PART
+if __name__ == "__main__":
+    asyncio.run(repl())
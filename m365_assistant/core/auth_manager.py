@@ -1,67 +1,251 @@
+import asyncio
 import pathlib
+import threading
 import msal
 from typing import Optional
 from .config import Settings
+from .token_holder import TokenHolder
+from .token_store import PersistentTokenCache, TokenStore, token_store_for
 
 CACHE_FILE = pathlib.Path.home() / ".m365_token_cache.json"
 SCOPES = ["https://graph.microsoft.com/.default"]
 
 
 class AuthManager:
-    def __init__(self, settings: Settings):
+    def __init__(
+        self,
+        settings: Settings,
+        cache_file: pathlib.Path = CACHE_FILE,
+        username: Optional[str] = None,
+        http_cache: Optional[dict] = None,
+        token_store: Optional[TokenStore] = None,
+        app=None,
+        authority: Optional[str] = None,
+    ):
         self.settings = settings
-        self._cache = msal.SerializableTokenCache()
-        self._pending_flow = None
+        self.cache_file = cache_file
+        # Picks the MSAL account when a cache holds several; None → first
+        self.username = username
 
-        if CACHE_FILE.exists():
-            self._cache.deserialize(CACHE_FILE.read_text())
+        # Device flow polled by a background thread; see _poll_device_flow
+        self._flow_lock = threading.Lock()
+        self._pending_flow = None
+        self._flow_error = None
+        # (loop, asyncio.Event) pairs in wait_for_sign_in, woken by the poller
+        self._flow_waiters = []
+
+        # Persists every token write as it happens and reloads only when
+        # another process changed the store.
+        self.token_store = token_store or token_store_for(
+            settings.token_cache_backend, cache_file
+        )
+        self._cache = PersistentTokenCache(self.token_store)
 
-        self._app = msal.PublicClientApplication(
+        # A shared http_cache lets many AuthManagers reuse one authority
+        # discovery instead of each hitting login.microsoftonline.com.
+        self._app = app or msal.PublicClientApplication(
             settings.client_id,
-            authority=settings.authority,
+            authority=authority or settings.authority,
             token_cache=self._cache,
+            http_cache=http_cache,
         )
 
-    def _save_cache(self):
-        if self._cache.has_state_changed:
-            CACHE_FILE.write_text(self._cache.serialize())
+        self._tokens = TokenHolder(self._acquire_silent)
 
-    def acquire_token(self):
-
-        accounts = self._app.get_accounts()
+    def _acquire_silent(self, force_refresh: bool = False):
+        accounts = self._app.get_accounts(username=self.username)
         account = accounts[0] if accounts else None
 
-        #  Try silent first
-        result = self._app.acquire_token_silent(SCOPES, account=account)
+        if account is None:
+            return None
 
-        if result and "access_token" in result:
-            return {"status": "success", "access_token": result["access_token"]}
+        return self._app.acquire_token_silent(
+            SCOPES,
+            account=account,
+            force_refresh=force_refresh,
+        )
 
-        #  If device flow already started → try completing it
-        if self._pending_flow:
-            result = self._app.acquire_token_by_device_flow(self._pending_flow)
+    def cached_token(self) -> Optional[str]:
+        """
+        The access token held in memory, or None. Never blocks, so it
+        may be called on the event loop.
+        """
+        return self._tokens.peek()
 
-            if "access_token" in result:
-                self._pending_flow = None
-                self._save_cache()
-                return {"status": "success", "access_token": result["access_token"]}
+    def token_stats(self):
+        """
+        Hit/refresh counters of the in-memory access-token holder.
+        """
+        return self._tokens.stats()
 
+    def acquire_token(self):
+        """
+        Return a token without blocking on user sign-in.
+
+        While a device flow is waiting for the user this returns
+        ``authentication_pending`` immediately; a background thread
+        completes the flow and later calls find the token in memory.
+        """
+
+        #  Try the in-memory token first, then silent MSAL refresh
+        access_token = self._tokens.get()
+
+        if access_token:
+            return {"status": "success", "access_token": access_token}
+
+        with self._flow_lock:
+
+            #  Device flow already started → still waiting for the user
+            if self._pending_flow:
+                flow = self._pending_flow
+                return {
+                    "status": "authentication_pending",
+                    "verification_uri": flow["verification_uri"],
+                    "user_code": flow["user_code"],
+                    "message": "Authentication still pending. Please complete login."
+                }
+
+            # Worker processes do not share a pending flow, so the user's
+            # next call could not find it; sign in with the CLI instead
+            if self.settings.workers > 1:
+                command = "m365-assistant login"
+                if self.username:
+                    command += f" --account {self.username}"
+                return {
+                    "status": "authentication_required",
+                    "message": "Not signed in. This server runs several worker "
+                               "processes and cannot complete a device sign-in; "
+                               f"run `{command}` first, then call the tool again."
+                }
+
+            #  Start new device flow
+            return self._start_device_flow()
+
+    async def wait_for_sign_in(self, timeout: float):
+        """
+        Wait until the pending device flow finishes (or ``timeout``
+        passes) and report how it ended. Holds no thread while waiting:
+        the polling thread wakes the event loop. Never starts a flow.
+        """
+
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+
+        with self._flow_lock:
+            flow = self._pending_flow
+
+            if flow is None:
+                message = "No sign-in is in progress; tools start one when it is needed."
+                if self._flow_error:
+                    message = f"No sign-in is in progress; the last one failed ({self._flow_error})."
+                return {"status": "no_sign_in_pending", "message": message}
+
+            self._flow_waiters.append(waiter)
+
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            with self._flow_lock:
+                if waiter in self._flow_waiters:
+                    self._flow_waiters.remove(waiter)
             return {
                 "status": "authentication_pending",
+                "verification_uri": flow["verification_uri"],
+                "user_code": flow["user_code"],
                 "message": "Authentication still pending. Please complete login."
             }
 
-        #  Start new device flow
+        with self._flow_lock:
+            error = self._flow_error
+
+        if error:
+            return {
+                "status": "authentication_failed",
+                "message": f"Sign-in failed ({error}). Call the tool again to retry."
+            }
+
+        return {"status": "success", "message": "Signed in."}
+
+    def cancel_device_flow(self):
+        with self._flow_lock:
+            if self._pending_flow:
+                # MSAL stops polling once the flow has expired
+                self._pending_flow["expires_at"] = 0
+
+    def _start_device_flow(self):
         flow = self._app.initiate_device_flow(scopes=SCOPES)
 
         if "user_code" not in flow:
             raise RuntimeError("Failed to initiate device flow")
 
+        previous_error = self._flow_error
         self._pending_flow = flow
+        self._flow_error = None
+        self._flow_waiters = []
+
+        threading.Thread(
+            target=self._poll_device_flow,
+            args=(flow,),
+            name="m365-device-flow",
+            daemon=True,
+        ).start()
+
+        message = "Please authenticate, then call the tool again."
+        if previous_error:
+            message = f"Previous sign-in failed ({previous_error}). {message}"
 
         return {
             "status": "authentication_required",
             "verification_uri": flow["verification_uri"],
             "user_code": flow["user_code"],
-            "message": "Please authenticate, then call the tool again."
+            "message": message
         }
+
+    def _poll_device_flow(self, flow):
+        # Blocks until the user signs in, declines or the code expires
+        try:
+            result = self._app.acquire_token_by_device_flow(flow)
+        except Exception as exc:
+            result = {"error": type(exc).__name__, "error_description": str(exc)}
+
+        mismatch = self._wrong_account(result)
+        stored = mismatch is None and self._tokens.store(result)
+
+        waiters = []
+
+        with self._flow_lock:
+            if self._pending_flow is flow:
+                self._pending_flow = None
+                waiters, self._flow_waiters = self._flow_waiters, []
+                if not stored:
+                    error = (mismatch or result.get("error_description")
+                             or result.get("error") or "unknown error")
+                    self._flow_error = error.splitlines()[0]
+
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # That caller's loop has closed
+                pass
+
+    def _wrong_account(self, result) -> Optional[str]:
+        """
+        Why a device-flow result does not belong to ``username``, or None.
+
+        The username selects the MSAL account for silent refresh; a token
+        for anyone else would never be found again and every call would
+        start a new sign-in. Such an account is dropped from the cache.
+        """
+
+        if not self.username or not result or "access_token" not in result:
+            return None
+
+        if self._app.get_accounts(username=self.username):
+            return None
+
+        signed_in = (result.get("id_token_claims") or {}).get("preferred_username")
+        for account in self._app.get_accounts(username=signed_in) if signed_in else []:
+            self._app.remove_account(account)
+
+        return f"signed in as {signed_in or 'another account'}, expected {self.username}"
@@ -1,16 +1,142 @@
 import os
+import pathlib
 from dataclasses import dataclass
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
+def _env_flag(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+
+    if value is None:
+        return default
+
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_list(name: str, default: tuple) -> tuple:
+    value = os.getenv(name)
+
+    if not value:
+        return default
+
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+
+def _env_pairs(name: str) -> tuple:
+    # "a=x,b=y" → (("a", "x"), ("b", "y"))
+    return tuple(
+        tuple(part.strip() for part in item.split("=", 1))
+        for item in _env_list(name, ())
+        if "=" in item
+    )
+
+
+LOGIN_URL = "https://login.microsoftonline.com"
+
+
+def authority_for(tenant: str) -> str:
+    """
+    MSAL authority of a tenant: its ID, a verified domain, or one of
+    ``common``, ``organizations`` and ``consumers``.
+    """
+
+    return f"{LOGIN_URL}/{tenant}"
+
+
+# Fields requested by the list tools unless overridden
+MAIL_SELECT = (
+    "id", "subject", "from", "receivedDateTime",
+    "importance", "flag", "isRead", "bodyPreview",
+)
+EVENT_SELECT = (
+    "id", "subject", "start", "end", "location",
+    "organizer", "isAllDay", "showAs", "isCancelled",
+)
+
+
 @dataclass(frozen=True)
 class Settings:
     client_id: str
     authority: str
     graph_base_url: str = "https://graph.microsoft.com/v1.0"
 
+    # HTTP connection pool
+    http_timeout: float = 30.0
+    http_max_connections: int = 100
+    http_max_keepalive: int = 20
+    http_keepalive_expiry: float = 30.0
+    http2: bool = False
+
+    # Request scheduler (see core/scheduler.py for the Graph limits)
+    graph_max_concurrency: int = 16
+    graph_mailbox_concurrency: int = 4
+    graph_max_retries: int = 5
+
+    # HTTP server worker processes (set by serve). Each worker gets its
+    # share of the limits above and cannot run a device sign-in.
+    workers: int = 1
+
+    # GET response cache size in bytes (0 disables it)
+    response_cache_bytes: int = 32 * 1024 * 1024
+
+    # Items requested per page when walking @odata.nextLink
+    graph_page_size: int = 50
+
+    # $select projections for list endpoints
+    mail_select: tuple = MAIL_SELECT
+    event_select: tuple = EVENT_SELECT
+
+    # How read tools render results for the model: "json" or "rows"
+    tool_output: str = "json"
+    tool_text_limit: int = 2000
+
+    # Local delta-synced store serving the list tools
+    local_store: bool = True
+    store_path: pathlib.Path = pathlib.Path.home() / ".m365_assistant.db"
+    sync_mail_days: int = 30
+    sync_calendar_days: int = 30
+
+    # Working hours for find_free_slots, in time_zone (IANA name)
+    time_zone: str = "UTC"
+    working_hours: str = "09:00-17:00"
+    working_days: tuple = ("mon", "tue", "wed", "thu", "fri")
+
+    # Token cache persistence: "file" or "sqlite" (see core/token_store.py)
+    token_cache_backend: str = "file"
+
+    # Account pool (see services/accounts.py)
+    default_account: str = "default"
+    max_accounts: int = 500
+    # JSON file granting HTTP callers their accounts (see AccountAccess);
+    # None serves only default_account
+    account_keys_file: Optional[pathlib.Path] = None
+    # (account, tenant) pairs for accounts that sign in somewhere other
+    # than ``authority``
+    account_tenants: tuple = ()
+
+    # Where download_attachment writes and where attachments to send are
+    # read from; tools cannot reach files outside it
+    attachment_dir: pathlib.Path = pathlib.Path.home() / "Downloads" / "m365_assistant"
+
+    # Tracing: "off" or any of "jsonl", "otel", "prometheus" (see core/tracing.py)
+    trace: str = "off"
+    trace_file: pathlib.Path = pathlib.Path.home() / ".m365_assistant.traces.jsonl"
+
+    def authority_for(self, account: str) -> str:
+        """
+        The authority ``account`` signs in with: its own tenant from
+        ``account_tenants``, else ``authority``.
+        """
+
+        for name, tenant in self.account_tenants:
+            if name.lower() == account.lower():
+                return authority_for(tenant)
+
+        return self.authority
+
     @staticmethod
     def load() -> "Settings":
         client_id = os.getenv("MICROSOFT_CLIENT_ID")
@@ -20,6 +146,59 @@ class Settings:
 
         return Settings(
             client_id=client_id,
-            # you can use your own tenat id or 'common' for multi-tenant
-            authority="https://login.microsoftonline.com/common",
+            # A tenant ID or domain, or 'common' for multi-tenant
+            authority=authority_for(os.getenv("M365_TENANT", "common")),
+            graph_base_url=os.getenv(
+                "M365_GRAPH_BASE_URL", "https://graph.microsoft.com/v1.0"
+            ),
+            http_timeout=float(os.getenv("M365_HTTP_TIMEOUT", "30")),
+            http_max_connections=int(os.getenv("M365_HTTP_MAX_CONNECTIONS", "100")),
+            http_max_keepalive=int(os.getenv("M365_HTTP_MAX_KEEPALIVE", "20")),
+            http_keepalive_expiry=float(
+                os.getenv("M365_HTTP_KEEPALIVE_EXPIRY", "30")
+            ),
+            http2=_env_flag("M365_HTTP2"),
+            graph_max_concurrency=int(os.getenv("M365_GRAPH_MAX_CONCURRENCY", "16")),
+            graph_mailbox_concurrency=int(
+                os.getenv("M365_GRAPH_MAILBOX_CONCURRENCY", "4")
+            ),
+            graph_max_retries=int(os.getenv("M365_GRAPH_MAX_RETRIES", "5")),
+            workers=int(os.getenv("M365_WORKERS", "1")),
+            response_cache_bytes=int(
+                os.getenv("M365_RESPONSE_CACHE_BYTES", str(32 * 1024 * 1024))
+            ),
+            graph_page_size=int(os.getenv("M365_GRAPH_PAGE_SIZE", "50")),
+            mail_select=_env_list("M365_MAIL_SELECT", MAIL_SELECT),
+            event_select=_env_list("M365_EVENT_SELECT", EVENT_SELECT),
+            tool_output=os.getenv("M365_TOOL_OUTPUT", "json"),
+            tool_text_limit=int(os.getenv("M365_TOOL_TEXT_LIMIT", "2000")),
+            local_store=_env_flag("M365_LOCAL_STORE", True),
+            store_path=pathlib.Path(os.getenv(
+                "M365_STORE_PATH",
+                str(pathlib.Path.home() / ".m365_assistant.db"),
+            )),
+            sync_mail_days=int(os.getenv("M365_SYNC_MAIL_DAYS", "30")),
+            sync_calendar_days=int(os.getenv("M365_SYNC_CALENDAR_DAYS", "30")),
+            time_zone=os.getenv("M365_TIME_ZONE", "UTC"),
+            working_hours=os.getenv("M365_WORKING_HOURS", "09:00-17:00"),
+            working_days=_env_list(
+                "M365_WORKING_DAYS", ("mon", "tue", "wed", "thu", "fri")
+            ),
+            token_cache_backend=os.getenv("M365_TOKEN_CACHE_BACKEND", "file"),
+            default_account=os.getenv("M365_DEFAULT_ACCOUNT", "default"),
+            max_accounts=int(os.getenv("M365_MAX_ACCOUNTS", "500")),
+            account_keys_file=(
+                pathlib.Path(os.environ["M365_ACCOUNT_KEYS_FILE"])
+                if os.getenv("M365_ACCOUNT_KEYS_FILE") else None
+            ),
+            account_tenants=_env_pairs("M365_ACCOUNT_TENANTS"),
+            attachment_dir=pathlib.Path(os.getenv(
+                "M365_ATTACHMENT_DIR",
+                str(pathlib.Path.home() / "Downloads" / "m365_assistant"),
+            )),
+            trace=os.getenv("M365_TRACE", "off"),
+            trace_file=pathlib.Path(os.getenv(
+                "M365_TRACE_FILE",
+                str(pathlib.Path.home() / ".m365_assistant.traces.jsonl"),
+            )),
         )
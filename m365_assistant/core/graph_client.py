@@ -1,32 +1,638 @@
+import asyncio
+import functools
+import json as jsonlib
+import os
+import pathlib
 import httpx
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, AsyncIterator
 from .auth_manager import AuthManager
 from .config import Settings
+from .response_cache import ResponseCache, affected_prefixes
+from .scheduler import MAILBOX_BURST, MAILBOX_RATE, RequestScheduler, parse_retry_after
+from . import tracing
+
+# Graph accepts at most 20 sub-requests per JSON batch envelope.
+BATCH_LIMIT = 20
+BATCH_MAX_RETRIES = 3
+
+# Streamed transfers hold one chunk in memory at a time. Upload session
+# ranges must be multiples of 320 KiB (and at most 60 MiB).
+DOWNLOAD_CHUNK = 1024 * 1024
+UPLOAD_CHUNK = 10 * 320 * 1024
+DOWNLOAD_MAX_RESUMES = 3
+
+
+class AuthenticationRequired(PermissionError):
+    """
+    A request was made without a token. ``result`` holds the sign-in
+    instructions from AuthManager.acquire_token.
+    """
+
+    def __init__(self, result: Dict[str, Any]):
+        super().__init__(result.get("message", "Not authenticated"))
+        self.result = result
+
+
+def returns_sign_in(method):
+    """
+    Make a service method return the sign-in instructions instead of
+    raising when one of its requests needs the user to sign in.
+    """
+
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await method(*args, **kwargs)
+        except AuthenticationRequired as exc:
+            return exc.result
+
+    return wrapper
 
 
 class GraphClient:
-    def __init__(self, auth: AuthManager, settings: Settings):
+    def __init__(
+        self,
+        auth: AuthManager,
+        settings: Settings,
+        mailbox: str = "me",
+        http: Optional[httpx.AsyncClient] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        cache: Optional[ResponseCache] = None,
+    ):
         self.auth = auth
         self.settings = settings
-        self._client = httpx.Client(timeout=30)
+        # Throttling budget and cache key; Graph limits apply per mailbox.
+        self.mailbox = mailbox
+
+        # Pooled clients (see AccountRegistry) share these across accounts
+        self._owns_http = http is None
+        self._client = http or new_http_client(settings)
+        self._scheduler = scheduler or new_scheduler(settings)
+        self._cache = cache or new_response_cache(settings)
+
+    async def _headers(self):
+        # A token held in memory is served on the loop; only a miss goes
+        # to MSAL, which is blocking, on a worker thread.
+        token = self.auth.cached_token()
+
+        if token is None:
+            with tracing.span("acquire_token", kind="auth") as span:
+                result = await asyncio.to_thread(self.auth.acquire_token)
+                span.set(status=result["status"])
 
-    def _headers(self):
-        result = self.auth.acquire_token()
+            if result["status"] != "success":
+                return result
 
-        if result["status"] != "success":
-            return result
+            token = result["access_token"]
 
         return {
             "status": "success",
-            "Authorization": f"Bearer {result['access_token']}"
+            "Authorization": f"Bearer {token}"
         }
 
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        json: Optional[Any] = None,
+        headers: Optional[Dict[str, str]] = None,
+        stream: bool = False,
+    ) -> httpx.Response:
+        """
+        Send one Graph request through the scheduler.
+
+        With ``stream=True`` the body is left unread; the caller iterates it
+        and must close the response.
+        """
+
+        url = path if path.startswith("http") else f"{self.settings.graph_base_url}{path}"
+
+        # Named by endpoint (IDs templated out) so stats group per route;
+        # with tracing off the shared no-op span needs no name at all
+        span = tracing.NOOP
+        if tracing.enabled():
+            span = tracing.span(
+                f"{method} {tracing.path_template(self._path(url))}", kind="graph", method=method,
+            )
+
+        with span:
+            auth_headers = await self._headers()
+
+            if auth_headers.get("status") != "success":
+                raise AuthenticationRequired(auth_headers)
+
+            request_headers = {"Authorization": auth_headers["Authorization"]}
+            if headers:
+                request_headers.update(headers)
+
+            response = await self._scheduler.send(
+                self.mailbox,
+                method,
+                lambda: self._client.send(
+                    self._client.build_request(
+                        method,
+                        url,
+                        params=params,
+                        json=json,
+                        headers=request_headers,
+                    ),
+                    stream=stream,
+                ),
+            )
+            span.set(status=response.status_code, bytes=response.num_bytes_downloaded)
+
+            if method != "GET":
+                self._cache.invalidate(self.mailbox, affected_prefixes(self._path(url)))
+
+            # 304 answers a conditional GET and is handled by the caller
+            if response.status_code == 304 and "If-None-Match" in request_headers:
+                return response
+
+            if stream and response.is_error:
+                # Error bodies are small; read them so the connection is freed
+                await response.aread()
+
+            response.raise_for_status()
+            return response
+
+    async def _get_json(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        """
+        GET through the response cache, revalidating with ETags when stale.
+        """
+
+        ttl = self._cache.ttl_for(self._path(path))
+        if not ttl:
+            response = await self._request("GET", path, params=params, headers=headers)
+            return response.json()
+
+        key = "\n".join((
+            self.mailbox,
+            path,
+            jsonlib.dumps(params or {}, sort_keys=True, default=str),
+            (headers or {}).get("Prefer", ""),
+        ))
+        entry = self._cache.lookup(key)
+
+        if entry is not None and self._cache.is_fresh(entry):
+            self._cache.record_hit(entry)
+            return jsonlib.loads(entry.body)
+
+        request_headers = dict(headers or {})
+        if entry is not None and entry.etag:
+            request_headers["If-None-Match"] = entry.etag
+
+        response = await self._request("GET", path, params=params, headers=request_headers)
+
+        if response.status_code == 304 and entry is not None:
+            self._cache.refresh(entry, ttl)
+            self._cache.record_hit(entry, revalidated=True)
+            return jsonlib.loads(entry.body)
 
-    def get(self, path: str, params: Optional[Dict[str, Any]] = None):
-        response = self._client.get(
-            f"{self.settings.graph_base_url}{path}",
-            headers=self._headers(),
-            params=params,
+        self._cache.record_miss()
+        self._cache.put(
+            key,
+            self.mailbox,
+            self._path(path),
+            response.content,
+            response.headers.get("ETag"),
+            ttl,
         )
-        response.raise_for_status()
         return response.json()
+
+    def _path(self, url: str) -> str:
+        return url.removeprefix(self.settings.graph_base_url).split("?", 1)[0]
+
+    def metrics(self) -> Dict[str, int]:
+        """
+        Request scheduler counters (queued, in-flight, throttled, retried...).
+        """
+        return self._scheduler.metrics()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Response cache counters (hits, hit rate, bytes saved...).
+        """
+        return self._cache.stats()
+
+    async def get(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        return await self._get_json(path, params=params, headers=headers)
+
+    async def paginate(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        page_size: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield items of a Graph collection, following @odata.nextLink.
+
+        Only one page is held in memory at a time, and no further page is
+        requested once ``limit`` items have been yielded.
+        """
+
+        page_size = page_size or self.settings.graph_page_size
+        if limit is not None:
+            if limit <= 0:
+                return
+            page_size = min(page_size, limit)
+
+        params = dict(params or {})
+        params["$top"] = page_size
+        headers = {"Prefer": f"odata.maxpagesize={page_size}"}
+
+        url: Optional[str] = path
+        yielded = 0
+
+        while url:
+            page = await self._get_json(url, params=params, headers=headers)
+
+            for item in page.get("value", []):
+                yield item
+                yielded += 1
+
+                if limit is not None and yielded >= limit:
+                    return
+
+            # nextLink already carries the full query string
+            url = page.get("@odata.nextLink")
+            params = None
+
+    async def post(self, path: str, json: Optional[Any] = None):
+        response = await self._request("POST", path, json=json)
+        return _json_or_none(response)
+
+    async def patch(self, path: str, json: Optional[Any] = None):
+        response = await self._request("PATCH", path, json=json)
+        return _json_or_none(response)
+
+    async def delete(self, path: str):
+        response = await self._request("DELETE", path)
+        return _json_or_none(response)
+
+    async def batch(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Send sub-requests through Graph JSON batching.
+
+        Each request is a dict with ``method``, ``url`` (relative to the
+        API version, e.g. ``/me/messages/{id}``) and optional ``body``.
+        Requests are packed into envelopes of up to 20 which are sent
+        concurrently, with their position as sub-request id, so the same
+        URL may appear twice. Sub-requests throttled with 429 are retried
+        after the longest ``Retry-After`` seen. Returns the sub-responses
+        (``status``, ``headers``, ``body``) in request order; when a whole
+        envelope fails, each of its requests gets that error instead.
+        """
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+        pending = [_batch_request(str(index), request) for index, request in enumerate(requests)]
+
+        for attempt in range(BATCH_MAX_RETRIES + 1):
+            envelopes = [
+                pending[i:i + BATCH_LIMIT]
+                for i in range(0, len(pending), BATCH_LIMIT)
+            ]
+            responses = await asyncio.gather(
+                *(self.post("/$batch", json={"requests": envelope}) for envelope in envelopes),
+                return_exceptions=True,
+            )
+
+            throttled = []
+            retry_after = 0.0
+
+            for envelope, response in zip(envelopes, responses):
+                if isinstance(response, BaseException):
+                    # Sign-in is reported once for the call, not per item
+                    if not isinstance(response, Exception) or \
+                            isinstance(response, AuthenticationRequired):
+                        raise response
+                    for request in envelope:
+                        results[int(request["id"])] = _envelope_error(response)
+                    continue
+
+                by_id = {request["id"]: request for request in envelope}
+                for sub in (response or {}).get("responses", []):
+                    if sub.get("status") == 429 and attempt < BATCH_MAX_RETRIES:
+                        throttled.append(by_id[sub["id"]])
+                        retry_after = max(retry_after, _retry_after(sub))
+                    else:
+                        results[int(sub["id"])] = sub
+
+            if not throttled:
+                break
+
+            pending = throttled
+            await asyncio.sleep(retry_after or 2 ** attempt)
+
+        # Graph answers every sub-request; anything missing is reported too
+        return [
+            result if result is not None else {
+                "status": 0,
+                "body": {"error": {"code": "noResponse", "message": "No response in the batch"}},
+            }
+            for result in results
+        ]
+
+    async def download(
+        self,
+        path: str,
+        dest: pathlib.Path,
+        chunk_size: int = DOWNLOAD_CHUNK,
+    ) -> int:
+        """
+        Stream a binary resource (e.g. an attachment's ``/$value``) to ``dest``.
+
+        The body goes to ``dest.part`` one chunk at a time, so memory stays
+        at one chunk whatever the size, and is moved to ``dest`` once
+        complete; an existing ``dest`` is never overwritten (FileExistsError).
+        ``dest.part.json`` records which resource the part holds and its
+        validator. A connection dropped midway, or a part left by an
+        earlier call for the same resource, is resumed with a Range request
+        and ``If-Range``; a part of another resource, or a full 200 answer
+        to the Range request, starts the file over. Returns the size in bytes.
+        """
+
+        if dest.exists():
+            raise FileExistsError(f"{dest} already exists")
+
+        partial, record = partial_files(dest)
+
+        state = _read_record(record)
+        if state.get("resource") != path:
+            partial.unlink(missing_ok=True)
+            state = {"resource": path}
+
+        with tracing.span("download", kind="transfer") as span:
+            for attempt in range(DOWNLOAD_MAX_RESUMES + 1):
+                offset = partial.stat().st_size if partial.exists() else 0
+                try:
+                    await self._receive(path, partial, record, state, offset, chunk_size)
+                    break
+                except httpx.HTTPStatusError as exc:
+                    # Range past the end: the partial file is not this resource
+                    if exc.response.status_code != 416 or attempt == DOWNLOAD_MAX_RESUMES:
+                        raise
+                    partial.unlink()
+                except httpx.TransportError:
+                    if attempt == DOWNLOAD_MAX_RESUMES:
+                        raise
+                    span.add("resumes")
+
+            _move_new(partial, dest)
+            record.unlink(missing_ok=True)
+            size = dest.stat().st_size
+            span.set(bytes=size)
+
+        return size
+
+    async def _receive(self, path: str, partial: pathlib.Path, record: pathlib.Path,
+                       state: Dict[str, Any], offset: int, chunk_size: int):
+        headers = {}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            # The server sends the whole body instead if the resource changed
+            if state.get("validator"):
+                headers["If-Range"] = state["validator"]
+
+        response = await self._request("GET", path, headers=headers or None, stream=True)
+        restart = False
+
+        try:
+            if response.status_code == 206:
+                # Only a range continuing the part on disk can be appended
+                restart = bool(offset) and not response.headers.get(
+                    "Content-Range", "").startswith(f"bytes {offset}-")
+                append = bool(offset) and not restart
+            else:
+                # A 200 is the whole resource: the part on disk is dropped
+                append = False
+                state["validator"] = _validator(response)
+                _write_record(record, state)
+
+            if not restart:
+                with open(partial, "ab" if append else "wb") as file:
+                    async for chunk in response.aiter_bytes(chunk_size):
+                        await asyncio.to_thread(file.write, chunk)
+        finally:
+            await response.aclose()
+
+        if restart:
+            partial.unlink(missing_ok=True)
+            await self._receive(path, partial, record, state, 0, chunk_size)
+
+    async def upload(
+        self,
+        upload_url: str,
+        source: pathlib.Path,
+        chunk_size: int = UPLOAD_CHUNK,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Send a file through a Graph upload session, one byte range per PUT.
+
+        Graph takes the ranges of a session in order, so one file's chunks
+        go one after another, with the next chunk read from disk while the
+        current one is on the wire; callers upload several files side by
+        side. Memory stays at two chunks. The upload URL is pre-authorised
+        and must not carry the bearer token.
+        """
+
+        size = source.stat().st_size
+
+        with tracing.span("upload", kind="transfer", bytes=size), open(source, "rb") as file:
+            offset = 0
+            chunk = await asyncio.to_thread(_read_at, file, offset, chunk_size)
+
+            while True:
+                end = offset + len(chunk)
+                ahead = None
+                if end < size:
+                    ahead = asyncio.create_task(
+                        asyncio.to_thread(_read_at, file, end, chunk_size)
+                    )
+
+                try:
+                    response = await self._put_range(upload_url, chunk, offset, size)
+                    response.raise_for_status()
+                except BaseException:
+                    if ahead is not None:
+                        await asyncio.gather(ahead, return_exceptions=True)
+                    raise
+
+                result = _json_or_none(response)
+                # 201 ends the session; until then Graph names the next range it wants
+                expected = (result or {}).get("nextExpectedRanges")
+                if response.status_code == 201 or not expected:
+                    if ahead is not None:
+                        await asyncio.gather(ahead, return_exceptions=True)
+                    return result
+
+                next_offset = int(expected[0].split("-", 1)[0])
+                if ahead is not None:
+                    chunk = await ahead
+                if next_offset != end or ahead is None:
+                    chunk = await asyncio.to_thread(_read_at, file, next_offset, chunk_size)
+                offset = next_offset
+
+    async def _put_range(self, upload_url: str, chunk: bytes, offset: int,
+                         size: int) -> httpx.Response:
+        headers = {
+            "Content-Length": str(len(chunk)),
+            "Content-Range": f"bytes {offset}-{offset + len(chunk) - 1}/{size}",
+        }
+
+        # Sent from an iterator rather than as bytes: the request sits in a
+        # reference cycle with its response, which would keep every chunk
+        # alive until the garbage collector happens to run
+        return await self._scheduler.send(
+            self.mailbox,
+            "PUT",
+            lambda: self._client.put(upload_url, content=_once(chunk), headers=headers),
+        )
+
+    async def aclose(self):
+        if self._owns_http:
+            await self._client.aclose()
+
+
+def new_http_client(settings: Settings) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=settings.http_timeout,
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        ),
+        http2=settings.http2 and _h2_available(),
+    )
+
+
+def new_scheduler(settings: Settings, mailbox_rate: float = MAILBOX_RATE) -> RequestScheduler:
+    # Every worker process has its own scheduler, so each gets an equal
+    # share of the limits and together they stay within them
+    workers = max(1, settings.workers)
+
+    return RequestScheduler(
+        max_concurrency=max(1, settings.graph_max_concurrency // workers),
+        mailbox_concurrency=max(1, settings.graph_mailbox_concurrency // workers),
+        mailbox_rate=mailbox_rate / workers,
+        mailbox_burst=max(1.0, MAILBOX_BURST / workers),
+        max_retries=settings.graph_max_retries,
+    )
+
+
+def new_response_cache(settings: Settings) -> ResponseCache:
+    # Another worker's write cannot invalidate this process's entries, so
+    # with several workers every hit is revalidated with its ETag
+    return ResponseCache(
+        max_bytes=settings.response_cache_bytes,
+        always_revalidate=settings.workers > 1,
+    )
+
+
+def _json_or_none(response: httpx.Response):
+    # Graph answers most actions with 202/204 and an empty body.
+    if not response.content:
+        return None
+    return response.json()
+
+
+async def _once(chunk: bytes):
+    yield chunk
+
+
+def partial_files(dest: pathlib.Path):
+    """
+    The ``.part`` file a download to ``dest`` writes and the record of
+    the resource it holds.
+    """
+    return dest.with_name(dest.name + ".part"), dest.with_name(dest.name + ".part.json")
+
+
+def partial_resource(dest: pathlib.Path) -> Optional[str]:
+    """
+    The resource an unfinished download to ``dest`` belongs to, if any.
+    """
+    return _read_record(partial_files(dest)[1]).get("resource")
+
+
+def _read_record(record: pathlib.Path) -> Dict[str, Any]:
+    try:
+        return jsonlib.loads(record.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_record(record: pathlib.Path, state: Dict[str, Any]):
+    record.write_text(jsonlib.dumps(state), encoding="utf-8")
+
+
+def _validator(response: httpx.Response) -> Optional[str]:
+    # If-Range takes a strong ETag or a Last-Modified date
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
+
+
+def _move_new(source: pathlib.Path, dest: pathlib.Path):
+    # A hard link fails if dest exists, so nothing is overwritten even if
+    # the file appeared during the download
+    try:
+        os.link(source, dest)
+    except FileExistsError:
+        raise
+    except OSError:
+        # No hard links on this filesystem
+        if dest.exists():
+            raise FileExistsError(f"{dest} already exists")
+        source.replace(dest)
+        return
+
+    source.unlink()
+
+
+def _read_at(file, offset: int, size: int) -> bytes:
+    file.seek(offset)
+    return file.read(size)
+
+
+def _batch_request(request_id: str, request: Dict[str, Any]) -> Dict[str, Any]:
+    request = dict(request, id=request_id)
+
+    if "body" in request:
+        request.setdefault("headers", {"Content-Type": "application/json"})
+
+    return request
+
+
+def _envelope_error(exc: Exception) -> Dict[str, Any]:
+    # The sub-response each request of a failed $batch envelope gets
+    status = exc.response.status_code if isinstance(exc, httpx.HTTPStatusError) else 0
+    return {
+        "status": status,
+        "body": {"error": {"code": type(exc).__name__, "message": str(exc) or type(exc).__name__}},
+    }
+
+
+def _retry_after(response: Dict[str, Any]) -> float:
+    headers = {k.lower(): v for k, v in (response.get("headers") or {}).items()}
+    return parse_retry_after(headers.get("retry-after")) or 0.0
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
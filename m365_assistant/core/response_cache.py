@@ -0,0 +1,165 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Seconds a GET response may be served without asking Graph again, by
+# longest matching path prefix. Paths not listed are never cached.
+DEFAULT_TTLS = {
+    "/me/mailFolders/inbox/messages": 30,
+    "/me/mailFolders": 300,
+    "/me/messages/": 60,
+    "/me/calendarView": 60,
+    "/me/events": 60,
+}
+
+MAIL_PREFIXES = ("/me/mailFolders", "/me/messages")
+CALENDAR_PREFIXES = ("/me/calendarView", "/me/events", "/me/calendar")
+
+
+@dataclass
+class CachedResponse:
+    account: str
+    path: str
+    body: bytes
+    etag: Optional[str]
+    expires_at: float
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+
+class ResponseCache:
+    """
+    LRU cache of raw GET response bodies, bounded by total byte size.
+
+    Fresh entries are served directly; expired entries that carry an ETag
+    are kept so the next request can revalidate with ``If-None-Match``.
+    With ``always_revalidate`` no entry is ever fresh, for processes that
+    do not see each other's writes.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttls: Optional[Dict[str, float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+        always_revalidate: bool = False,
+    ):
+        self.max_bytes = max_bytes
+        self.always_revalidate = always_revalidate
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self._clock = clock
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._revalidated = 0
+        self._bytes_saved = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def ttl_for(self, path: str) -> float:
+        if self.max_bytes <= 0 or "/delta" in path:
+            return 0
+
+        best = ""
+        for prefix in self.ttls:
+            if path.startswith(prefix) and len(prefix) > len(best):
+                best = prefix
+
+        return self.ttls[best] if best else 0
+
+    def lookup(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            self._entries.move_to_end(key)
+
+        return entry
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        return not self.always_revalidate and self._clock() < entry.expires_at
+
+    def record_hit(self, entry: CachedResponse, revalidated: bool = False):
+        self._hits += 1
+        self._bytes_saved += entry.size
+        if revalidated:
+            self._revalidated += 1
+
+    def record_miss(self):
+        self._misses += 1
+
+    def put(self, key: str, account: str, path: str, body: bytes,
+            etag: Optional[str], ttl: float):
+        if len(body) > self.max_bytes:
+            return
+
+        self._discard(key)
+
+        entry = CachedResponse(
+            account=account,
+            path=path,
+            body=body,
+            etag=etag,
+            expires_at=self._clock() + ttl,
+        )
+        self._entries[key] = entry
+        self._bytes += entry.size
+
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self._evictions += 1
+
+    def refresh(self, entry: CachedResponse, ttl: float):
+        entry.expires_at = self._clock() + ttl
+
+    def invalidate(self, account: str, prefixes: Iterable[str]):
+        prefixes = tuple(prefixes)
+
+        stale = [
+            key for key, entry in self._entries.items()
+            if entry.account == account and entry.path.startswith(prefixes)
+        ]
+        for key in stale:
+            self._discard(key)
+
+        self._invalidations += len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+            "revalidated": self._revalidated,
+            "bytes_saved": self._bytes_saved,
+            "evictions": self._evictions,
+            "invalidations": self._invalidations,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+    def _discard(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+
+def affected_prefixes(path: str) -> tuple:
+    """
+    Cached paths a mutating request to ``path`` may have changed.
+    """
+
+    if path.startswith(("/me/messages", "/me/mailFolders", "/me/sendMail")):
+        return MAIL_PREFIXES
+
+    if path.startswith(("/me/events", "/me/calendar")):
+        return CALENDAR_PREFIXES
+
+    # $batch and anything unknown: drop everything for the account
+    return MAIL_PREFIXES + CALENDAR_PREFIXES
@@ -0,0 +1,204 @@
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Dict, Optional
+import httpx
+from . import tracing
+
+# Outlook resources: 10,000 requests per 10 minutes and 4 concurrent
+# requests per app per mailbox.
+MAILBOX_RATE = 10_000 / 600
+MAILBOX_BURST = 50
+MAILBOX_CONCURRENCY = 4
+
+# Not processed by Graph, safe to resend for any method
+RETRY_ALWAYS = {429, 503}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "PATCH", "DELETE"}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._paused_until = 0.0
+
+    async def acquire(self):
+        while True:
+            now = self._clock()
+
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+
+            self._tokens = min(
+                self.capacity,
+                self._tokens + (now - self._updated) * self.rate,
+            )
+            self._updated = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """
+        Hold every request for this bucket, e.g. for a Retry-After.
+        """
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+
+class _Mailbox:
+    def __init__(self, rate: float, burst: float, concurrency: int):
+        self.bucket = TokenBucket(rate, burst)
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+
+class RequestScheduler:
+    """
+    Sends Graph requests within the documented throttling limits.
+
+    Each mailbox gets a token bucket and a concurrency cap, and a global
+    semaphore bounds in-flight requests overall; it is only held while a
+    request is on the wire. 429 and 503 responses are
+    retried after ``Retry-After`` (pausing that mailbox's bucket); other
+    5xx responses on idempotent methods use jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        mailbox_concurrency: int = MAILBOX_CONCURRENCY,
+        mailbox_rate: float = MAILBOX_RATE,
+        mailbox_burst: float = MAILBOX_BURST,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+    ):
+        self.mailbox_concurrency = mailbox_concurrency
+        self.mailbox_rate = mailbox_rate
+        self.mailbox_burst = mailbox_burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._mailboxes: Dict[str, _Mailbox] = {}
+
+        self._queued = 0
+        self._in_flight = 0
+        self._throttled = 0
+        self._retried = 0
+        self._completed = 0
+        self._failed = 0
+
+    async def send(
+        self,
+        mailbox: str,
+        method: str,
+        send: Callable[[], Awaitable[httpx.Response]],
+    ) -> httpx.Response:
+        state = self._mailbox(mailbox)
+
+        for attempt in range(self.max_retries + 1):
+            self._queued += 1
+            dequeued = False
+            try:
+                async with state.semaphore:
+                    # Rate limit and Retry-After pauses are waited out before
+                    # taking a global slot, so a throttled mailbox never holds
+                    # slots the others could use
+                    await state.bucket.acquire()
+
+                    async with self._global:
+                        self._queued -= 1
+                        dequeued = True
+
+                        self._in_flight += 1
+                        try:
+                            response = await send()
+                        finally:
+                            self._in_flight -= 1
+            finally:
+                # Cancelled while still waiting for a slot
+                if not dequeued:
+                    self._queued -= 1
+
+            delay = self._retry_delay(method, response, attempt)
+
+            if delay is None:
+                if response.status_code < 400:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+                return response
+
+            span = tracing.current()
+            if response.status_code == 429:
+                self._throttled += 1
+                span.add("throttled")
+                state.bucket.pause(delay)
+
+            self._retried += 1
+            span.add("retries")
+            await response.aclose()
+            await asyncio.sleep(delay)
+
+        return response
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "queued": self._queued,
+            "in_flight": self._in_flight,
+            "throttled": self._throttled,
+            "retried": self._retried,
+            "completed": self._completed,
+            "failed": self._failed,
+        }
+
+    def _mailbox(self, mailbox: str) -> _Mailbox:
+        state = self._mailboxes.get(mailbox)
+
+        if state is None:
+            state = _Mailbox(
+                self.mailbox_rate,
+                self.mailbox_burst,
+                self.mailbox_concurrency,
+            )
+            self._mailboxes[mailbox] = state
+
+        return state
+
+    def _retry_delay(self, method: str, response: httpx.Response,
+                     attempt: int) -> Optional[float]:
+        status = response.status_code
+
+        if attempt >= self.max_retries:
+            return None
+
+        if status not in RETRY_ALWAYS:
+            if status < 500 or method.upper() not in IDEMPOTENT_METHODS:
+                return None
+
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None:
+            return retry_after
+
+        # Full jitter
+        ceiling = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        return random.uniform(0, ceiling)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
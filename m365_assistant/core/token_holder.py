@@ -0,0 +1,171 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+# Refresh callback: receives ``force_refresh`` and returns an MSAL result dict
+# (or None when no silent refresh is possible).
+RefreshFn = Callable[[bool], Optional[Dict[str, Any]]]
+
+
+class TokenHolder:
+    """
+    Process-local holder for the current Graph access token.
+
+    Serves the token from memory until ``refresh_margin`` seconds before
+    expiry, then keeps serving it while a single background refresh runs.
+    Once the token has actually expired, callers block on one shared
+    refresh instead of each going to MSAL.
+    """
+
+    def __init__(
+        self,
+        refresh: RefreshFn,
+        refresh_margin: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._refresh = refresh
+        self._refresh_margin = refresh_margin
+        self._clock = clock
+
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+
+        self._state_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._background_running = False
+
+        self._hits = 0
+        self._misses = 0
+        self._refreshes = 0
+        self._background_refreshes = 0
+        self._refresh_failures = 0
+
+    def peek(self) -> Optional[str]:
+        """
+        Return the held token if it is still valid, else None. Never
+        blocks: inside the refresh margin it starts the background
+        refresh and returns the current token.
+        """
+
+        now = self._clock()
+        token, expires_at = self._token, self._expires_at
+
+        if not token or now >= expires_at:
+            return None
+
+        with self._state_lock:
+            self._hits += 1
+
+        if now >= expires_at - self._refresh_margin:
+            self._refresh_in_background()
+
+        return token
+
+    def get(self) -> Optional[str]:
+        """
+        Return a valid access token, refreshing it if necessary.
+        Returns None when no token could be obtained silently.
+        """
+
+        token = self.peek()
+        if token:
+            return token
+
+        with self._state_lock:
+            self._misses += 1
+
+        return self._refresh_now()
+
+    def store(self, result: Optional[Dict[str, Any]]) -> bool:
+        """
+        Store the token from an MSAL result. Returns True if one was stored.
+        """
+
+        if not result or "access_token" not in result:
+            return False
+
+        expires_in = float(result.get("expires_in", 0))
+
+        with self._state_lock:
+            self._token = result["access_token"]
+            self._expires_at = self._clock() + expires_in
+
+        return True
+
+    def invalidate(self):
+        """
+        Drop the held token so the next call goes back to MSAL.
+        """
+
+        with self._state_lock:
+            self._token = None
+            self._expires_at = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._state_lock:
+            remaining = max(0.0, self._expires_at - self._clock())
+
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "refreshes": self._refreshes,
+                "background_refreshes": self._background_refreshes,
+                "refresh_failures": self._refresh_failures,
+                "expires_in": round(remaining) if self._token else 0,
+            }
+
+    def _refresh_now(self) -> Optional[str]:
+        # Single-flight: whoever gets the lock refreshes, everyone else
+        # re-checks the token the winner stored.
+        with self._refresh_lock:
+            if self._token and self._clock() < self._expires_at:
+                return self._token
+
+            # A failed refresh must not hand out the expired token
+            if not self._run_refresh(force=False):
+                return None
+            return self._token
+
+    def _refresh_in_background(self):
+        with self._state_lock:
+            if self._background_running:
+                return
+            self._background_running = True
+
+        thread = threading.Thread(
+            target=self._background_refresh,
+            name="m365-token-refresh",
+            daemon=True,
+        )
+        thread.start()
+
+    def _background_refresh(self):
+        try:
+            with self._refresh_lock:
+                # A foreground refresh may have landed while we waited.
+                if self._clock() < self._expires_at - self._refresh_margin:
+                    return
+
+                if self._run_refresh(force=True):
+                    with self._state_lock:
+                        self._background_refreshes += 1
+        finally:
+            with self._state_lock:
+                self._background_running = False
+
+    def _run_refresh(self, force: bool) -> bool:
+        try:
+            result = self._refresh(force)
+        except Exception:
+            result = None
+
+        stored = self.store(result)
+
+        with self._state_lock:
+            if stored:
+                self._refreshes += 1
+            else:
+                self._refresh_failures += 1
+
+        return stored
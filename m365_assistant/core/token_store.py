@@ -0,0 +1,277 @@
+import contextlib
+import os
+import pathlib
+import sqlite3
+import tempfile
+import threading
+from typing import Iterator, Optional
+import msal
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class TokenStore:
+    """
+    Where a serialized MSAL token cache is persisted.
+
+    ``lock()`` excludes other threads and processes using the same store
+    and is re-entrant within a thread. ``load()`` returns the stored cache
+    only if it changed since this store last loaded or saved it, so
+    callers can check for updates on every lookup cheaply.
+    """
+
+    def __init__(self):
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+
+    @contextlib.contextmanager
+    def lock(self) -> Iterator[None]:
+        with self._thread_lock:
+            if self._depth == 0:
+                self._acquire()
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._release()
+
+    def load(self) -> Optional[str]:
+        raise NotImplementedError
+
+    def save(self, data: str):
+        raise NotImplementedError
+
+    def _acquire(self):
+        pass
+
+    def _release(self):
+        pass
+
+
+class FileTokenStore(TokenStore):
+    """
+    JSON cache file replaced atomically (temp file, fsync, rename) under an
+    advisory lock on a sidecar ``.lock`` file.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        super().__init__()
+        self.path = path
+        self.lock_path = path.with_name(path.name + ".lock")
+        self._lock_file = None
+        self._seen = None
+
+    def load(self) -> Optional[str]:
+        with self._thread_lock:
+            try:
+                stat = self.path.stat()
+            except FileNotFoundError:
+                return None
+
+            signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+            if signature == self._seen:
+                return None
+
+            data = self.path.read_text()
+            self._seen = signature
+            return data
+
+    def save(self, data: str):
+        with self.lock():
+            fd, tmp = tempfile.mkstemp(
+                dir=self.path.parent,
+                prefix=f".{self.path.name}.",
+                suffix=".tmp",
+            )
+            try:
+                with os.fdopen(fd, "w") as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            except BaseException:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(tmp)
+                raise
+
+            _fsync_dir(self.path.parent)
+
+            stat = self.path.stat()
+            self._seen = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _acquire(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock_file = open(self.lock_path, "a+")
+
+        if fcntl is not None:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            # LK_LOCK retries for ~10s before raising; keep waiting
+            while True:
+                try:
+                    msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+
+    def _release(self):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._lock_file.seek(0)
+                msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+class SQLiteTokenStore(TokenStore):
+    """
+    Cache kept as one row of a SQLite table. ``lock()`` holds a write
+    transaction, and a version counter tells readers when to reload.
+    """
+
+    def __init__(self, path: pathlib.Path, key: str = "default"):
+        super().__init__()
+        self.path = path
+        self.key = key
+        self._seen = None
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(
+            path,
+            isolation_level=None,
+            check_same_thread=False,
+            timeout=30,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS token_cache ("
+            "key TEXT PRIMARY KEY, data TEXT NOT NULL, version INTEGER NOT NULL)"
+        )
+
+    def load(self) -> Optional[str]:
+        with self._thread_lock:
+            row = self._db.execute(
+                "SELECT version FROM token_cache WHERE key = ?", (self.key,)
+            ).fetchone()
+
+            if row is None or row[0] == self._seen:
+                return None
+
+            data, version = self._db.execute(
+                "SELECT data, version FROM token_cache WHERE key = ?", (self.key,)
+            ).fetchone()
+            self._seen = version
+            return data
+
+    def save(self, data: str):
+        with self.lock():
+            row = self._db.execute(
+                "SELECT version FROM token_cache WHERE key = ?", (self.key,)
+            ).fetchone()
+            version = (row[0] if row else 0) + 1
+
+            self._db.execute(
+                "INSERT INTO token_cache (key, data, version) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET data = excluded.data, "
+                "version = excluded.version",
+                (self.key, data, version),
+            )
+            self._seen = version
+
+    def close(self):
+        self._db.close()
+
+    def _acquire(self):
+        self._db.execute("BEGIN IMMEDIATE")
+
+    def _release(self):
+        self._db.execute("COMMIT")
+
+
+class PersistentTokenCache(msal.SerializableTokenCache):
+    """
+    MSAL token cache backed by a TokenStore.
+
+    Lookups pick up changes written by other processes; every write
+    reloads, applies and saves under the store's lock, so concurrent
+    refreshes never lose each other's tokens. MSAL's ``add`` searches and
+    modifies the cache several times; inside it nothing is reloaded or
+    saved, and the whole ``add`` is saved once.
+    """
+
+    def __init__(self, store: TokenStore):
+        super().__init__()
+        self.store = store
+        # Depth of add() calls on this thread
+        self._adding = threading.local()
+        self._reload()
+
+    def search(self, credential_type, target=None, query=None, *, now=None):
+        if not self._in_add():
+            self._reload()
+        return super().search(credential_type, target=target, query=query, now=now)
+
+    def add(self, event, **kwargs):
+        with self.store.lock():
+            outermost = not self._in_add()
+            if outermost:
+                self._reload()
+
+            self._adding.depth = getattr(self._adding, "depth", 0) + 1
+            try:
+                super().add(event, **kwargs)
+            finally:
+                self._adding.depth -= 1
+
+            if outermost:
+                self.store.save(self.serialize())
+
+    def modify(self, credential_type, old_entry, new_key_value_pairs=None):
+        if self._in_add():
+            # Saved with the rest of the add
+            super().modify(credential_type, old_entry, new_key_value_pairs)
+            return
+
+        with self.store.lock():
+            self._reload()
+            super().modify(credential_type, old_entry, new_key_value_pairs)
+            self.store.save(self.serialize())
+
+    def _in_add(self) -> bool:
+        return getattr(self._adding, "depth", 0) > 0
+
+    def _reload(self):
+        data = self.store.load()
+        if data is not None:
+            self.deserialize(data)
+
+
+def token_store_for(backend: str, cache_file: pathlib.Path) -> TokenStore:
+    if backend == "file":
+        return FileTokenStore(cache_file)
+
+    if backend == "sqlite":
+        return SQLiteTokenStore(cache_file.with_suffix(".db"))
+
+    raise ValueError(f"Unknown token cache backend: {backend!r}")
+
+
+def _fsync_dir(path: pathlib.Path):
+    # Makes the rename itself durable; not possible on Windows
+    if os.name != "posix":
+        return
+
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,490 @@
+import contextlib
+import contextvars
+import functools
+import inspect
+import itertools
+import json
+import os
+import pathlib
+import re
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+TRACE_FILE = pathlib.Path.home() / ".m365_assistant.traces.jsonl"
+
+# Latency histogram buckets in seconds (Prometheus "le" bounds)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float("inf"))
+
+MODES = ("jsonl", "otel", "prometheus")
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "m365_span", default=None
+)
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "m365_request_id", default=None
+)
+
+# Span ids: a per-process prefix and a counter, cheaper than uuid4 per span
+_ID_PREFIX = uuid.uuid4().hex[:8]
+_ids = itertools.count(1)
+
+# None while tracing is off: span() then returns a shared no-op object
+_tracer: Optional["Tracer"] = None
+
+
+class Span:
+    """
+    One timed operation. Spans started while another is active become its
+    children and share its request id.
+    """
+
+    __slots__ = (
+        "name", "kind", "attrs", "request_id", "span_id", "parent_id",
+        "start", "duration", "error", "_tracer", "_token", "_started",
+    )
+
+    def __init__(self, tracer: "Tracer", name: str, kind: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.kind = kind
+        self.attrs = attrs
+        self.request_id = None
+        self.span_id = f"{_ID_PREFIX}{next(_ids):08x}"
+        self.parent_id = None
+        self.start = 0.0
+        self.duration = 0.0
+        self.error = None
+        self._tracer = tracer
+        self._token = None
+        self._started = 0.0
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, key: str, value: int = 1):
+        self.attrs[key] = self.attrs.get(key, 0) + value
+
+    def __enter__(self):
+        self._tracer.start(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            message = str(exc).splitlines()[0] if str(exc) else ""
+            self.error = f"{exc_type.__name__}: {message}" if message else exc_type.__name__
+        self._tracer.end(self)
+        return False
+
+    def record(self) -> Dict[str, Any]:
+        record = {
+            "ts": round(self.start, 6),
+            "request_id": self.request_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "kind": self.kind,
+            "name": self.name,
+            "duration_ms": round(self.duration * 1000, 3),
+            "attrs": self.attrs,
+        }
+        if self.error:
+            record["error"] = self.error
+        return record
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def add(self, key: str, value: int = 1):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP = _NoopSpan()
+
+
+class Tracer:
+    def __init__(self, exporters: Iterable[Any] = ()):
+        self.exporters = list(exporters)
+        self.histograms = Histograms()
+
+    def start(self, span: Span):
+        parent = _current.get()
+
+        if parent is not None:
+            span.parent_id = parent.span_id
+            span.request_id = parent.request_id
+        else:
+            span.request_id = _request_id.get() or new_request_id()
+
+        span._token = _current.set(span)
+        span.start = time.time()
+        span._started = time.perf_counter()
+
+        for exporter in self.exporters:
+            exporter.start(span)
+
+    def end(self, span: Span):
+        span.duration = time.perf_counter() - span._started
+
+        try:
+            _current.reset(span._token)
+        except ValueError:
+            # Exited in another context (e.g. a generator resumed elsewhere)
+            pass
+
+        self.histograms.observe(span)
+
+        for exporter in self.exporters:
+            exporter.end(span)
+
+    def close(self):
+        for exporter in self.exporters:
+            exporter.close()
+
+
+class Histograms:
+    """
+    Latency histograms per (kind, name), rendered as Prometheus text.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._series: Dict[tuple, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, span: Span):
+        key = (span.kind, span.name)
+
+        with self._lock:
+            # [bucket counts..., sum, count, errors]
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0, 0]
+
+            for index, bound in enumerate(self.buckets):
+                if span.duration <= bound:
+                    series[index] += 1
+                    break
+
+            series[-3] += span.duration
+            series[-2] += 1
+            if span.error:
+                series[-1] += 1
+
+    def prometheus(self) -> str:
+        lines = [
+            "# HELP m365_span_duration_seconds Duration of traced operations.",
+            "# TYPE m365_span_duration_seconds histogram",
+        ]
+        errors = [
+            "# HELP m365_span_errors_total Traced operations that raised.",
+            "# TYPE m365_span_errors_total counter",
+        ]
+
+        with self._lock:
+            series = sorted(self._series.items())
+
+        for (kind, name), values in series:
+            labels = f'kind="{_label(kind)}",name="{_label(name)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f'm365_span_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"m365_span_duration_seconds_sum{{{labels}}} {values[-3]:.6f}")
+            lines.append(f"m365_span_duration_seconds_count{{{labels}}} {values[-2]}")
+            errors.append(f"m365_span_errors_total{{{labels}}} {values[-1]}")
+
+        return "\n".join(lines + errors) + "\n"
+
+
+class JsonlExporter:
+    """
+    Appends one JSON line per finished span. Lines are written whole, so
+    the MCP server and the agent can share a file.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def start(self, span: Span):
+        pass
+
+    def end(self, span: Span):
+        line = json.dumps(span.record(), separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class OtelExporter:
+    """
+    Mirrors spans into OpenTelemetry. Needs the opentelemetry-api package
+    and an SDK configured by the host (e.g. opentelemetry-instrument).
+    """
+
+    def __init__(self):
+        try:
+            from opentelemetry import trace
+        except ImportError as exc:
+            raise RuntimeError(
+                "M365_TRACE=otel needs the opentelemetry-api package"
+            ) from exc
+
+        self._trace = trace
+        self._tracer = trace.get_tracer("m365_assistant")
+        self._spans: Dict[str, Any] = {}
+
+    def start(self, span: Span):
+        parent = self._spans.get(span.parent_id)
+        context = self._trace.set_span_in_context(parent) if parent is not None else None
+
+        self._spans[span.span_id] = self._tracer.start_span(
+            span.name,
+            context=context,
+            start_time=int(span.start * 1e9),
+            attributes={"m365.kind": span.kind, "m365.request_id": span.request_id},
+        )
+
+    def end(self, span: Span):
+        otel_span = self._spans.pop(span.span_id, None)
+        if otel_span is None:
+            return
+
+        for key, value in span.attrs.items():
+            if isinstance(value, (str, bool, int, float)):
+                otel_span.set_attribute(f"m365.{key}", value)
+
+        if span.error:
+            otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, span.error))
+
+        otel_span.end(end_time=int((span.start + span.duration) * 1e9))
+
+    def close(self):
+        pass
+
+
+def configure(mode: Optional[str] = None, path: Optional[pathlib.Path] = None) -> Optional[Tracer]:
+    """
+    Turn tracing on or off. ``mode`` is a comma-separated list of
+    "jsonl", "otel" and "prometheus" (in-memory histograms only), or
+    "off"; by default it comes from M365_TRACE and the JSONL file from
+    M365_TRACE_FILE.
+    """
+
+    global _tracer
+
+    if mode is None:
+        mode = os.getenv("M365_TRACE", "off")
+    if path is None:
+        path = pathlib.Path(os.getenv("M365_TRACE_FILE", str(TRACE_FILE)))
+
+    modes = {item.strip().lower() for item in mode.split(",") if item.strip()}
+    modes.discard("off")
+
+    unknown = modes - set(MODES)
+    if unknown:
+        raise ValueError(f"Unknown trace mode(s) {sorted(unknown)}; use {', '.join(MODES)} or off")
+
+    if _tracer is not None:
+        _tracer.close()
+        _tracer = None
+
+    if not modes:
+        return None
+
+    exporters = []
+    if "jsonl" in modes:
+        exporters.append(JsonlExporter(path))
+    if "otel" in modes:
+        exporters.append(OtelExporter())
+
+    _tracer = Tracer(exporters)
+    return _tracer
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, kind: str = "internal", **attrs):
+    """
+    Context manager timing one operation; a shared no-op when tracing is
+    off, so call sites cost one global lookup.
+    """
+
+    if _tracer is None:
+        return NOOP
+    return Span(_tracer, name, kind, attrs)
+
+
+def traced(name: Optional[str] = None, kind: str = "internal"):
+    """
+    Decorator form of ``span`` for sync and async functions.
+    """
+
+    def decorate(func):
+        label = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _tracer is None:
+                    return await func(*args, **kwargs)
+                with Span(_tracer, label, kind, {}):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with Span(_tracer, label, kind, {}):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorate
+
+
+def current():
+    """
+    The innermost active span, or a no-op, for annotating from deeper code.
+    """
+
+    if _tracer is None:
+        return NOOP
+    return _current.get() or NOOP
+
+
+@contextlib.contextmanager
+def request(request_id: Optional[str] = None):
+    """
+    Group the spans started inside under one request id.
+    """
+
+    token = _request_id.set(request_id or new_request_id())
+    try:
+        yield _request_id.get()
+    finally:
+        _request_id.reset(token)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def prometheus_text() -> str:
+    if _tracer is None:
+        return ""
+    return _tracer.histograms.prometheus()
+
+
+def path_template(path: str) -> str:
+    """
+    Graph path with IDs replaced, so requests group by endpoint:
+    /me/messages/AAMkAD.../move → /me/messages/{id}/move
+    """
+
+    if "://" in path:
+        path = urlsplit(path).path
+    path = path.split("?", 1)[0]
+    return "/".join(
+        segment if not segment or _WORD.fullmatch(segment) else "{id}"
+        for segment in path.split("/")
+    )
+
+
+_WORD = re.compile(r"\$?[A-Za-z]+(?:\.[A-Za-z]+)*|v\d+\.\d+")
+
+
+def load(path: pathlib.Path, kind: Optional[str] = None,
+         since: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Span records from a JSONL trace file, optionally of one kind and
+    newer than ``since`` (epoch seconds). Malformed lines are skipped.
+    """
+
+    records = []
+
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+
+            if kind and record.get("kind") != kind:
+                continue
+            if since and record.get("ts", 0) < since:
+                continue
+
+            records.append(record)
+
+    return records
+
+
+def summarize(records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Per-name count, errors, latency percentiles and histogram bucket
+    counts, slowest total first.
+    """
+
+    durations: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+
+    for record in records:
+        name = record.get("name", "?")
+        durations.setdefault(name, []).append(record.get("duration_ms", 0.0))
+        if record.get("error"):
+            errors[name] = errors.get(name, 0) + 1
+
+    rows = []
+    for name, values in durations.items():
+        values.sort()
+        buckets = [0] * len(BUCKETS)
+        for value in values:
+            for index, bound in enumerate(BUCKETS):
+                if value / 1000 <= bound:
+                    buckets[index] += 1
+                    break
+
+        rows.append({
+            "name": name,
+            "count": len(values),
+            "errors": errors.get(name, 0),
+            "total_ms": sum(values),
+            "p50_ms": _percentile(values, 50),
+            "p95_ms": _percentile(values, 95),
+            "p99_ms": _percentile(values, 99),
+            "max_ms": values[-1],
+            "buckets": buckets,
+        })
+
+    rows.sort(key=lambda row: -row["total_ms"])
+    return rows
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(percent / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
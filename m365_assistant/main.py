@@ -1,9 +1,202 @@
-from m365_assistant.mcp.tools import mcp
+import argparse
+import os
+import pathlib
+import sys
+import time
 
 
-def run():
-    mcp.run()
+def run(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+
+    if argv[:1] == ["stats"]:
+        return stats(argv[1:])
+
+    if argv[:1] == ["plan"]:
+        return plan(argv[1:])
+
+    if argv[:1] == ["login"]:
+        return login(argv[1:])
+
+    parser = argparse.ArgumentParser(prog="m365-assistant")
+    parser.add_argument("--transport", choices=("stdio", "http", "sse"),
+                        default=os.getenv("M365_TRANSPORT", "stdio"))
+    parser.add_argument("--host", default=os.getenv("M365_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("M365_PORT", "8000")))
+    parser.add_argument("--path", default=os.getenv("M365_HTTP_PATH", "/mcp"),
+                        help="endpoint of the HTTP transport")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("M365_WORKERS", "1")),
+                        help="worker processes sharing the port (http transport)")
+    parser.add_argument("--graceful-timeout", type=float, default=30.0,
+                        help="seconds in-flight requests get to finish on shutdown")
+    args = parser.parse_args(argv)
+
+    if args.transport != "stdio":
+        from m365_assistant.mcp.server import serve
+
+        try:
+            serve(
+                transport=args.transport,
+                host=args.host,
+                port=args.port,
+                workers=args.workers,
+                path=args.path,
+                graceful_timeout=args.graceful_timeout,
+            )
+        except ValueError as exc:
+            parser.error(str(exc))
+        return 0
+
+    # Imported here so "stats" does not pay for FastMCP
+    from m365_assistant.mcp.tools import mcp
+
+    # The banner goes to stderr nobody reads under stdio, and checks PyPI
+    # for a newer FastMCP before the server answers initialize
+    mcp.run(show_banner=False)
+
+
+def stats(argv=None):
+    """
+    m365-assistant stats: latency histograms per tool from the JSONL trace
+    file written with M365_TRACE=jsonl.
+    """
+
+    from m365_assistant.core import tracing
+
+    parser = argparse.ArgumentParser(prog="m365-assistant stats")
+    parser.add_argument("--file", type=pathlib.Path, default=pathlib.Path(
+        os.getenv("M365_TRACE_FILE", str(tracing.TRACE_FILE))
+    ))
+    parser.add_argument("--kind", default="tool",
+                        help="tool, tool_call, graph, auth, llm or agent; 'all' for every span")
+    parser.add_argument("--since", type=float, help="only the last N hours")
+    parser.add_argument("--histogram", action="store_true",
+                        help="show the latency buckets of each row")
+    args = parser.parse_args(argv)
+
+    if not args.file.exists():
+        print(f"No trace file at {args.file}; run with M365_TRACE=jsonl first", file=sys.stderr)
+        return 1
+
+    since = time.time() - args.since * 3600 if args.since else None
+    kind = None if args.kind == "all" else args.kind
+    rows = tracing.summarize(tracing.load(args.file, kind=kind, since=since))
+
+    if not rows:
+        print(f"No {args.kind} spans in {args.file}")
+        return 0
+
+    print(f"{'name':<32} {'count':>7} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9} {'total s':>9}")
+
+    for row in rows:
+        print(f"{row['name'][:32]:<32} {row['count']:>7} {row['errors']:>6} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} "
+              f"{row['max_ms']:>9.1f} {row['total_ms'] / 1000:>9.2f}")
+
+        if args.histogram:
+            widest = max(row["buckets"]) or 1
+            for bound, count in zip(tracing.BUCKETS, row["buckets"]):
+                if not count:
+                    continue
+                label = "+Inf" if bound == float("inf") else f"{bound * 1000:g} ms"
+                print(f"    <= {label:>9} {'#' * max(1, round(40 * count / widest)):<40} {count}")
+
+    return 0
+
+
+def login(argv=None):
+    """
+    m365-assistant login: sign an account in on this terminal. HTTP servers
+    with several workers read the shared token cache but cannot complete a
+    device sign-in themselves.
+    """
+
+    import asyncio
+    from dataclasses import replace
+    from m365_assistant.core.config import Settings
+    from m365_assistant.services.accounts import AccountRegistry
+
+    parser = argparse.ArgumentParser(prog="m365-assistant login")
+    parser.add_argument("--account", help="sign-in name of the account (default: M365_DEFAULT_ACCOUNT)")
+    parser.add_argument("--timeout", type=float, default=900, help="seconds to wait for the user")
+    args = parser.parse_args(argv)
+
+    async def main():
+        registry = AccountRegistry(replace(Settings.load(), workers=1))
+
+        try:
+            auth = registry.get(args.account).auth
+            result = await asyncio.to_thread(auth.acquire_token)
+
+            if result["status"] == "success":
+                print("Already signed in.")
+                return 0
+
+            print(f"Go to {result['verification_uri']} and enter code {result['user_code']}")
+            result = await auth.wait_for_sign_in(args.timeout)
+            print(result["message"])
+            return 0 if result["status"] == "success" else 1
+        finally:
+            await registry.aclose()
+
+    return asyncio.run(main())
+
+
+def plan(argv=None):
+    """
+    m365-assistant plan: build (or reuse) today's plan and print it; with
+    --at, keep running and pre-generate it every morning; with --stats,
+    show how often the plan cache answered.
+    """
+
+    import asyncio
+    from m365_assistant.agent.plan_cache import PlanCache
+
+    parser = argparse.ArgumentParser(prog="m365-assistant plan")
+    parser.add_argument("--prompt", help="request to plan for (default: M365_PLAN_PROMPT)")
+    parser.add_argument("--at", default=os.getenv("M365_PLAN_AT"),
+                        help="pre-generate daily at this local time, e.g. 07:30")
+    parser.add_argument("--every", type=float, default=float(os.getenv("M365_PLAN_EVERY", "0")),
+                        help="after --at, re-check every N minutes and rebuild on changes")
+    parser.add_argument("--stats", action="store_true", help="print plan cache stats and exit")
+    args = parser.parse_args(argv)
+
+    cache = PlanCache.open_default()
+    if cache is None:
+        print("The plan cache is off (M365_PLAN_CACHE=0)", file=sys.stderr)
+        return 1
+
+    if args.stats:
+        stats = cache.stats()
+        print(f"hits {stats['hits']}  misses {stats['misses']}  "
+              f"hit rate {stats['hit_rate']:.0%}  pre-generated {stats['pregenerated']}")
+        print(f"saved {stats['saved_seconds']:.1f}s of agent time "
+              f"({stats['plans']} stored plans, built in {stats['mean_build_seconds']:.1f}s on average)")
+        cache.close()
+        return 0
+
+    from m365_assistant.agent.runner import PLAN_PROMPT, AgentRunner, parse_clock, plan_daily
+    from m365_assistant.core import tracing
+    from m365_assistant.core.config import _env_flag
+
+    async def main():
+        tracing.configure()
+        async with AgentRunner(triage=_env_flag("M365_AGENT_TRIAGE"), plan_cache=cache) as runner:
+            if args.at:
+                await plan_daily(runner, parse_clock(args.at), args.every or None,
+                                 args.prompt or PLAN_PROMPT)
+            else:
+                print(await runner.run_agent(args.prompt or PLAN_PROMPT))
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cache.close()
+
+    return 0
 
 
 if __name__ == "__main__":
-    run()
+    sys.exit(run())
@@ -0,0 +1,149 @@
+import contextlib
+import logging
+import os
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from ..core import tracing
+from ..core.config import _env_flag
+from . import tools
+from .tools import mcp
+
+logger = logging.getLogger(__name__)
+
+TRANSPORTS = ("stdio", "http", "sse")
+APP_FACTORY = "m365_assistant.mcp.server:create_app"
+
+# Serving: between startup (accounts built) and the start of shutdown
+_serving = False
+
+
+@mcp.custom_route("/healthz", methods=["GET"])
+async def healthz(request: Request):
+    # Liveness: the process answers
+    return JSONResponse({"status": "ok", "pid": os.getpid()})
+
+
+@mcp.custom_route("/readyz", methods=["GET"])
+async def readyz(request: Request):
+    """
+    Readiness: settings load, the account pool is warm and the worker is
+    not draining. Load balancers stop routing here during shutdown.
+    """
+
+    if not _serving:
+        return JSONResponse({"status": "unavailable", "pid": os.getpid()}, status_code=503)
+
+    try:
+        tools.get_accounts()
+    except Exception as exc:
+        return JSONResponse({"status": "error", "error": str(exc)}, status_code=503)
+
+    return JSONResponse({"status": "ready", "pid": os.getpid()})
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request: Request):
+    # Prometheus text of the tracing histograms (M365_TRACE)
+    return PlainTextResponse(tracing.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+
+def create_app():
+    """
+    ASGI app for one worker process; uvicorn calls this in each worker.
+
+    The transport, endpoint path and stateless mode come from the
+    environment set by ``serve``, since workers are separate processes.
+    """
+
+    transport = os.getenv("M365_HTTP_TRANSPORT", "http")
+    app = mcp.http_app(
+        path=os.getenv("M365_HTTP_PATH", "/mcp"),
+        transport=transport,
+        stateless_http=_env_flag("M365_STATELESS_HTTP"),
+        # Plain JSON answers to tool calls: SSE responses are cut as soon as
+        # uvicorn gets SIGTERM, JSON ones are allowed to finish
+        json_response=True if transport == "http" else None,
+    )
+    serve_mcp = app.router.lifespan_context
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        global _serving
+
+        async with serve_mcp(app):
+            # Warm the settings, HTTP pool and token cache before traffic;
+            # readiness reports the error if this fails
+            try:
+                tools.get_accounts()
+            except Exception:
+                logger.exception("Account pool could not be created")
+
+            _serving = True
+            try:
+                yield
+            finally:
+                # In-flight requests have finished (uvicorn waits up to
+                # the graceful timeout) before the lifespan exits
+                _serving = False
+                await tools.close()
+
+    app.router.lifespan_context = lifespan
+    return app
+
+
+def serve(
+    transport: str = "http",
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    workers: int = 1,
+    path: str = "/mcp",
+    graceful_timeout: float = 30.0,
+    app_factory: str = APP_FACTORY,
+):
+    """
+    Run the server over streamable HTTP ("http") or SSE with uvicorn.
+
+    With several workers, requests are spread across processes that share
+    one port, so sessions cannot live in a worker: the streamable HTTP
+    transport then runs stateless, and SSE is refused. Workers share the
+    token cache and local store files (see core/token_store.py), but not
+    device flows, so they do not start sign-ins (``m365-assistant login``
+    does), and each worker's scheduler gets 1/workers of the Graph limits.
+
+    SIGTERM / Ctrl+C stops accepting connections, lets in-flight
+    requests finish for up to ``graceful_timeout`` seconds, then closes
+    the account pool.
+    """
+
+    import uvicorn
+
+    if transport not in ("http", "sse"):
+        raise ValueError(f"Unknown HTTP transport {transport!r}; use http or sse")
+
+    if transport == "sse" and workers > 1:
+        raise ValueError("The SSE transport keeps sessions in one process; use --workers 1")
+
+    # Each worker needs at least one of a mailbox's concurrent requests
+    mailbox_concurrency = int(os.getenv("M365_GRAPH_MAILBOX_CONCURRENCY", "4"))
+    if workers > mailbox_concurrency:
+        raise ValueError(
+            f"At most {mailbox_concurrency} workers (M365_GRAPH_MAILBOX_CONCURRENCY): "
+            "more would exceed Graph's concurrent requests per mailbox"
+        )
+
+    # Inherited by the worker processes
+    os.environ["M365_HTTP_TRANSPORT"] = transport
+    os.environ["M365_HTTP_PATH"] = path
+    os.environ["M365_WORKERS"] = str(workers)
+    if workers > 1:
+        os.environ["M365_STATELESS_HTTP"] = "1"
+
+    uvicorn.run(
+        app_factory,
+        factory=True,
+        host=host,
+        port=port,
+        workers=workers,
+        timeout_graceful_shutdown=graceful_timeout,
+        log_level=os.getenv("M365_LOG_LEVEL", "info").lower(),
+    )
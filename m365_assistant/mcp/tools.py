@@ -1,53 +1,253 @@
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Annotated
 from fastmcp import FastMCP
+from fastmcp.server.dependencies import get_http_headers
+from fastmcp.server.middleware import Middleware
+from pydantic import Field
+from ..core import tracing
 from ..core.config import Settings
-from ..core.auth_manager import AuthManager
-from ..core.graph_client import GraphClient
-from ..services.mail_service import MailService
-from ..services.calendar_service import CalendarService
+from ..services.serialization import serialize
+from ..services.triage import context_fingerprint as run_fingerprint
+from ..services.triage import triage_day as run_triage
+
+if TYPE_CHECKING:
+    from ..services.accounts import AccountAccess, AccountContext, AccountRegistry
+
+
+class TracingMiddleware(Middleware):
+    """
+    One span per tool call; Graph and token spans started by the tool
+    nest under it and share its request id.
+    """
+
+    async def on_call_tool(self, context, call_next):
+        get_settings()  # configures tracing on the first call
+
+        if not tracing.enabled():
+            return await call_next(context)
+
+        # Over HTTP the caller may pass its own request id
+        request_id = get_http_headers().get("x-request-id")
+        with tracing.request(request_id), tracing.span(context.message.name, kind="tool"):
+            return await call_next(context)
+
+
+class AccountMiddleware(Middleware):
+    """
+    Resolves the account the caller may use (see AccountAccess) and
+    holds it for the length of the tool call, so an eviction from the
+    account pool does not close it underneath the tool.
+    """
+
+    async def on_call_tool(self, context, call_next):
+        async with get_accounts().lease(_caller_account()) as account:
+            token = current_account.set(account)
+            try:
+                return await call_next(context)
+            finally:
+                current_account.reset(token)
 
 
 mcp = FastMCP("m365-assistant")
-settings = Settings.load()
-auth = AuthManager(settings)
-client = GraphClient(auth, settings)
-mail_service = MailService(client)
-calendar_service = CalendarService(client)
+mcp.add_middleware(TracingMiddleware())
+mcp.add_middleware(AccountMiddleware())
+
+# Built on first tool use, not at import: the server answers initialize
+# and lists its tools without loading MSAL, the token cache or the store.
+settings: Settings | None = None
+accounts: "AccountRegistry | None" = None
+access: "AccountAccess | None" = None
+
+# The account leased by AccountMiddleware for the running tool call
+current_account: ContextVar["AccountContext | None"] = ContextVar("current_account", default=None)
+
+
+def get_settings() -> Settings:
+    global settings
+
+    if settings is None:
+        settings = Settings.load()
+        tracing.configure(settings.trace, settings.trace_file)
+
+    return settings
+
+
+def get_access() -> "AccountAccess":
+    global access
+
+    if access is None:
+        from ..services.accounts import AccountAccess
+        access = AccountAccess.load(get_settings())
+
+    return access
+
+
+def get_accounts() -> "AccountRegistry":
+    global accounts
+
+    if accounts is None:
+        from ..services.accounts import AccountRegistry
+        accounts = AccountRegistry(get_settings())
+
+    return accounts
+
+
+async def close():
+    """
+    Release the account pool (HTTP connections, stores, sign-ins) and
+    flush traces, e.g. when an HTTP server shuts down.
+    """
+
+    global accounts
+
+    if accounts is not None:
+        await accounts.aclose()
+        accounts = None
+
+    tracing.configure("off")
+
+
+Attachments = Annotated[
+    list[str] | None,
+    Field(description="Files to attach, as paths inside the user's attachment folder."),
+]
+
+
+def _caller_account() -> str | None:
+    # Over stdio there is no request: the local user gets the default account
+    headers = get_http_headers(include_all=True)
+    if not headers:
+        return None
+
+    authorization = headers.get("authorization", "")
+    key = authorization[7:].strip() if authorization.lower().startswith("bearer ") else None
+    return get_access().resolve(key, headers.get("x-m365-account"))
+
+
+def _context() -> "AccountContext":
+    return current_account.get() or get_accounts().get(_caller_account())
+
+
+def _mail():
+    return _context().mail
+
+
+def _calendar():
+    return _context().calendar
+
+
+def _format(result):
+    # Compact text for the model instead of raw Graph JSON
+    settings = get_settings()
+    return serialize(result, settings.tool_output, settings.tool_text_limit)
 
 
 @mcp.tool
-def list_emails(limit: int = 20):
-    """List emails from last 5 days."""
-    return mail_service.list_last_n_days(days=5, limit=limit)
+async def list_emails(limit: int | None = 20):
+    """List emails from last 5 days. Pass limit=null to get all of them."""
+    return _format(await _mail().list_last_n_days(days=5, limit=limit))
 @mcp.tool
-def list_upcoming_events(days_ahead: int = 7, limit: int = 20):
-    """List upcoming calendar events."""
-    return calendar_service.list_upcoming_events(
+async def get_email(email_id: str):
+    """
+    Get the full content of one email, including its body.
+
+    list_emails only returns a short preview; use this when the
+    user needs the complete message.
+    """
+    return _format(await _mail().get_email(email_id))
+@mcp.tool
+async def search_emails(
+    query: str,
+    sender: str | None = None,
+    after: str | None = None,
+    before: str | None = None,
+    limit: int = 20,
+):
+    """
+    Search Inbox emails by keywords in subject, sender and body.
+
+    sender filters on name or address (partial match).
+    after / before are ISO dates such as '2024-05-01'.
+
+    Only the Inbox (the synced folder) is searched; mail moved to
+    other folders is not found. Returns the best matches first.
+    """
+    return _format(await _mail().search_emails(
+        query,
+        sender=sender,
+        after=after,
+        before=before,
+        limit=limit,
+    ))
+@mcp.tool
+async def list_upcoming_events(
+    days_ahead: int = 7,
+    limit: int | None = 20,
+):
+    """List upcoming calendar events. Pass limit=null to get all of them."""
+    return _format(await _calendar().list_upcoming_events(
         days_ahead=days_ahead,
         limit=limit
-    )
+    ))
 @mcp.tool
-def forward_email(email_id: str, to: list[str], comment: str | None = None):
+async def forward_email(
+    email_id: str,
+    to: list[str],
+    comment: str | None = None,
+    attachments: Attachments = None,
+):
     """
     Forward an existing email to one or more recipients.
 
     Use this tool when the user asks to forward a specific email
     to other people.
     """
-    return mail_service.forward_email(email_id, to, comment)
+    return await _mail().forward_email(email_id, to, comment, attachments)
 
 
 @mcp.tool
-def reply_all_email(email_id: str, body: str):
+async def reply_all_email(
+    email_id: str,
+    body: str,
+    attachments: Attachments = None,
+):
     """
     Reply to all recipients of a specific email.
 
     Use this tool when the user says 'reply all'.
     """
-    return mail_service.reply_all_email(email_id, body)
+    return await _mail().reply_all_email(email_id, body, attachments)
 
 
 @mcp.tool
-def flag_email(email_id: str, status: str = "flagged"):
+async def list_attachments(email_id: str):
+    """
+    List the attachments of an email with their IDs, names and sizes.
+
+    Use this before download_attachment.
+    """
+    return _format(await _mail().list_attachments(email_id))
+
+
+@mcp.tool
+async def download_attachment(
+    email_id: str,
+    attachment_id: str,
+    dest: str | None = None,
+):
+    """
+    Save an email attachment to the user's attachment folder.
+
+    dest is an optional file name or sub-folder inside that folder;
+    by default the attachment keeps its own name. Existing files are
+    never overwritten: a numbered name is used instead. Returns the
+    saved path and size. Large files are fine.
+    """
+    return await _mail().download_attachment(email_id, attachment_id, dest)
+
+
+@mcp.tool
+async def flag_email(email_id: str, status: str = "flagged"):
     """
     Flag or unflag an email.
 
@@ -56,9 +256,9 @@ def flag_email(email_id: str, status: str = "flagged"):
     - complete
     - notFlagged
     """
-    return mail_service.flag_email(email_id, status)
+    return await _mail().flag_email(email_id, status)
 @mcp.tool
-def mark_email_as_read(email_id: str):
+async def mark_email_as_read(email_id: str):
     """
     Mark an email as read.
 
@@ -66,21 +266,63 @@ def mark_email_as_read(email_id: str):
     - "Mark this email as read"
     - "Mark the last email as read"
     """
-    return mail_service.mark_email_read(email_id)
+    return await _mail().mark_email_read(email_id)
 @mcp.tool
-def mark_email_as_unread(email_id: str):
+async def mark_email_as_unread(email_id: str):
     """
     Mark an email as unread.
 
     Use when the user wants to keep it for later.
     """
-    return mail_service.mark_email_unread(email_id)
+    return await _mail().mark_email_unread(email_id)
 @mcp.tool
-def reply_to_specific_recipient(
+async def mark_emails_as_read(email_ids: list[str]):
+    """
+    Mark several emails as read in one go.
+
+    Use this instead of calling mark_email_as_read repeatedly
+    when triaging many emails. Returns a status per email ID.
+    """
+    return await _mail().mark_emails_read(email_ids)
+@mcp.tool
+async def mark_emails_as_unread(email_ids: list[str]):
+    """
+    Mark several emails as unread in one go.
+
+    Returns a status per email ID.
+    """
+    return await _mail().mark_emails_unread(email_ids)
+@mcp.tool
+async def flag_emails(email_ids: list[str], status: str = "flagged"):
+    """
+    Flag or unflag several emails in one go.
+
+    status options:
+    - flagged
+    - complete
+    - notFlagged
+
+    Returns a status per email ID.
+    """
+    return await _mail().flag_emails(email_ids, status)
+@mcp.tool
+async def move_emails(email_ids: list[str], folder: str):
+    """
+    Move several emails to a folder.
+
+    folder can be a folder ID or a well-known name such as
+    'archive', 'deleteditems' or 'inbox'.
+
+    Returns a status (and the new email ID) per original email ID.
+    """
+    return await _mail().move_emails(email_ids, folder)
+@mcp.tool
+async def reply_to_specific_recipient(
     original_email_id: str,
     recipient: str,
     body: str,
     subject: str | None = None,
+    attachments: Attachments = None,
 ):
     """
     Reply to a specific recipient only.
@@ -88,28 +330,96 @@ def reply_to_specific_recipient(
     This is useful when the user wants to respond to
     only one person instead of using reply-all.
     """
-    return mail_service.reply_to_recipient(
+    return await _mail().reply_to_recipient(
         original_email_id,
         recipient,
         body,
         subject,
+        attachments,
     )
 
 
 @mcp.tool
-def create_mail_folder(folder_name: str):
+async def create_mail_folder(folder_name: str):
     """
     Create a new folder in the mailbox.
 
     Use when user asks to organize emails into folders.
     """
-    return mail_service.create_mail_folder(folder_name)
+    return await _mail().create_mail_folder(folder_name)
 
 @mcp.tool
-def list_calendar_events(days_ahead: int = 7, limit: int = 20):
+async def list_calendar_events(
+    days_ahead: int = 7,
+    limit: int = 20,
+):
     """
     List upcoming calendar events within a date range.
 
     Use when user asks about meetings or schedule.
     """
-    return calendar_service.list_events(days_ahead, limit)
+    return _format(await _calendar().list_upcoming_events(
+        days_ahead=days_ahead,
+        limit=limit,
+    ))
+
+
+@mcp.tool
+async def find_free_slots(
+    duration_minutes: int = 30,
+    window_days: int = 5,
+    min_gap_minutes: int = 0,
+    limit: int = 10,
+):
+    """
+    Find free time in the user's calendar.
+
+    Returns slots of at least duration_minutes within working hours over
+    the next window_days days, keeping min_gap_minutes free before and
+    after existing meetings. Use this to check availability instead of
+    reading every event.
+    """
+    return _format(await _calendar().find_free_slots(
+        duration_minutes=duration_minutes,
+        window_days=window_days,
+        min_gap_minutes=min_gap_minutes,
+        limit=limit,
+    ))
+
+
+@mcp.tool
+async def triage_day(days_ahead: int = 1):
+    """
+    Triage the last 5 days of email and the next days of calendar
+    without reading every message: returns urgent_emails (scored, with
+    reasons), deadlines, meetings and pending_actions.
+
+    Use this first when planning the user's day.
+    """
+    context = _context()
+    return _format(await run_triage(
+        context.mail,
+        context.calendar,
+        days_ahead=days_ahead,
+    ))
+
+
+@mcp.tool
+async def context_fingerprint():
+    """
+    Hash of the ids and changeKeys of the last 5 days of email and the
+    next 7 days of events. It changes when any of them does; the agent
+    runner keys its plan cache on it. Not needed to answer the user.
+    """
+    context = _context()
+    return await run_fingerprint(context.mail, context.calendar)
+
+
+@mcp.tool
+async def wait_for_sign_in(timeout_seconds: int = 60):
+    """
+    Wait for the user to finish a Microsoft sign-in started by another
+    tool (at most 300 seconds), then report whether it succeeded.
+    Returns no_sign_in_pending when no sign-in was started.
+    """
+    return await _context().auth.wait_for_sign_in(min(timeout_seconds, 300))
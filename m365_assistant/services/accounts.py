@@ -0,0 +1,248 @@
+import asyncio
+import contextlib
+import hashlib
+import json
+import pathlib
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from ..core.auth_manager import CACHE_FILE, AuthManager
+from ..core.config import Settings
+from ..core.graph_client import GraphClient, new_http_client, new_response_cache, new_scheduler
+from ..sync.engine import SyncEngine
+from ..sync.store import LocalStore
+from .calendar_service import CalendarService
+from .mail_service import MailService
+
+ACCOUNTS_DIR = pathlib.Path.home() / ".m365_assistant"
+
+
+@dataclass
+class AccountContext:
+    name: str
+    auth: AuthManager
+    client: GraphClient
+    mail: MailService
+    calendar: CalendarService
+    sync: Optional[SyncEngine] = None
+
+    # Tool calls currently using this context (see AccountRegistry.lease)
+    leases: int = 0
+    evicted: bool = False
+
+    def close(self):
+        self.auth.cancel_device_flow()
+        if self.sync is not None:
+            self.sync.store.close()
+
+    async def aclose(self):
+        self.close()
+        await self.client.aclose()
+
+
+class AccountAccess:
+    """
+    Which accounts each HTTP caller may use.
+
+    Callers identify themselves with ``Authorization: Bearer <key>``. The
+    keys file maps the SHA-256 hex digest of each key to the account
+    names it grants, the first being the caller's default:
+
+        {"3b1f...": ["alice@contoso.com"], "9c0d...": ["bob@contoso.com", "shared@contoso.com"]}
+
+    Without a keys file every caller gets the default account only, as
+    over stdio. A caller may pick one of its accounts with the
+    ``x-m365-account`` header; anything else raises PermissionError.
+    """
+
+    def __init__(self, default_account: str, grants: Optional[Dict[str, List[str]]] = None):
+        self.default_account = default_account
+        self.grants = grants
+
+    @staticmethod
+    def load(settings: Settings) -> "AccountAccess":
+        grants = None
+
+        if settings.account_keys_file is not None:
+            with open(settings.account_keys_file, encoding="utf-8") as file:
+                grants = {
+                    digest.lower(): list(names)
+                    for digest, names in json.load(file).items()
+                }
+
+        return AccountAccess(settings.default_account, grants)
+
+    def allowed(self, key: Optional[str]) -> List[str]:
+        if self.grants is None:
+            return [self.default_account]
+
+        if not key:
+            raise PermissionError("Missing caller key (Authorization: Bearer <key>)")
+
+        names = self.grants.get(hashlib.sha256(key.encode()).hexdigest())
+        if not names:
+            raise PermissionError("Unknown caller key")
+
+        return names
+
+    def resolve(self, key: Optional[str], requested: Optional[str] = None) -> str:
+        """
+        The account a caller with ``key`` gets when it asks for
+        ``requested`` (None → its default).
+        """
+
+        allowed = self.allowed(key)
+
+        if requested is None:
+            return allowed[0]
+
+        for name in allowed:
+            if name.lower() == requested.lower():
+                return name
+
+        raise PermissionError(f"Caller may not use account {requested!r}")
+
+
+class AccountRegistry:
+    """
+    Serves many mailboxes from one process.
+
+    Each account gets its own MSAL token cache, AuthManager, GraphClient,
+    services and local store, created on first use and kept in an LRU pool
+    of ``settings.max_accounts``. The HTTP connection pool, the request
+    scheduler (which still budgets per mailbox), the response cache (keyed
+    per account) and MSAL's authority discovery are shared by all of them.
+
+    An account name is either the configured default account, which keeps
+    the original single-user cache files, or the user's sign-in name
+    (e.g. ``alice@contoso.com``), which also selects the MSAL account.
+    Accounts listed in ``settings.account_tenants`` sign in with their own
+    tenant's authority; the rest use ``settings.authority``.
+    """
+
+    def __init__(self, settings: Settings, accounts_dir: pathlib.Path = ACCOUNTS_DIR):
+        self.settings = settings
+        self.accounts_dir = accounts_dir
+
+        self._http = new_http_client(settings)
+        self._scheduler = new_scheduler(settings)
+        self._cache = new_response_cache(settings)
+        self._msal_http_cache: Dict = {}
+
+        self._accounts: "OrderedDict[str, AccountContext]" = OrderedDict()
+        self._closing = set()
+
+    def get(self, account: Optional[str] = None) -> AccountContext:
+        """
+        The context for ``account``. Callers must already be authorized
+        for it (see AccountAccess); the registry does not check.
+        """
+
+        name = account or self.settings.default_account
+        context = self._accounts.get(name)
+
+        if context is None:
+            context = self._create(name)
+            self._accounts[name] = context
+
+            while len(self._accounts) > self.settings.max_accounts:
+                _, evicted = self._accounts.popitem(last=False)
+                evicted.evicted = True
+                # A tool call still using it closes it when it finishes
+                if not evicted.leases:
+                    self._close_soon(evicted)
+        else:
+            self._accounts.move_to_end(name)
+
+        return context
+
+    @contextlib.asynccontextmanager
+    async def lease(self, account: Optional[str] = None):
+        """
+        ``get`` for the length of a tool call: an account evicted from
+        the pool meanwhile is closed once the call is done with it.
+        """
+
+        context = self.get(account)
+        context.leases += 1
+
+        try:
+            yield context
+        finally:
+            context.leases -= 1
+            if context.evicted and not context.leases:
+                await context.aclose()
+
+    def _close_soon(self, context: AccountContext):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            context.close()
+            return
+
+        task = loop.create_task(context.aclose())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def accounts(self) -> List[str]:
+        return list(self._accounts)
+
+    async def aclose(self):
+        for context in self._accounts.values():
+            await context.aclose()
+        self._accounts.clear()
+        if self._closing:
+            await asyncio.gather(*self._closing)
+        await self._http.aclose()
+
+    def _create(self, name: str) -> AccountContext:
+        settings = self.settings
+        is_default = name == self.settings.default_account
+
+        if is_default:
+            cache_file = CACHE_FILE
+            store_path = settings.store_path
+        else:
+            slug = _slug(name)
+            cache_file = self.accounts_dir / "tokens" / f"{slug}.json"
+            store_path = self.accounts_dir / "stores" / f"{slug}.db"
+
+        auth = AuthManager(
+            settings,
+            cache_file=cache_file,
+            username=None if is_default else name,
+            http_cache=self._msal_http_cache,
+            authority=settings.authority_for(name),
+        )
+        client = GraphClient(
+            auth,
+            settings,
+            mailbox=name,
+            http=self._http,
+            scheduler=self._scheduler,
+            cache=self._cache,
+        )
+
+        sync = None
+        if settings.local_store:
+            store_path.parent.mkdir(parents=True, exist_ok=True)
+            sync = SyncEngine(
+                client,
+                LocalStore(store_path),
+                mail_days=settings.sync_mail_days,
+                calendar_days=settings.sync_calendar_days,
+            )
+
+        return AccountContext(
+            name=name,
+            auth=auth,
+            client=client,
+            mail=MailService(client, sync),
+            calendar=CalendarService(client, sync),
+            sync=sync,
+        )
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9@._-]", "_", name.lower())
@@ -0,0 +1,323 @@
+import calendar
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+Interval = Tuple[datetime, datetime]
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+# recurrencePattern.index values below "last"
+WEEK_INDEX = ("first", "second", "third", "fourth")
+
+# Occurrences generated per series before giving up, whatever the range says
+MAX_OCCURRENCES = 5000
+
+
+@dataclass(frozen=True)
+class WorkingHours:
+    start: time = time(9, 0)
+    end: time = time(17, 0)
+    days: Tuple[int, ...] = (0, 1, 2, 3, 4)  # Monday = 0
+    tz: tzinfo = timezone.utc
+
+    def intervals(self, window: Interval) -> Iterator[Interval]:
+        """
+        Working periods of each day in the window, clipped to it.
+        """
+        start, end = window
+        day = start.astimezone(self.tz).date() - timedelta(days=1)
+        last = end.astimezone(self.tz).date()
+
+        while day <= last:
+            if day.weekday() in self.days:
+                opens = datetime.combine(day, self.start, tzinfo=self.tz)
+                closes = datetime.combine(day, self.end, tzinfo=self.tz)
+                opens, closes = max(opens, start), min(closes, end)
+                if opens < closes:
+                    yield opens, closes
+            day += timedelta(days=1)
+
+
+def find_free_slots(
+    events: Iterable[Dict[str, Any]],
+    window: Interval,
+    duration: timedelta,
+    working_hours: Optional[WorkingHours] = None,
+    min_gap: timedelta = timedelta(0),
+    limit: Optional[int] = None,
+) -> List[Interval]:
+    """
+    Free periods of at least ``duration`` inside the window.
+
+    Busy intervals are padded by ``min_gap`` on both sides, sorted and
+    merged, then subtracted from the working hours in one sweep:
+    O(n log n) in the number of events.
+    """
+
+    busy = merge(
+        (start - min_gap, end + min_gap)
+        for start, end in busy_intervals(events, window)
+    )
+    open_periods = (
+        working_hours.intervals(window) if working_hours else iter([window])
+    )
+
+    slots = []
+    index = 0
+
+    for opens, closes in open_periods:
+        # Busy intervals ending before this period can never matter again
+        while index < len(busy) and busy[index][1] <= opens:
+            index += 1
+
+        cursor = opens
+        position = index
+        while position < len(busy) and busy[position][0] < closes:
+            busy_start, busy_end = busy[position]
+            if busy_start - cursor >= duration:
+                slots.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+            position += 1
+
+        if closes - cursor >= duration:
+            slots.append((cursor, closes))
+
+        if limit is not None and len(slots) >= limit:
+            return slots[:limit]
+
+    return slots
+
+
+def busy_intervals(events: Iterable[Dict[str, Any]], window: Interval) -> Iterator[Interval]:
+    """
+    Busy time of each event overlapping the window, with recurring
+    series expanded. Cancelled and free events are skipped.
+    """
+
+    window_start, window_end = window
+
+    for event in events:
+        if event.get("isCancelled") or event.get("showAs") in ("free", "workingElsewhere"):
+            continue
+
+        start, end = event_interval(event)
+        if start is None or end is None:
+            continue
+
+        if event.get("type") == "seriesMaster" and event.get("recurrence"):
+            occurrences = expand_recurrence(event["recurrence"], start, end, window)
+        else:
+            occurrences = [(start, end)]
+
+        for occurrence_start, occurrence_end in occurrences:
+            if occurrence_start < window_end and occurrence_end > window_start:
+                yield occurrence_start, occurrence_end
+
+
+def merge(intervals: Iterable[Interval]) -> List[Interval]:
+    merged: List[Interval] = []
+
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+
+    return merged
+
+
+def expand_recurrence(
+    recurrence: Dict[str, Any],
+    start: datetime,
+    end: datetime,
+    window: Interval,
+) -> Iterator[Interval]:
+    """
+    Occurrences of a Graph ``patternedRecurrence`` that overlap the
+    window. Supports daily, weekly, and absolute and relative monthly
+    and yearly patterns; anything else is taken as one occurrence.
+    """
+
+    pattern = recurrence.get("pattern") or {}
+    range_ = recurrence.get("range") or {}
+    kind = pattern.get("type")
+    every = max(1, int(pattern.get("interval") or 1))
+    length = end - start
+
+    last_day = _date(range_.get("endDate")) if range_.get("type") == "endDate" else None
+    remaining = (
+        int(range_.get("numberOfOccurrences") or 0)
+        if range_.get("type") == "numbered" else None
+    )
+    first_day = _date(range_.get("startDate")) or start.date()
+
+    window_start, window_end = window
+
+    # Jump close to the window unless occurrences must be counted from
+    # the start of the series
+    since = first_day
+    if remaining is None:
+        since = max(first_day, window_start.date() - timedelta(days=length.days + 1))
+
+    weekdays = {
+        WEEKDAYS.index(day) for day in pattern.get("daysOfWeek") or ()
+        if day in WEEKDAYS
+    } or {start.weekday()}
+
+    if kind == "daily":
+        days = _every_n_days(first_day, every, since)
+    elif kind == "weekly":
+        days = _weekly(first_day, every, weekdays, since)
+    elif kind == "absoluteMonthly":
+        days = _monthly(
+            first_day, every, int(pattern.get("dayOfMonth") or start.day), since,
+        )
+    elif kind == "absoluteYearly":
+        days = _monthly(
+            first_day, 12 * every, int(pattern.get("dayOfMonth") or start.day), since,
+            month=int(pattern.get("month") or start.month),
+        )
+    elif kind == "relativeMonthly":
+        days = _relative_monthly(
+            first_day, every, weekdays, pattern.get("index") or "first", since,
+        )
+    elif kind == "relativeYearly":
+        days = _relative_monthly(
+            first_day, 12 * every, weekdays, pattern.get("index") or "first", since,
+            month=int(pattern.get("month") or start.month),
+        )
+    else:
+        days = iter([start.date()])
+
+    for count, day in enumerate(days):
+        if count >= MAX_OCCURRENCES:
+            return
+        if last_day is not None and day > last_day:
+            return
+        if remaining is not None:
+            if remaining <= 0:
+                return
+            remaining -= 1
+
+        occurrence_start = datetime.combine(day, start.timetz())
+        if occurrence_start >= window_end:
+            return
+        if occurrence_start + length > window_start:
+            yield occurrence_start, occurrence_start + length
+
+
+def event_interval(event: Dict[str, Any]) -> Tuple[Optional[datetime], Optional[datetime]]:
+    return _parse(event.get("start")), _parse(event.get("end"))
+
+
+def zone(name: Optional[str]) -> tzinfo:
+    """
+    IANA zone by name; UTC for empty or unknown names (Graph may send
+    Windows zone names such as "Pacific Standard Time").
+    """
+
+    if not name or name.upper() == "UTC":
+        return timezone.utc
+
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+def _parse(value: Any) -> Optional[datetime]:
+    # {"dateTime": "2026-10-18T09:00:00.0000000", "timeZone": "UTC"}
+    if isinstance(value, dict):
+        text, tz = value.get("dateTime"), zone(value.get("timeZone"))
+    else:
+        text, tz = value, timezone.utc
+
+    if not text:
+        return None
+
+    try:
+        parsed = datetime.fromisoformat(text[:19])
+    except ValueError:
+        return None
+
+    return parsed.replace(tzinfo=tz)
+
+
+def _date(value: Optional[str]) -> Optional[date]:
+    if not value or value.startswith("0001"):
+        return None
+
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+
+
+def _every_n_days(first: date, every: int, since: date) -> Iterator[date]:
+    skipped = max(0, (since - first).days // every)
+    day = first + timedelta(days=skipped * every)
+    while True:
+        yield day
+        day += timedelta(days=every)
+
+
+def _weekly(first: date, every: int, weekdays: set, since: date) -> Iterator[date]:
+    week = first - timedelta(days=first.weekday())
+    skipped = max(0, (since - week).days // 7 // every)
+    week += timedelta(weeks=skipped * every)
+
+    while True:
+        for offset in sorted(weekdays):
+            day = week + timedelta(days=offset)
+            if day >= first:
+                yield day
+        week += timedelta(weeks=every)
+
+
+def _months(first: date, every: int, since: date,
+            month: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+    year, current = first.year, month or first.month
+    if month is not None and current < first.month:
+        year += 1
+
+    skipped = max(0, ((since.year - year) * 12 + since.month - current) // every)
+    current += skipped * every
+
+    # Bounded: a day that never exists (e.g. February 30) yields nothing
+    for _ in range(MAX_OCCURRENCES):
+        year += (current - 1) // 12
+        current = (current - 1) % 12 + 1
+        yield year, current
+        current += every
+
+
+def _monthly(first: date, every: int, day_of_month: int, since: date,
+             month: Optional[int] = None) -> Iterator[date]:
+    for year, current in _months(first, every, since, month):
+        try:
+            day = date(year, current, day_of_month)
+        except ValueError:  # e.g. the 31st in a 30-day month
+            continue
+
+        if day >= first:
+            yield day
+
+
+def _relative_monthly(first: date, every: int, weekdays: set, index: str,
+                      since: date, month: Optional[int] = None) -> Iterator[date]:
+    # e.g. the second Tuesday, or the last Monday or Friday, of the month
+    for year, current in _months(first, every, since, month):
+        matches = [
+            date(year, current, day)
+            for day in range(1, calendar.monthrange(year, current)[1] + 1)
+            if date(year, current, day).weekday() in weekdays
+        ]
+        day = matches[-1] if index == "last" else matches[
+            WEEK_INDEX.index(index) if index in WEEK_INDEX else 0
+        ]
+
+        if day >= first:
+            yield day
@@ -1,46 +1,119 @@
-from datetime import datetime, timedelta, timezone
-from typing import Any
-from ..core.graph_client import GraphClient
+from datetime import datetime, time, timedelta, timezone
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Optional
+from ..core.graph_client import GraphClient, returns_sign_in
+from .availability import WEEKDAYS, WorkingHours, find_free_slots, zone
+
+if TYPE_CHECKING:
+    from ..sync.engine import SyncEngine
 
 
 class CalendarService:
-    def __init__(self, client: GraphClient):
+    def __init__(self, client: GraphClient, sync: Optional["SyncEngine"] = None):
         self.client = client
+        self.sync = sync
 
-    def list_upcoming_events(
+    @returns_sign_in
+    async def list_upcoming_events(
         self,
         days_ahead: int = 7,
-        limit: int = 20,
+        limit: Optional[int] = 20,
     ) -> Any:
         """
         List upcoming calendar events.
         Returns authentication instructions if auth is required.
+        Pass limit=None to walk every page.
         """
 
-        #  Step 1 — Authentication check
-        headers = self.client._headers()
+        #  Step 1 — Serve from the delta-synced store when there is one
+        if self.sync is not None:
+            return await self.sync.list_events(days_ahead, limit)
+
+        #  Step 2 — Otherwise collect pages up to the limit
+        return [
+            event async for event in self.iter_upcoming_events(days_ahead, limit)
+        ]
 
-        if isinstance(headers, dict) and headers.get("status") != "success":
-            return headers
+    async def iter_upcoming_events(
+        self,
+        days_ahead: int = 7,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream upcoming calendar events across result pages.
+        """
 
-        #  Step 2 — Date range
-        now = datetime.now(timezone.utc)
+        # Whole minutes keep repeated calls cacheable
+        now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
         end_date = now + timedelta(days=days_ahead)
 
-        response = self.client._client.get(
-            f"{self.client.settings.graph_base_url}/me/calendarView",
-            headers={
-                "Authorization": headers["Authorization"]
-            },
-            params={
-                "startDateTime": now.isoformat(),
-                "endDateTime": end_date.isoformat(),
-                "$top": limit,
-                "$orderby": "start/dateTime",
-            },
+        params = {
+            "startDateTime": now.isoformat(),
+            "endDateTime": end_date.isoformat(),
+            "$orderby": "start/dateTime",
+        }
+        if self.client.settings.event_select:
+            params["$select"] = ",".join(self.client.settings.event_select)
+
+        async for event in self.client.paginate(
+            "/me/calendarView",
+            params=params,
+            limit=limit,
+        ):
+            yield event
+
+    async def find_free_slots(
+        self,
+        duration_minutes: int = 30,
+        window_days: int = 5,
+        min_gap_minutes: int = 0,
+        limit: Optional[int] = 10,
+    ) -> Any:
+        """
+        Free slots of at least duration_minutes in working hours over the
+        next window_days days, computed locally from the calendar.
+        Returns authentication instructions if auth is required.
+        """
+
+        events = await self.list_upcoming_events(days_ahead=window_days, limit=None)
+
+        if isinstance(events, dict) and events.get("status") != "success":
+            return events
+
+        hours = self._working_hours()
+
+        # Slots start on the next quarter hour
+        now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+        start = now + timedelta(minutes=-now.minute % 15)
+        window = (start, now + timedelta(days=window_days))
+
+        slots = find_free_slots(
+            events,
+            window,
+            timedelta(minutes=duration_minutes),
+            working_hours=hours,
+            min_gap=timedelta(minutes=min_gap_minutes),
+            limit=limit,
         )
 
-        response.raise_for_status()
+        return [
+            {
+                "start": slot_start.astimezone(hours.tz).isoformat(timespec="minutes"),
+                "end": slot_end.astimezone(hours.tz).isoformat(timespec="minutes"),
+                "minutes": int((slot_end - slot_start).total_seconds() // 60),
+            }
+            for slot_start, slot_end in slots
+        ]
 
-        return response.json().get("value", [])
+    def _working_hours(self) -> WorkingHours:
+        settings = self.client.settings
+        opens, closes = settings.working_hours.split("-")
+        days = {name.strip().lower()[:3] for name in settings.working_days}
 
+        return WorkingHours(
+            start=time.fromisoformat(opens.strip()),
+            end=time.fromisoformat(closes.strip()),
+            days=tuple(
+                index for index, day in enumerate(WEEKDAYS) if day[:3] in days
+            ),
+            tz=zone(settings.time_zone),
+        )
@@ -1,51 +1,128 @@
+import asyncio
+import base64
+import pathlib
+import re
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict,List
-from ..core.graph_client import GraphClient
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict,List, Optional
+from ..core.graph_client import GraphClient, partial_resource, returns_sign_in
+
+if TYPE_CHECKING:
+    from ..sync.engine import SyncEngine
+
+# Attachment metadata; never contentBytes, which inlines the whole file
+ATTACHMENT_SELECT = "id,name,contentType,size,isInline,lastModifiedDateTime"
+
+# Larger files go through an upload session: a JSON request to Graph is
+# capped at 4 MB, and base64 adds a third
+INLINE_ATTACHMENT_LIMIT = 3 * 1024 * 1024
 
 
 class MailService:
-    def __init__(self, client: GraphClient):
+    def __init__(self, client: GraphClient, sync: Optional["SyncEngine"] = None):
         self.client = client
+        self.sync = sync
 
-    def list_last_n_days(self, days: int = 5, limit: int = 20) -> Any:
+    @returns_sign_in
+    async def list_last_n_days(self, days: int = 5,
+                               limit: Optional[int] = 20) -> Any:
         """
         List inbox emails from the last N days.
         If authentication is required, returns authentication instructions.
+        Pass limit=None to walk every page.
         """
 
-        #  Step 1 — Check authentication first
-        headers = self.client._headers()
+        #  Step 1 — Serve from the delta-synced store when there is one
+        if self.sync is not None:
+            return await self.sync.list_messages(days, limit)
 
-        # If auth not successful, return auth instructions immediately
-        if isinstance(headers, dict) and headers.get("status") != "success":
-            return headers
+        #  Step 2 — Otherwise collect pages up to the limit
+        return [
+            message async for message in self.iter_last_n_days(days, limit)
+        ]
 
-        #  Step 2 — Compute date filter
+    async def iter_last_n_days(self, days: int = 5,
+                               limit: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream inbox emails from the last N days across result pages.
+        """
+
+        # Whole minutes keep repeated calls cacheable
         cutoff = (
-            datetime.now(timezone.utc) - timedelta(days=days)
+            datetime.now(timezone.utc).replace(second=0, microsecond=0)
+            - timedelta(days=days)
         ).isoformat()
 
-        #  Step 3 — Call Graph API
-        response = self.client._client.get(
-            f"{self.client.settings.graph_base_url}/me/mailFolders/inbox/messages",
-            headers={
-                "Authorization": f"Bearer {headers['Authorization'].split(' ')[1]}"
-            },
-            params={
-                "$top": limit,
-                "$filter": f"receivedDateTime ge {cutoff}",
-                "$orderby": "receivedDateTime desc",
-            },
-        )
+        params = {
+            "$filter": f"receivedDateTime ge {cutoff}",
+            "$orderby": "receivedDateTime desc",
+        }
+        if self.client.settings.mail_select:
+            params["$select"] = ",".join(self.client.settings.mail_select)
+
+        async for message in self.client.paginate(
+            "/me/mailFolders/inbox/messages",
+            params=params,
+            limit=limit,
+        ):
+            yield message
+
+
+
+    @returns_sign_in
+    async def get_email(self, email_id: str, include_body: bool = True) -> Any:
+        """
+        Fetch a single email by ID.
+
+        The list tools only return a trimmed projection; use this to get
+        the full body, recipients and other fields of one message.
+        """
+
+        params = None
+        if not include_body and self.client.settings.mail_select:
+            params = {"$select": ",".join(self.client.settings.mail_select)}
+
+        message = await self.client.get(f"/me/messages/{email_id}", params=params)
+
+        # Make the full body searchable once we have paid for it
+        if self.sync is not None and message.get("body"):
+            self.sync.store.index_body(email_id, message["body"])
+
+        return message
 
-        response.raise_for_status()
+    async def search_emails(
+        self,
+        query: str,
+        sender: str | None = None,
+        after: str | None = None,
+        before: str | None = None,
+        limit: int = 20,
+    ) -> Any:
+        """
+        Search synced mail in the local full-text index.
 
-        return response.json().get("value", [])
+        Does not call Graph; results cover what the delta sync (and any
+        opened emails) has brought into the local store, which is the
+        Inbox only.
+        """
 
+        if self.sync is None:
+            return {
+                "status": "unavailable",
+                "message": "Local store is disabled (M365_LOCAL_STORE=0).",
+            }
 
+        return self.sync.store.search_messages(
+            query,
+            sender=sender,
+            after=after,
+            before=before,
+            limit=limit,
+        )
 
-    def forward_email(self, email_id: str, to: List[str], 
-                      comment: str | None = None) -> Any:
+    @returns_sign_in
+    async def forward_email(self, email_id: str, to: List[str], 
+                      comment: str | None = None,
+                      attachments: List[str] | None = None) -> Any:
         """
         Forward an existing email to new recipients.
 
@@ -53,11 +130,13 @@ class MailService:
             email_id: The Microsoft Graph ID of the email to forward.
             to: List of recipient email addresses.
             comment: Optional message to include when forwarding.
+            attachments: Optional files to add, relative to the
+                attachment folder.
         """
 
-        headers = self.client._headers()
-        if headers.get("status") != "success":
-            return headers
+        files = self._attachment_files(attachments)
+        if isinstance(files, dict):
+            return files
 
         payload = {
             "toRecipients": [
@@ -68,27 +147,24 @@ class MailService:
         if comment:
             payload["comment"] = comment
 
-        response = self.client._client.post(
-            f"{self.client.settings.graph_base_url}/me/messages/{email_id}/forward",
-            headers={
-                "Authorization": headers["Authorization"],
-                "Content-Type": "application/json",
-            },
-            json=payload,
-        )
-
-        response.raise_for_status()
+        if files:
+            draft = await self.client.post(f"/me/messages/{email_id}/createForward", json=payload)
+            await self._send_with_attachments(draft["id"], files)
+        else:
+            await self.client.post(f"/me/messages/{email_id}/forward", json=payload)
         return {"status": "forwarded"}
 
 
-    def reply_all_email(self, email_id: str, body: str) -> Any:
+    @returns_sign_in
+    async def reply_all_email(self, email_id: str, body: str,
+                              attachments: List[str] | None = None) -> Any:
         """
         Reply to all recipients of a specific email.
         """
 
-        headers = self.client._headers()
-        if headers.get("status") != "success":
-            return headers
+        files = self._attachment_files(attachments)
+        if isinstance(files, dict):
+            return files
 
         payload = {
             "message": {
@@ -99,20 +175,16 @@ class MailService:
             }
         }
 
-        response = self.client._client.post(
-            f"{self.client.settings.graph_base_url}/me/messages/{email_id}/replyAll",
-            headers={
-                "Authorization": headers["Authorization"],
-                "Content-Type": "application/json",
-            },
-            json=payload,
-        )
-
-        response.raise_for_status()
+        if files:
+            draft = await self.client.post(f"/me/messages/{email_id}/createReplyAll", json=payload)
+            await self._send_with_attachments(draft["id"], files)
+        else:
+            await self.client.post(f"/me/messages/{email_id}/replyAll", json=payload)
         return {"status": "replied_all"}
 
 
-    def flag_email(self, email_id: str, status: str = "flagged") -> Any:
+    @returns_sign_in
+    async def flag_email(self, email_id: str, status: str = "flagged") -> Any:
         """
         Flag an email for follow-up.
 
@@ -122,94 +194,123 @@ class MailService:
             - 'notFlagged'
         """
 
-        headers = self.client._headers()
-        if headers.get("status") != "success":
-            return headers
-
-        response = self.client._client.patch(
-            f"{self.client.settings.graph_base_url}/me/messages/{email_id}",
-            headers={
-                "Authorization": headers["Authorization"],
-                "Content-Type": "application/json",
-            },
+        await self.client.patch(
+            f"/me/messages/{email_id}",
             json={
                 "flag": {
                     "flagStatus": status
                 }
             },
         )
-
-        response.raise_for_status()
         return {"status": status}
 
 
-    def create_mail_folder(self, folder_name: str) -> Any:
+    @returns_sign_in
+    async def create_mail_folder(self, folder_name: str) -> Any:
         """
         Create a new mail folder in the user's mailbox.
         """
 
-        headers = self.client._headers()
-        if headers.get("status") != "success":
-            return headers
-
-        response = self.client._client.post(
-            f"{self.client.settings.graph_base_url}/me/mailFolders",
-            headers={
-                "Authorization": headers["Authorization"],
-                "Content-Type": "application/json",
-            },
+        return await self.client.post(
+            "/me/mailFolders",
             json={"displayName": folder_name},
         )
-
-        response.raise_for_status()
-        return response.json()
     
-    def mark_email_read(self, email_id: str) -> Any:
+    @returns_sign_in
+    async def mark_email_read(self, email_id: str) -> Any:
         """
         Mark a specific email as read.
         """
 
-        headers = self.client._headers()
-        if headers.get("status") != "success":
-            return headers
-
-        response = self.client._client.patch(
-            f"{self.client.settings.graph_base_url}/me/messages/{email_id}",
-            headers={
-                "Authorization": headers["Authorization"],
-                "Content-Type": "application/json",
-            },
-            json={"isRead": True},
-        )
-
-        response.raise_for_status()
+        await self.client.patch(f"/me/messages/{email_id}", json={"isRead": True})
         return {"status": "marked_as_read"}
-    def mark_email_unread(self, email_id: str) -> Any:
+    @returns_sign_in
+    async def mark_email_unread(self, email_id: str) -> Any:
         """
         Mark a specific email as unread.
         """
 
-        headers = self.client._headers()
-        if headers.get("status") != "success":
-            return headers
+        await self.client.patch(f"/me/messages/{email_id}", json={"isRead": False})
+        return {"status": "marked_as_unread"}
+    async def mark_emails_read(self, email_ids: List[str]) -> Any:
+        """
+        Mark several emails as read using Graph batching.
+        """
 
-        response = self.client._client.patch(
-            f"{self.client.settings.graph_base_url}/me/messages/{email_id}",
-            headers={
-                "Authorization": headers["Authorization"],
-                "Content-Type": "application/json",
-            },
-            json={"isRead": False},
+        return await self._batch_patch(email_ids, {"isRead": True}, "marked_as_read")
+
+    async def mark_emails_unread(self, email_ids: List[str]) -> Any:
+        """
+        Mark several emails as unread using Graph batching.
+        """
+
+        return await self._batch_patch(email_ids, {"isRead": False}, "marked_as_unread")
+
+    async def flag_emails(self, email_ids: List[str], status: str = "flagged") -> Any:
+        """
+        Set the follow-up flag on several emails using Graph batching.
+        """
+
+        return await self._batch_patch(
+            email_ids,
+            {"flag": {"flagStatus": status}},
+            status,
         )
 
-        response.raise_for_status()
-        return {"status": "marked_as_unread"}
-    def reply_to_recipient(
+    @returns_sign_in
+    async def move_emails(self, email_ids: List[str], folder: str) -> Any:
+        """
+        Move several emails to a folder using Graph batching.
+
+        Args:
+            email_ids: Graph IDs of the emails to move.
+            folder: Destination folder ID or well-known name
+                (e.g. 'archive', 'deleteditems', 'inbox').
+        """
+
+        # Each email once: a second move of the same ID could only fail
+        email_ids = list(dict.fromkeys(email_ids))
+        responses = await self.client.batch([
+            {
+                "method": "POST",
+                "url": f"/me/messages/{email_id}/move",
+                "body": {"destinationId": folder},
+            }
+            for email_id in email_ids
+        ])
+
+        results = _batch_results(email_ids, responses, "moved")
+
+        # Moving an item gives it a new ID in the destination folder.
+        for email_id, response in zip(email_ids, responses):
+            if results[email_id]["status"] == "moved":
+                results[email_id]["new_id"] = (response.get("body") or {}).get("id")
+
+        return results
+
+    @returns_sign_in
+    async def _batch_patch(self, email_ids: List[str], payload: Dict[str, Any],
+                           success_status: str) -> Any:
+        email_ids = list(dict.fromkeys(email_ids))
+        responses = await self.client.batch([
+            {
+                "method": "PATCH",
+                "url": f"/me/messages/{email_id}",
+                "body": payload,
+            }
+            for email_id in email_ids
+        ])
+
+        return _batch_results(email_ids, responses, success_status)
+
+    @returns_sign_in
+    async def reply_to_recipient(
         self,
         original_email_id: str,
         recipient: str,
         body: str,
         subject: str | None = None,
+        attachments: List[str] | None = None,
     ) -> Any:
         """
         Reply to a specific recipient only.
@@ -218,15 +319,12 @@ class MailService:
         Instead, it sends a new message referencing the original email.
         """
 
-        headers = self.client._headers()
-        if headers.get("status") != "success":
-            return headers
+        files = self._attachment_files(attachments)
+        if isinstance(files, dict):
+            return files
 
         # Fetch original email for subject reference if needed
-        original = self.get_email(original_email_id)
-
-        if isinstance(original, dict) and original.get("status") != "success":
-            return original
+        original = await self.get_email(original_email_id, include_body=False)
 
         final_subject = subject or f"Re: {original.get('subject', '')}"
 
@@ -243,14 +341,171 @@ class MailService:
             }
         }
 
-        response = self.client._client.post(
-            f"{self.client.settings.graph_base_url}/me/sendMail",
-            headers={
-                "Authorization": headers["Authorization"],
-                "Content-Type": "application/json",
-            },
-            json=payload,
+        if files:
+            # Attachments are added to a draft before it is sent
+            draft = await self.client.post("/me/messages", json=payload["message"])
+            await self._send_with_attachments(draft["id"], files)
+        else:
+            await self.client.post("/me/sendMail", json=payload)
+        return {"status": "sent_to_specific_recipient"}
+
+    @returns_sign_in
+    async def list_attachments(self, email_id: str) -> Any:
+        """
+        List the attachments of an email: id, name, content type and size.
+        """
+
+        page = await self.client.get(
+            f"/me/messages/{email_id}/attachments",
+            params={"$select": ATTACHMENT_SELECT},
         )
+        return page.get("value", [])
 
-        response.raise_for_status()
-        return {"status": "sent_to_specific_recipient"}
+    @returns_sign_in
+    async def download_attachment(self, email_id: str, attachment_id: str,
+                                  dest: str | None = None) -> Any:
+        """
+        Save an attachment to disk under the attachment folder.
+
+        dest is a file name or sub-folder relative to that folder; it
+        defaults to the attachment's own name. The content is streamed,
+        and an interrupted download resumes where it stopped.
+        """
+
+        path = f"/me/messages/{email_id}/attachments/{attachment_id}"
+        meta = await self.client.get(path, params={"$select": "name,size"})
+
+        target = _in_attachment_dir(self.client.settings.attachment_dir, dest or "")
+        if target is None:
+            return _outside_attachment_dir(dest)
+
+        if dest is None or target.is_dir() or dest.endswith(("/", "\\")):
+            target = target / _safe_name(meta.get("name") or attachment_id)
+
+        resource = f"{path}/$value"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target = _free_name(target, resource)
+
+        try:
+            size = await self.client.download(resource, target)
+        except FileExistsError:
+            return {"status": "error", "message": f"File already exists: {target.name}"}
+
+        return {"status": "downloaded", "path": str(target), "bytes": size}
+
+    def _attachment_files(self, attachments: List[str] | None):
+        """
+        Resolve attachment paths before anything is sent; an error dict if
+        one is missing or outside the attachment folder.
+        """
+
+        files = []
+
+        for name in attachments or []:
+            path = _in_attachment_dir(self.client.settings.attachment_dir, name)
+            if path is None:
+                return _outside_attachment_dir(name)
+            if not path.is_file():
+                return {"status": "error", "message": f"Attachment not found: {name}"}
+            files.append(path)
+
+        return files
+
+    async def _send_with_attachments(self, draft_id: str, files: List[pathlib.Path]):
+        """
+        Attach files to a draft, all at once, then send it. The draft is
+        deleted if an upload fails, so no half-built message is left behind.
+        """
+
+        try:
+            await asyncio.gather(*(self._attach(draft_id, path) for path in files))
+        except BaseException:
+            await self.client.delete(f"/me/messages/{draft_id}")
+            raise
+
+        await self.client.post(f"/me/messages/{draft_id}/send")
+
+    async def _attach(self, message_id: str, path: pathlib.Path):
+        size = path.stat().st_size
+
+        if size < INLINE_ATTACHMENT_LIMIT:
+            content = await asyncio.to_thread(path.read_bytes)
+            await self.client.post(
+                f"/me/messages/{message_id}/attachments",
+                json={
+                    "@odata.type": "#microsoft.graph.fileAttachment",
+                    "name": path.name,
+                    "contentBytes": base64.b64encode(content).decode(),
+                },
+            )
+            return
+
+        session = await self.client.post(
+            f"/me/messages/{message_id}/attachments/createUploadSession",
+            json={"AttachmentItem": {
+                "attachmentType": "file",
+                "name": path.name,
+                "size": size,
+            }},
+        )
+        await self.client.upload(session["uploadUrl"], path)
+
+
+def _in_attachment_dir(root: pathlib.Path, name: str) -> Optional[pathlib.Path]:
+    # None if the path escapes the folder (absolute, "..", symlinks)
+    root = root.expanduser().resolve()
+    path = (root / name).resolve()
+    return path if path.is_relative_to(root) else None
+
+
+def _outside_attachment_dir(name: str) -> Dict[str, str]:
+    return {
+        "status": "error",
+        "message": f"{name!r} is outside the attachment folder (M365_ATTACHMENT_DIR).",
+    }
+
+
+def _safe_name(name: str) -> str:
+    # Attachment names come from the sender; keep them to one plain file name
+    name = re.sub(r'[<>:"/\\|?*\x00-\x1f]', "_", name).strip(" .")
+    return name or "attachment"
+
+
+def _free_name(target: pathlib.Path, resource: str) -> pathlib.Path:
+    """
+    ``target``, or else ``name (1).ext``, ``name (2).ext``...: the first
+    name that is neither taken nor an unfinished download of another
+    resource. An unfinished download of ``resource`` itself is resumed.
+    """
+
+    candidate, n = target, 0
+
+    while candidate.exists() or partial_resource(candidate) not in (None, resource):
+        n += 1
+        candidate = target.with_name(f"{target.stem} ({n}){target.suffix}")
+
+    return candidate
+
+
+def _batch_results(email_ids: List[str], responses: List[Dict[str, Any]],
+                   success_status: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Turn batch sub-responses, in request order, into a per-id status map.
+    """
+
+    results = {}
+
+    for email_id, response in zip(email_ids, responses):
+        code = response.get("status", 0)
+
+        if 200 <= code < 300:
+            results[email_id] = {"status": success_status}
+        else:
+            error = (response.get("body") or {}).get("error", {})
+            results[email_id] = {
+                "status": "error",
+                "code": code,
+                "message": error.get("message", error.get("code", "")),
+            }
+
+    return results
@@ -0,0 +1,183 @@
+import json
+import math
+from typing import Any, Dict, List, Optional
+from ..sync.store import strip_html
+
+# Longest body/preview text passed on, in characters
+TEXT_LIMIT = 2000
+
+# tiktoken encoding, loaded on first use (the server never needs it);
+# False when tiktoken is not installed
+_encoding = None
+
+
+def compact(value: Any, text_limit: int = TEXT_LIMIT) -> Any:
+    """
+    Strip a Graph result down to what a model needs.
+
+    Drops nulls, empty containers and ``@odata`` metadata, flattens
+    ``emailAddress``, ``dateTimeTimeZone`` and other single-value
+    wrappers, turns HTML bodies into plain text and truncates long text.
+    """
+
+    if isinstance(value, dict):
+        flat = _flatten(value, text_limit)
+        if flat is not None:
+            return flat
+
+        result = {}
+        for key, item in value.items():
+            if key.startswith("@odata") or "@odata." in key:
+                continue
+
+            item = compact(item, text_limit)
+            if item is None or item == "" or item == [] or item == {}:
+                continue
+
+            if key == "bodyPreview" and isinstance(item, str):
+                item = truncate(item, text_limit)
+
+            result[key] = item
+        return result
+
+    if isinstance(value, list):
+        return [compact(item, text_limit) for item in value]
+
+    return value
+
+
+def to_json(value: Any, text_limit: int = TEXT_LIMIT) -> str:
+    """
+    Minified JSON of the compacted value; same input, same output.
+    """
+    return json.dumps(
+        compact(value, text_limit),
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+
+
+def to_rows(items: List[Dict[str, Any]], text_limit: int = TEXT_LIMIT) -> str:
+    """
+    Pipe-separated table: one header line, then one line per item.
+    Columns are the union of the items' keys in first-seen order.
+    """
+
+    rows = [compact(item, text_limit) for item in items]
+
+    columns: Dict[str, None] = {}
+    for row in rows:
+        columns.update(dict.fromkeys(row))
+
+    lines = ["|".join(columns)]
+    for row in rows:
+        lines.append("|".join(_cell(row.get(column)) for column in columns))
+
+    return "\n".join(lines)
+
+
+def serialize(result: Any, style: str = "json", text_limit: int = TEXT_LIMIT) -> str:
+    """
+    Render a service result for a model: ``rows`` for lists of items
+    (anything else falls back to JSON), ``json`` otherwise.
+    """
+
+    if style == "rows" and isinstance(result, list) and result \
+            and all(isinstance(item, dict) for item in result):
+        return to_rows(result, text_limit)
+
+    return to_json(result, text_limit)
+
+
+def tool_text(content: Any) -> str:
+    """
+    Text of an MCP tool result as returned by langchain-mcp-adapters:
+    a string, or a list of content blocks.
+    """
+
+    if isinstance(content, str):
+        return content
+
+    if isinstance(content, list):
+        parts = []
+        for block in content:
+            if isinstance(block, str):
+                parts.append(block)
+            elif isinstance(block, dict) and block.get("type") == "text":
+                parts.append(block.get("text", ""))
+            else:
+                parts.append(to_json(block))
+        return "\n".join(parts)
+
+    return to_json(content)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Token count with tiktoken's cl100k_base when installed, otherwise the
+    usual ~4 characters per token estimate.
+    """
+
+    global _encoding
+
+    if _encoding is None:
+        try:
+            import tiktoken
+        except ImportError:  # optional, token counts are estimated without it
+            _encoding = False
+        else:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+
+    if _encoding is False:
+        return math.ceil(len(text) / 4)
+
+    return len(_encoding.encode(text))
+
+
+def truncate(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+
+    return text[:limit].rstrip() + "…"
+
+
+def _flatten(value: Dict[str, Any], text_limit: int) -> Optional[Any]:
+    # {"emailAddress": {"name": ..., "address": ...}} → "Name <address>"
+    if set(value) == {"emailAddress"} and isinstance(value["emailAddress"], dict):
+        address = value["emailAddress"]
+        name, email = address.get("name"), address.get("address")
+        if name and email and name != email:
+            return f"{name} <{email}>"
+        return email or name
+
+    # {"dateTime": ..., "timeZone": ...} → "2026-10-18T09:00 UTC"
+    if set(value) == {"dateTime", "timeZone"}:
+        moment = (value["dateTime"] or "")[:16]
+        return f"{moment} {value['timeZone']}" if value["timeZone"] else moment
+
+    # {"displayName": "Room 1"} / {"flagStatus": "flagged"} → the value
+    if len(value) == 1 and set(value) & {"displayName", "flagStatus"}:
+        return next(iter(value.values()))
+
+    # {"contentType": "html", "content": ...} → plain text
+    if set(value) == {"contentType", "content"}:
+        content = value["content"] or ""
+        if str(value["contentType"]).lower() == "html":
+            content = strip_html(content)
+        return truncate(content, text_limit)
+
+    return None
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+
+    if isinstance(value, bool):
+        return "true" if value else "false"
+
+    if not isinstance(value, str):
+        value = json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+    return value.replace("|", "\\|").replace("\n", " ")
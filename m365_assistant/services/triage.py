@@ -0,0 +1,287 @@
+import asyncio
+import hashlib
+import re
+from datetime import datetime, time, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from .availability import zone
+
+if TYPE_CHECKING:
+    from .calendar_service import CalendarService
+    from .mail_service import MailService
+
+# Words in a subject or preview that make an email more urgent
+URGENT_WORDS = (
+    "urgent", "asap", "immediately", "action required", "critical",
+    "blocker", "escalation", "outage", "overdue", "final notice",
+)
+# Phrases that ask the reader to do something
+REQUEST_WORDS = (
+    "please", "can you", "could you", "would you", "let me know",
+    "need your", "approve", "approval", "review", "confirm", "sign",
+)
+DEADLINE_WORDS = ("deadline", "due", "by eod", "by end of day", "expires")
+
+URGENT_THRESHOLD = 4
+# A deadline this close scores as urgent
+DUE_SOON = timedelta(days=2)
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+_ISO_DATE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_BY_WEEKDAY = re.compile(r"\b(?:by|before|due|until)\s+(" + "|".join(WEEKDAYS) + r")\b")
+_BY_RELATIVE = re.compile(r"\b(?:by|before|due)\s+(today|tonight|eod|end of day|tomorrow)\b")
+
+
+def _words(words) -> re.Pattern:
+    # Whole words only: "due" must not match "procedure"
+    return re.compile(r"\b(?:" + "|".join(map(re.escape, words)) + r")\b")
+
+
+_URGENT = _words(URGENT_WORDS)
+_REQUEST = _words(REQUEST_WORDS)
+_DEADLINE = _words(DEADLINE_WORDS)
+
+
+def score_email(email: Dict[str, Any], now: datetime) -> Tuple[int, List[str]]:
+    """
+    Rule-based urgency score of one email, with the reasons behind it.
+    """
+
+    score = 0
+    reasons = []
+    text = _text(email)
+    flag = email.get("flag") or {}
+
+    if email.get("importance") == "high":
+        score += 3
+        reasons.append("high importance")
+
+    if flag.get("flagStatus") == "flagged":
+        score += 2
+        reasons.append("flagged")
+
+    due = _due(email, now)
+    if due is not None and now <= due <= now + DUE_SOON:
+        score += 3
+        reasons.append("due within 2 days")
+
+    match = _URGENT.search(text)
+    if match:
+        score += 2
+        reasons.append(f"mentions {match.group(0)!r}")
+
+    if not email.get("isRead"):
+        score += 1
+        reasons.append("unread")
+
+    received = _parse(email.get("receivedDateTime"))
+    if received is not None and now - received <= timedelta(hours=24):
+        score += 1
+        reasons.append("received in the last 24h")
+
+    return score, reasons
+
+
+def triage(
+    emails: List[Dict[str, Any]],
+    events: List[Dict[str, Any]],
+    now: Optional[datetime] = None,
+    urgent_threshold: int = URGENT_THRESHOLD,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Build the executor's JSON (urgent_emails, deadlines, meetings,
+    pending_actions) from Graph messages and events, without a model.
+    """
+
+    now = now or datetime.now(timezone.utc)
+
+    urgent_emails = []
+    deadlines = []
+    pending_actions = []
+
+    for email in emails:
+        score, reasons = score_email(email, now)
+        summary = {
+            "id": email.get("id"),
+            "subject": email.get("subject"),
+            "from": _sender(email),
+        }
+
+        if score >= urgent_threshold:
+            urgent_emails.append(dict(summary, score=score, reasons=reasons))
+
+        due = _due(email, now)
+        if due is not None or _DEADLINE.search(_text(email)):
+            deadlines.append(dict(summary, due=_iso(due) if due else None))
+
+        action = _action(email)
+        if action:
+            pending_actions.append(dict(summary, action=action))
+
+    urgent_emails.sort(key=lambda item: -item["score"])
+    deadlines.sort(key=lambda item: item["due"] or "9999")
+
+    meetings = [
+        {
+            "id": event.get("id"),
+            "subject": event.get("subject"),
+            "start": _iso(_parse(event.get("start"))),
+            "end": _iso(_parse(event.get("end"))),
+            "location": (event.get("location") or {}).get("displayName"),
+            "organizer": _sender(event, "organizer"),
+            "all_day": bool(event.get("isAllDay")),
+        }
+        for event in events
+        if not event.get("isCancelled") and event.get("showAs") != "free"
+    ]
+    meetings.sort(key=lambda item: item["start"] or "")
+
+    return {
+        "urgent_emails": urgent_emails,
+        "deadlines": deadlines,
+        "meetings": meetings,
+        "pending_actions": pending_actions,
+    }
+
+
+async def triage_day(
+    mail: "MailService",
+    calendar: "CalendarService",
+    email_days: int = 5,
+    days_ahead: int = 1,
+    limit: int = 100,
+) -> Any:
+    """
+    Fetch recent email and upcoming events and triage them.
+    Returns authentication instructions if auth is required.
+    """
+
+    emails, events = await asyncio.gather(
+        mail.list_last_n_days(days=email_days, limit=limit),
+        calendar.list_upcoming_events(days_ahead=days_ahead, limit=limit),
+    )
+
+    for result in (emails, events):
+        if isinstance(result, dict) and result.get("status") != "success":
+            return result
+
+    return triage(emails, events)
+
+
+async def context_fingerprint(
+    mail: "MailService",
+    calendar: "CalendarService",
+    email_days: int = 5,
+    days_ahead: int = 7,
+) -> Any:
+    """
+    Content hash of the context a daily plan is built from: the ids and
+    changeKeys of recent email and upcoming events. Any new, changed or
+    removed item gives a new hash.
+    Returns authentication instructions if auth is required.
+    """
+
+    emails, events = await asyncio.gather(
+        mail.list_last_n_days(days=email_days, limit=None),
+        calendar.list_upcoming_events(days_ahead=days_ahead, limit=None),
+    )
+
+    for result in (emails, events):
+        if isinstance(result, dict) and result.get("status") != "success":
+            return result
+
+    digest = hashlib.sha256()
+    for section, items in (("mail", emails), ("events", events)):
+        digest.update(f"{section}\n".encode())
+        for key in sorted(_version(item) for item in items):
+            digest.update(f"{key}\n".encode())
+
+    return {
+        "fingerprint": digest.hexdigest(),
+        "emails": len(emails),
+        "events": len(events),
+    }
+
+
+def _version(item: Dict[str, Any]) -> str:
+    # Graph sends every item with an @odata.etag that carries its
+    # changeKey, so neither $select nor the store needs the field itself
+    return f"{item['id']} {item.get('changeKey') or item.get('@odata.etag') or ''}"
+
+
+def _action(email: Dict[str, Any]) -> Optional[str]:
+    flag = email.get("flag") or {}
+    sender = _sender(email) or "the sender"
+
+    if flag.get("flagStatus") == "flagged":
+        return f"Follow up on flagged email from {sender}"
+
+    if not email.get("isRead") and _REQUEST.search(_text(email)):
+        return f"Reply to {sender}"
+
+    return None
+
+
+def _due(email: Dict[str, Any], now: datetime) -> Optional[datetime]:
+    flag = email.get("flag") or {}
+    due = _parse(flag.get("dueDateTime"))
+    if due is not None:
+        return due
+
+    text = _text(email)
+
+    # Dates already past (quoted threads, references) are not deadlines
+    for match in _ISO_DATE.finditer(text):
+        try:
+            day = _end_of(datetime(*map(int, match.groups()), tzinfo=timezone.utc))
+        except ValueError:
+            continue
+        if day >= now:
+            return day
+
+    match = _BY_RELATIVE.search(text)
+    if match:
+        offset = 1 if match.group(1) == "tomorrow" else 0
+        return _end_of(now + timedelta(days=offset))
+
+    match = _BY_WEEKDAY.search(text)
+    if match:
+        days = (WEEKDAYS.index(match.group(1)) - now.weekday()) % 7
+        return _end_of(now + timedelta(days=days))
+
+    return None
+
+
+def _end_of(day: datetime) -> datetime:
+    return datetime.combine(day.date(), time(23, 59), tzinfo=day.tzinfo or timezone.utc)
+
+
+def _parse(value: Any) -> Optional[datetime]:
+    # Graph sends "...Z" strings or {"dateTime": ..., "timeZone": ...};
+    # everything is compared and reported in UTC
+    if isinstance(value, dict):
+        value, tz = value.get("dateTime"), zone(value.get("timeZone"))
+    else:
+        tz = timezone.utc
+
+    if not value:
+        return None
+
+    try:
+        parsed = datetime.fromisoformat(value[:19])
+    except ValueError:
+        return None
+
+    return parsed.replace(tzinfo=tz).astimezone(timezone.utc)
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.strftime("%Y-%m-%dT%H:%MZ") if value else None
+
+
+def _sender(item: Dict[str, Any], field: str = "from") -> Optional[str]:
+    address = (item.get(field) or {}).get("emailAddress") or {}
+    return address.get("name") or address.get("address")
+
+
+def _text(email: Dict[str, Any]) -> str:
+    return f"{email.get('subject') or ''} {email.get('bodyPreview') or ''}".lower()
@@ -0,0 +1,178 @@
+import asyncio
+import httpx
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+from ..core.graph_client import GraphClient
+from .store import LocalStore
+
+MAIL_SCOPE = "mail:inbox"
+CALENDAR_SCOPE = "calendar"
+
+GRAPH_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+class SyncEngine:
+    """
+    Keeps a LocalStore in step with the mailbox and calendar using Graph
+    delta queries.
+
+    The first sync walks the full delta feed and saves the returned
+    ``@odata.deltaLink``; later syncs replay only the changes since then.
+    ``@removed`` tombstones delete the local copy, and an expired delta
+    token (410 Gone) triggers a clean resync of that scope.
+    """
+
+    def __init__(
+        self,
+        client: GraphClient,
+        store: LocalStore,
+        mail_days: int = 30,
+        calendar_days: int = 30,
+    ):
+        self.client = client
+        self.store = store
+        self.mail_days = mail_days
+        self.calendar_days = calendar_days
+
+        # One delta round-trip at a time per scope
+        self._locks = {
+            MAIL_SCOPE: asyncio.Lock(),
+            CALENDAR_SCOPE: asyncio.Lock(),
+        }
+
+    # -- reads -------------------------------------------------------------
+
+    async def list_messages(self, days: int = 5,
+                            limit: Optional[int] = 20) -> List[Dict[str, Any]]:
+        await self.sync_mail()
+
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        return self.store.list_messages(_utc(since) + "Z", limit)
+
+    async def list_events(self, days_ahead: int = 7,
+                          limit: Optional[int] = 20) -> List[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        end = now + timedelta(days=days_ahead)
+
+        await self.sync_calendar(until=end)
+
+        return self.store.list_events(_utc(now), _utc(end), limit)
+
+    # -- sync --------------------------------------------------------------
+
+    async def sync_mail(self) -> Dict[str, int]:
+        async with self._locks[MAIL_SCOPE]:
+            state = self.store.get_sync_state(MAIL_SCOPE)
+
+            if state and state["delta_link"]:
+                try:
+                    return await self._walk(
+                        MAIL_SCOPE, state["delta_link"], None,
+                        self.store.upsert_messages, self.store.delete_messages,
+                    )
+                except httpx.HTTPStatusError as exc:
+                    if exc.response.status_code != 410:
+                        raise
+
+            # First sync, or the delta token expired → start over
+            self.store.reset(MAIL_SCOPE, "messages")
+
+            cutoff = datetime.now(timezone.utc) - timedelta(days=self.mail_days)
+            params = {
+                "$filter": f"receivedDateTime ge {_utc(cutoff)}Z",
+            }
+            if self.client.settings.mail_select:
+                params["$select"] = ",".join(
+                    dict.fromkeys(self.client.settings.mail_select + ("parentFolderId",))
+                )
+
+            return await self._walk(
+                MAIL_SCOPE, "/me/mailFolders/inbox/messages/delta", params,
+                self.store.upsert_messages, self.store.delete_messages,
+            )
+
+    async def sync_calendar(self, until: Optional[datetime] = None) -> Dict[str, int]:
+        async with self._locks[CALENDAR_SCOPE]:
+            state = self.store.get_sync_state(CALENDAR_SCOPE)
+            covered = (
+                state and state["delta_link"]
+                and (until is None or state["window_end"] >= _utc(until))
+            )
+
+            if covered:
+                try:
+                    return await self._walk(
+                        CALENDAR_SCOPE, state["delta_link"], None,
+                        self._upsert_events, self.store.delete_events,
+                    )
+                except httpx.HTTPStatusError as exc:
+                    if exc.response.status_code != 410:
+                        raise
+
+            # The calendarView delta window is fixed by the initial request,
+            # so a window that no longer covers ``until`` also needs a resync.
+            self.store.reset(CALENDAR_SCOPE, "events")
+
+            start = datetime.now(timezone.utc).replace(
+                hour=0, minute=0, second=0, microsecond=0
+            )
+            end = start + timedelta(days=self.calendar_days)
+            if until is not None and until > end:
+                end = until
+
+            return await self._walk(
+                CALENDAR_SCOPE,
+                "/me/calendarView/delta",
+                {"startDateTime": _utc(start) + "Z", "endDateTime": _utc(end) + "Z"},
+                self._upsert_events,
+                self.store.delete_events,
+                window_end=_utc(end),
+            )
+
+    def _upsert_events(self, events: List[Dict[str, Any]]):
+        # calendarView/delta does not support $select, so the projection
+        # the direct calendarView path asks Graph for is applied here.
+        self.store.upsert_events(events, self.client.settings.event_select)
+
+    async def _walk(
+        self,
+        scope: str,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        upsert: Callable,
+        delete: Callable,
+        window_end: Optional[str] = None,
+    ) -> Dict[str, int]:
+        stats = {"upserted": 0, "removed": 0, "pages": 0}
+        headers = {"Prefer": f"odata.maxpagesize={self.client.settings.graph_page_size}"}
+
+        if window_end is None:
+            state = self.store.get_sync_state(scope)
+            window_end = state["window_end"] if state else None
+
+        while True:
+            page = await self.client.get(url, params=params, headers=headers)
+            stats["pages"] += 1
+
+            changed, removed = [], []
+            for item in page.get("value", []):
+                if "@removed" in item:
+                    removed.append(item["id"])
+                else:
+                    changed.append(item)
+
+            upsert(changed)
+            delete(removed)
+            stats["upserted"] += len(changed)
+            stats["removed"] += len(removed)
+
+            if "@odata.nextLink" in page:
+                url, params = page["@odata.nextLink"], None
+                continue
+
+            self.store.set_sync_state(scope, page["@odata.deltaLink"], window_end)
+            return stats
+
+
+def _utc(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime(GRAPH_TIME_FORMAT)
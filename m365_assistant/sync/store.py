@@ -0,0 +1,336 @@
+import html
+import json
+import pathlib
+import re
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY,
+    received TEXT,
+    subject TEXT,
+    sender_name TEXT,
+    sender_address TEXT,
+    is_read INTEGER,
+    importance TEXT,
+    flag_status TEXT,
+    folder TEXT,
+    body_preview TEXT,
+    body TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_received ON messages (received DESC);
+
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    start TEXT,
+    end TEXT,
+    subject TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_start ON events (start);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5 (
+    subject, sender_name, sender_address, body_preview, body,
+    content='messages', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, subject, sender_name, sender_address, body_preview, body)
+    VALUES (new.rowid, new.subject, new.sender_name, new.sender_address, new.body_preview, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, subject, sender_name, sender_address, body_preview, body)
+    VALUES ('delete', old.rowid, old.subject, old.sender_name, old.sender_address, old.body_preview, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_au AFTER UPDATE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, subject, sender_name, sender_address, body_preview, body)
+    VALUES ('delete', old.rowid, old.subject, old.sender_name, old.sender_address, old.body_preview, old.body);
+    INSERT INTO messages_fts (rowid, subject, sender_name, sender_address, body_preview, body)
+    VALUES (new.rowid, new.subject, new.sender_name, new.sender_address, new.body_preview, new.body);
+END;
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    scope TEXT PRIMARY KEY,
+    delta_link TEXT,
+    window_end TEXT
+);
+"""
+
+# Bumped whenever SCHEMA or the stored item shape changes. The store only
+# caches Graph, so an older file is dropped and filled again by a full
+# sync instead of migrated.
+SCHEMA_VERSION = 3
+
+DROP_SCHEMA = """
+DROP TRIGGER IF EXISTS messages_ai;
+DROP TRIGGER IF EXISTS messages_ad;
+DROP TRIGGER IF EXISTS messages_au;
+DROP TABLE IF EXISTS messages_fts;
+DROP TABLE IF EXISTS messages;
+DROP TABLE IF EXISTS events;
+DROP TABLE IF EXISTS sync_state;
+"""
+
+
+class LocalStore:
+    """
+    SQLite copy of the mailbox and calendar items kept up to date by
+    delta sync. Items are stored as the Graph JSON they arrived as, with
+    a few columns pulled out for filtering and ordering.
+    """
+
+    def __init__(self, path: pathlib.Path | str):
+        self.path = path
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+
+        version = self._db.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION:
+            self._db.executescript(DROP_SCHEMA)
+        self._db.executescript(SCHEMA)
+        self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        self._db.close()
+
+    # -- messages ----------------------------------------------------------
+
+    def upsert_messages(self, messages: Iterable[Dict[str, Any]]):
+        rows = [_message_row(message) for message in messages]
+
+        # Delta pages only carry the preview. A body indexed by index_body
+        # is kept through read/flag/move changes and dropped once the
+        # subject or preview shows the content itself changed.
+        with self._db:
+            self._db.executemany(
+                """
+                INSERT INTO messages (
+                    id, received, subject, sender_name, sender_address,
+                    is_read, importance, flag_status, folder, body_preview, data
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    received = excluded.received,
+                    subject = excluded.subject,
+                    sender_name = excluded.sender_name,
+                    sender_address = excluded.sender_address,
+                    is_read = excluded.is_read,
+                    importance = excluded.importance,
+                    flag_status = excluded.flag_status,
+                    folder = excluded.folder,
+                    body_preview = excluded.body_preview,
+                    body = CASE
+                        WHEN excluded.subject IS messages.subject
+                         AND excluded.body_preview IS messages.body_preview
+                        THEN messages.body
+                    END,
+                    data = excluded.data
+                """,
+                rows,
+            )
+
+    def index_body(self, message_id: str, body: Dict[str, Any]):
+        """
+        Make the full body of a stored message searchable.
+
+        The text goes in its own column, next to the preview; the stored
+        message JSON keeps its trimmed projection.
+        """
+
+        text = body.get("content") or ""
+        if body.get("contentType", "").lower() == "html":
+            text = strip_html(text)
+
+        with self._db:
+            self._db.execute(
+                "UPDATE messages SET body = ? WHERE id = ?",
+                (text, message_id),
+            )
+
+    def search_messages(
+        self,
+        query: str,
+        sender: Optional[str] = None,
+        after: Optional[str] = None,
+        before: Optional[str] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """
+        Full-text search over subject, sender and body, best matches first.
+        """
+
+        match = _fts_query(query)
+        if not match:
+            return []
+
+        # Sender is matched inside the index too; a LIKE on the joined
+        # rows would have to visit every text hit first.
+        sender_match = _fts_query(sender or "")
+        if sender_match:
+            match = f"({match}) AND {{sender_name sender_address}} : ({sender_match})"
+
+        sql = [
+            "SELECT m.data, bm25(messages_fts, 10.0, 5.0, 5.0, 1.0, 1.0) AS rank",
+            "FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid",
+            "WHERE messages_fts MATCH ?",
+        ]
+        args: List[Any] = [match]
+
+        if after:
+            sql.append("AND m.received >= ?")
+            args.append(after)
+        if before:
+            sql.append("AND m.received < ?")
+            args.append(before)
+
+        sql.append("ORDER BY rank LIMIT ?")
+        args.append(limit)
+
+        results = []
+        for data, rank in self._db.execute(" ".join(sql), args):
+            message = json.loads(data)
+            message["score"] = round(-rank, 3)
+            results.append(message)
+
+        return results
+
+    def delete_messages(self, message_ids: Iterable[str]):
+        with self._db:
+            self._db.executemany(
+                "DELETE FROM messages WHERE id = ?",
+                [(message_id,) for message_id in message_ids],
+            )
+
+    def list_messages(self, since: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        rows = self._db.execute(
+            "SELECT data FROM messages WHERE received >= ? "
+            "ORDER BY received DESC LIMIT ?",
+            (since, -1 if limit is None else limit),
+        )
+        return [json.loads(data) for (data,) in rows]
+
+    # -- events ------------------------------------------------------------
+
+    def upsert_events(self, events: Iterable[Dict[str, Any]],
+                      select: Optional[Iterable[str]] = None):
+        """
+        Store events, keeping only the ``select`` fields of each in its
+        JSON. The indexed columns are read from the full event.
+        """
+
+        keep = set(select) | {"id", "@odata.etag"} if select else None
+        rows = [
+            (
+                event["id"],
+                (event.get("start") or {}).get("dateTime"),
+                (event.get("end") or {}).get("dateTime"),
+                event.get("subject"),
+                json.dumps(_project(event, keep)),
+            )
+            for event in events
+        ]
+
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO events (id, start, end, subject, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def delete_events(self, event_ids: Iterable[str]):
+        with self._db:
+            self._db.executemany(
+                "DELETE FROM events WHERE id = ?",
+                [(event_id,) for event_id in event_ids],
+            )
+
+    def list_events(self, start: str, end: str,
+                    limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        # Anything still running at ``start`` counts, like calendarView.
+        rows = self._db.execute(
+            "SELECT data FROM events WHERE end > ? AND start < ? "
+            "ORDER BY start LIMIT ?",
+            (start, end, -1 if limit is None else limit),
+        )
+        return [json.loads(data) for (data,) in rows]
+
+    # -- sync state --------------------------------------------------------
+
+    def get_sync_state(self, scope: str) -> Optional[Dict[str, Optional[str]]]:
+        row = self._db.execute(
+            "SELECT delta_link, window_end FROM sync_state WHERE scope = ?",
+            (scope,),
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        return {"delta_link": row[0], "window_end": row[1]}
+
+    def set_sync_state(self, scope: str, delta_link: str,
+                       window_end: Optional[str] = None):
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sync_state (scope, delta_link, window_end) "
+                "VALUES (?, ?, ?)",
+                (scope, delta_link, window_end),
+            )
+
+    def reset(self, scope: str, table: str):
+        """
+        Forget a scope's delta token and everything synced under it.
+        """
+
+        if table not in ("messages", "events"):
+            raise ValueError(f"Unknown table: {table}")
+
+        with self._db:
+            self._db.execute("DELETE FROM sync_state WHERE scope = ?", (scope,))
+            self._db.execute(f"DELETE FROM {table}")
+
+
+def _project(item: Dict[str, Any], keep: Optional[set]) -> Dict[str, Any]:
+    if keep is None:
+        return item
+    return {key: value for key, value in item.items() if key in keep}
+
+
+def _message_row(message: Dict[str, Any]) -> tuple:
+    sender = (message.get("from") or {}).get("emailAddress") or {}
+    flag = message.get("flag") or {}
+
+    return (
+        message["id"],
+        message.get("receivedDateTime"),
+        message.get("subject"),
+        sender.get("name"),
+        sender.get("address"),
+        int(bool(message.get("isRead"))),
+        message.get("importance"),
+        flag.get("flagStatus"),
+        message.get("parentFolderId"),
+        message.get("bodyPreview"),
+        json.dumps(message),
+    )
+
+
+def strip_html(text: str) -> str:
+    text = re.sub(r"(?is)<(script|style)\b.*?</\1>", " ", text)
+    text = re.sub(r"<[^>]+>", " ", text)
+    return re.sub(r"\s+", " ", html.unescape(text)).strip()
+
+
+def _fts_query(query: str) -> str:
+    # Quote every word so user input can never be parsed as FTS5 syntax;
+    # the last word also matches as a prefix.
+    terms = re.findall(r"\w+", query)
+
+    if not terms:
+        return ""
+
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+
+import pytest
+from fastmcp import Client
+
+from m365_assistant.core.auth_manager import AuthManager
+from m365_assistant.core.config import Settings
+from m365_assistant.mcp import tools
+from m365_assistant.services import accounts
+from m365_assistant.services.accounts import AccountAccess, AccountRegistry
+
+
+def _settings(tmp_path, **overrides):
+    return Settings(
+        client_id="test",
+        authority="https://login.microsoftonline.com/common",
+        store_path=tmp_path / "default.db",
+        **overrides,
+    )
+
+
+class FakeAuth:
+    def __init__(self, settings, cache_file, username, http_cache, authority):
+        self.username = username
+        self.authority = authority
+        self.cancelled = False
+
+    def cancel_device_flow(self):
+        self.cancelled = True
+
+
+def _closed(context) -> bool:
+    try:
+        context.sync.store._db.execute("SELECT 1")
+    except sqlite3.ProgrammingError:
+        return True
+    return False
+
+
+def test_access_without_keys_file_serves_only_the_default_account():
+    access = AccountAccess("default")
+
+    assert access.resolve(None) == "default"
+    assert access.resolve("any key", "default") == "default"
+    with pytest.raises(PermissionError):
+        access.resolve(None, "alice@contoso.com")
+
+
+def test_access_maps_caller_keys_to_their_accounts(tmp_path):
+    keys = tmp_path / "keys.json"
+    keys.write_text(json.dumps({
+        hashlib.sha256(b"alice-key").hexdigest(): ["alice@contoso.com", "shared@contoso.com"],
+        hashlib.sha256(b"bob-key").hexdigest(): ["bob@contoso.com"],
+    }))
+    access = AccountAccess.load(_settings(tmp_path, account_keys_file=keys))
+
+    assert access.resolve("alice-key") == "alice@contoso.com"
+    assert access.resolve("alice-key", "Shared@Contoso.com") == "shared@contoso.com"
+    assert access.resolve("bob-key") == "bob@contoso.com"
+
+    with pytest.raises(PermissionError):
+        access.resolve("bob-key", "alice@contoso.com")
+    with pytest.raises(PermissionError):
+        access.resolve("stolen-key")
+    with pytest.raises(PermissionError):
+        access.resolve(None)
+
+
+def test_tools_take_no_account_argument():
+    async def schemas():
+        async with Client(tools.mcp) as client:
+            return {tool.name: tool.inputSchema for tool in await client.list_tools()}
+
+    for name, schema in asyncio.run(schemas()).items():
+        assert "account" not in schema.get("properties", {}), name
+
+
+def test_evicted_accounts_are_closed(tmp_path, monkeypatch):
+    monkeypatch.setattr(accounts, "AuthManager", FakeAuth)
+    registry = AccountRegistry(_settings(tmp_path, max_accounts=1), accounts_dir=tmp_path)
+
+    async def scenario():
+        alice = registry.get("alice@contoso.com")
+        registry.get("bob@contoso.com")
+        await asyncio.sleep(0)
+        assert registry.accounts() == ["bob@contoso.com"]
+        assert alice.auth.cancelled and _closed(alice)
+
+        # A context in use is closed when the call holding it finishes
+        async with registry.lease("carol@contoso.com") as carol:
+            registry.get("dave@contoso.com")
+            await asyncio.sleep(0)
+            assert carol.evicted and not _closed(carol)
+        assert _closed(carol)
+
+        await registry.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_accounts_sign_in_with_their_own_tenant(tmp_path, monkeypatch):
+    monkeypatch.setattr(accounts, "AuthManager", FakeAuth)
+    settings = _settings(tmp_path, account_tenants=(("bob@fabrikam.com", "fabrikam.com"),))
+    registry = AccountRegistry(settings, accounts_dir=tmp_path)
+
+    assert registry.get("Bob@Fabrikam.com").auth.authority == \
+        "https://login.microsoftonline.com/fabrikam.com"
+    assert registry.get("alice@contoso.com").auth.authority == \
+        "https://login.microsoftonline.com/common"
+
+    asyncio.run(registry.aclose())
+
+
+def test_tenants_are_read_from_the_environment(monkeypatch):
+    monkeypatch.setenv("MICROSOFT_CLIENT_ID", "test")
+    monkeypatch.setenv("M365_TENANT", "contoso.onmicrosoft.com")
+    monkeypatch.setenv("M365_ACCOUNT_TENANTS", "bob@fabrikam.com=4f3c-guid")
+
+    settings = Settings.load()
+
+    assert settings.authority == "https://login.microsoftonline.com/contoso.onmicrosoft.com"
+    assert settings.authority_for("bob@fabrikam.com") == \
+        "https://login.microsoftonline.com/4f3c-guid"
+    assert settings.authority_for("default") == settings.authority
+
+
+class FakeApp:
+    """MSAL app whose device flow signs in as ``signed_in``."""
+
+    def __init__(self, signed_in):
+        self.cached = [{"username": signed_in}]
+        self.removed = []
+
+    def get_accounts(self, username=None):
+        return [a for a in self.cached if username is None or a["username"] == username]
+
+    def remove_account(self, account):
+        self.removed.append(account)
+        self.cached.remove(account)
+
+    def acquire_token_by_device_flow(self, flow):
+        return {
+            "access_token": "token",
+            "expires_in": 3600,
+            "id_token_claims": {"preferred_username": self.cached[0]["username"]},
+        }
+
+
+def _poll(auth):
+    flow = {"user_code": "ABC", "verification_uri": "https://microsoft.com/devicelogin"}
+    auth._pending_flow = flow
+    auth._poll_device_flow(flow)
+
+
+def test_sign_in_as_another_user_is_rejected(tmp_path):
+    app = FakeApp("mallory@contoso.com")
+    auth = AuthManager(_settings(tmp_path), cache_file=tmp_path / "alice.json",
+                       username="alice@contoso.com", app=app)
+
+    _poll(auth)
+    assert "expected alice@contoso.com" in auth._flow_error
+    assert app.removed == [{"username": "mallory@contoso.com"}]
+    assert auth._tokens.get() is None
+
+
+def test_sign_in_as_the_account_user_is_kept(tmp_path):
+    app = FakeApp("alice@contoso.com")
+    auth = AuthManager(_settings(tmp_path), cache_file=tmp_path / "alice.json",
+                       username="alice@contoso.com", app=app)
+
+    _poll(auth)
+    assert auth._flow_error is None
+    assert auth._tokens.get() == "token"
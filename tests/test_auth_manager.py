@@ -0,0 +1,208 @@
+import asyncio
+import threading
+import time
+
+from benchmarks.mock_graph import MockGraph
+from m365_assistant.core.auth_manager import AuthManager
+from m365_assistant.core.config import Settings
+from m365_assistant.core.graph_client import GraphClient
+from m365_assistant.services.calendar_service import CalendarService
+from m365_assistant.services.mail_service import MailService
+
+
+class FakeMsal:
+    """
+    MSAL app whose device flow completes when ``finish`` is called,
+    as if the user had entered the code.
+    """
+
+    def __init__(self, result=None):
+        self.result = result or {"access_token": "token", "expires_in": 3600}
+        self.flows_started = 0
+        self._finished = threading.Event()
+
+    def get_accounts(self, username=None):
+        return []
+
+    def initiate_device_flow(self, scopes):
+        self.flows_started += 1
+        return {"user_code": "ABC123", "verification_uri": "https://microsoft.com/devicelogin"}
+
+    def acquire_token_by_device_flow(self, flow):
+        self._finished.wait(10)
+        return self.result
+
+    def finish(self):
+        self._finished.set()
+
+
+def _auth(tmp_path, app):
+    settings = Settings(client_id="test", authority="https://login.microsoftonline.com/common")
+    return AuthManager(settings, cache_file=tmp_path / "cache.json", app=app)
+
+
+def test_wait_without_pending_flow_does_not_start_one(tmp_path):
+    app = FakeMsal()
+    auth = _auth(tmp_path, app)
+
+    result = asyncio.run(auth.wait_for_sign_in(1))
+
+    assert result["status"] == "no_sign_in_pending"
+    assert app.flows_started == 0
+
+
+def test_waiters_hold_no_threads_and_wake_on_sign_in(tmp_path):
+    app = FakeMsal()
+    auth = _auth(tmp_path, app)
+
+    async def scenario():
+        assert auth.acquire_token()["status"] == "authentication_required"
+
+        # More waiters than the default executor has threads
+        waiters = [asyncio.create_task(auth.wait_for_sign_in(10)) for _ in range(64)]
+        await asyncio.sleep(0.05)
+
+        # The executor is still free for other work (e.g. token lookups)
+        start = time.perf_counter()
+        await asyncio.to_thread(lambda: None)
+        executor_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        app.finish()
+        results = await asyncio.gather(*waiters)
+        return executor_seconds, time.perf_counter() - start, results
+
+    executor_seconds, wake_seconds, results = asyncio.run(scenario())
+
+    assert executor_seconds < 0.5
+    assert wake_seconds < 0.5
+    assert all(result["status"] == "success" for result in results)
+    assert app.flows_started == 1
+    assert auth.acquire_token() == {"status": "success", "access_token": "token"}
+
+
+def test_wait_times_out_with_the_pending_code(tmp_path):
+    app = FakeMsal()
+    auth = _auth(tmp_path, app)
+
+    async def scenario():
+        auth.acquire_token()
+        return await auth.wait_for_sign_in(0.05)
+
+    try:
+        result = asyncio.run(scenario())
+    finally:
+        app.finish()
+
+    assert result["status"] == "authentication_pending"
+    assert result["user_code"] == "ABC123"
+    assert not auth._flow_waiters
+
+
+def test_failed_sign_in_is_reported(tmp_path):
+    app = FakeMsal({"error": "expired_token", "error_description": "Code expired"})
+    auth = _auth(tmp_path, app)
+
+    async def scenario():
+        auth.acquire_token()
+        waiter = asyncio.create_task(auth.wait_for_sign_in(10))
+        await asyncio.sleep(0.01)
+        app.finish()
+        return await waiter
+
+    result = asyncio.run(scenario())
+
+    assert result["status"] == "authentication_failed"
+    assert "Code expired" in result["message"]
+    assert asyncio.run(auth.wait_for_sign_in(1))["status"] == "no_sign_in_pending"
+    assert app.flows_started == 1
+
+
+def test_workers_never_start_a_device_flow(tmp_path):
+    app = FakeMsal()
+    settings = Settings(client_id="test", authority="https://login.microsoftonline.com/common",
+                        workers=2)
+    auth = AuthManager(settings, cache_file=tmp_path / "cache.json",
+                       username="alice@contoso.com", app=app)
+
+    result = auth.acquire_token()
+
+    assert result["status"] == "authentication_required"
+    assert "m365-assistant login --account alice@contoso.com" in result["message"]
+    assert app.flows_started == 0
+
+
+class SilentMsal(FakeMsal):
+    """Signed-in MSAL app that counts silent token lookups."""
+
+    def __init__(self):
+        super().__init__()
+        self.silent_calls = 0
+
+    def get_accounts(self, username=None):
+        return [{"username": "alice@contoso.com"}]
+
+    def acquire_token_silent(self, scopes, account, force_refresh=False):
+        self.silent_calls += 1
+        return {"access_token": "token", "expires_in": 3600}
+
+
+def _client(auth, graph):
+    settings = Settings(client_id="test", authority="https://login.microsoftonline.com/common",
+                        graph_base_url=graph.base_url, local_store=False)
+    return GraphClient(auth, settings)
+
+
+def test_held_token_is_served_without_a_thread(tmp_path, monkeypatch):
+    app = SilentMsal()
+    auth = _auth(tmp_path, app)
+    threads = []
+
+    async def to_thread(func, *args, **kwargs):
+        threads.append(func.__name__)
+        return func(*args, **kwargs)
+
+    async def scenario(graph):
+        client = _client(auth, graph)
+        try:
+            await MailService(client).list_last_n_days(limit=5)
+            monkeypatch.setattr(asyncio, "to_thread", to_thread)
+            for _ in range(3):
+                await MailService(client).list_last_n_days(limit=5)
+        finally:
+            await client.aclose()
+
+    with MockGraph(messages=10, events=0) as graph:
+        asyncio.run(scenario(graph))
+
+    assert threads == []
+    assert app.silent_calls == 1
+
+
+def test_services_return_sign_in_instructions(tmp_path):
+    app = FakeMsal()
+    auth = _auth(tmp_path, app)
+
+    async def scenario(graph):
+        client = _client(auth, graph)
+        try:
+            mail = MailService(client)
+            return (
+                await mail.list_last_n_days(),
+                await mail.mark_emails_read(["msg-1", "msg-2"]),
+                await CalendarService(client).find_free_slots(),
+            )
+        finally:
+            await client.aclose()
+            app.finish()
+
+    with MockGraph(messages=10, events=0) as graph:
+        results = asyncio.run(scenario(graph))
+        assert graph.requests == 0
+
+    # The first call starts the sign-in, the others report it pending
+    assert [result["status"] for result in results] == [
+        "authentication_required", "authentication_pending", "authentication_pending",
+    ]
+    assert all(result["user_code"] == "ABC123" for result in results)
+    assert app.flows_started == 1
@@ -0,0 +1,143 @@
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from m365_assistant.services.availability import (
+    WorkingHours,
+    busy_intervals,
+    find_free_slots,
+    merge,
+)
+
+UTC = timezone.utc
+
+
+def _at(day: int, hour: int, minute: int = 0, month: int = 10, tz=UTC) -> datetime:
+    return datetime(2026, month, day, hour, minute, tzinfo=tz)
+
+
+def _event(start: datetime, end: datetime, tz: str = "UTC", **fields):
+    return {
+        "start": {"dateTime": start.strftime("%Y-%m-%dT%H:%M:%S.0000000"), "timeZone": tz},
+        "end": {"dateTime": end.strftime("%Y-%m-%dT%H:%M:%S.0000000"), "timeZone": tz},
+        "showAs": "busy",
+        **fields,
+    }
+
+
+def _series(start: datetime, end: datetime, pattern: dict, range_=None, tz: str = "UTC"):
+    return _event(
+        start, end, tz,
+        type="seriesMaster",
+        recurrence={
+            "pattern": pattern,
+            "range": range_ or {"type": "noEnd", "startDate": start.date().isoformat()},
+        },
+    )
+
+
+def _days(events, window):
+    return [start.date() for start, _ in sorted(busy_intervals(events, window))]
+
+
+def test_biweekly_series_skips_the_weeks_between():
+    # Monday 5 October 2026, every other week on Monday and Wednesday
+    series = _series(_at(5, 10), _at(5, 11), {
+        "type": "weekly", "interval": 2, "daysOfWeek": ["monday", "wednesday"],
+    })
+
+    days = _days([series], (_at(1, 0), _at(2, 0, month=11)))
+
+    assert days == [date(2026, 10, 5), date(2026, 10, 7),
+                    date(2026, 10, 19), date(2026, 10, 21)]
+
+
+def test_relative_monthly_series():
+    second_tuesday = _series(_at(13, 10), _at(13, 11), {
+        "type": "relativeMonthly", "interval": 1,
+        "daysOfWeek": ["tuesday"], "index": "second",
+    })
+    last_friday = _series(_at(30, 15), _at(30, 16), {
+        "type": "relativeMonthly", "interval": 1,
+        "daysOfWeek": ["friday"], "index": "last",
+    })
+    window = (_at(1, 0), datetime(2027, 1, 1, tzinfo=UTC))
+
+    assert _days([second_tuesday], window) == [
+        date(2026, 10, 13), date(2026, 11, 10), date(2026, 12, 8),
+    ]
+    assert _days([last_friday], window) == [
+        date(2026, 10, 30), date(2026, 11, 27), date(2026, 12, 25),
+    ]
+
+
+def test_numbered_and_end_dated_series_stop():
+    daily = {"type": "daily", "interval": 1}
+    numbered = _series(_at(5, 10), _at(5, 11), daily, {
+        "type": "numbered", "startDate": "2026-10-05", "numberOfOccurrences": 3,
+    })
+    end_dated = _series(_at(5, 14), _at(5, 15), daily, {
+        "type": "endDate", "startDate": "2026-10-05", "endDate": "2026-10-08",
+    })
+
+    # Occurrences before the window still count towards the number
+    window = (_at(6, 0), _at(20, 0))
+    assert _days([numbered], window) == [date(2026, 10, 6), date(2026, 10, 7)]
+    assert _days([end_dated], window) == [
+        date(2026, 10, 6), date(2026, 10, 7), date(2026, 10, 8),
+    ]
+
+
+def test_series_keeps_local_time_across_daylight_saving_changes():
+    # 11:00-12:00 in New York every weekday, seen from London working
+    # hours: 16:00 until the UK clocks change (25 Oct), 15:00 in the
+    # week before the US clocks change (1 Nov), then 16:00 again.
+    london = ZoneInfo("Europe/London")
+    series = _series(
+        datetime(2026, 10, 19, 11), datetime(2026, 10, 19, 12), {
+            "type": "weekly", "interval": 1,
+            "daysOfWeek": ["monday", "tuesday", "wednesday", "thursday", "friday"],
+        },
+        tz="America/New_York",
+    )
+    hours = WorkingHours(start=time(9), end=time(17), tz=london)
+
+    def free(day: int, month: int = 10):
+        window = (_at(day, 0, month=month, tz=london), _at(day, 23, month=month, tz=london))
+        return [
+            (start.astimezone(london).time(), end.astimezone(london).time())
+            for start, end in find_free_slots([series], window, timedelta(minutes=30), hours)
+        ]
+
+    assert free(23) == [(time(9), time(16))]
+    assert free(27) == [(time(9), time(15)), (time(16), time(17))]
+    assert free(3, month=11) == [(time(9), time(16))]
+    # Weekends are outside working hours altogether
+    assert free(24) == []
+
+
+def test_min_gap_pads_both_sides_of_a_meeting():
+    meeting = _event(_at(5, 10), _at(5, 11))
+    window = (_at(5, 9), _at(5, 17))
+
+    slots = find_free_slots([meeting], window, timedelta(minutes=30),
+                            min_gap=timedelta(minutes=15))
+
+    assert slots == [(_at(5, 9), _at(5, 9, 45)), (_at(5, 11, 15), _at(5, 17))]
+
+
+def test_overlapping_busy_intervals_are_merged():
+    events = [
+        _event(_at(5, 10), _at(5, 11)),
+        _event(_at(5, 10, 30), _at(5, 12)),
+        _event(_at(5, 10, 15), _at(5, 10, 45)),
+        _event(_at(5, 11, 30), _at(5, 12, 30)),
+        # Neither free time nor cancelled meetings block the calendar
+        _event(_at(5, 14), _at(5, 15), showAs="free"),
+        _event(_at(5, 15), _at(5, 16), isCancelled=True),
+    ]
+    window = (_at(5, 9), _at(5, 17))
+
+    assert merge(busy_intervals(events, window)) == [(_at(5, 10), _at(5, 12, 30))]
+    assert find_free_slots(events, window, timedelta(minutes=30)) == [
+        (_at(5, 9), _at(5, 10)), (_at(5, 12, 30), _at(5, 17)),
+    ]
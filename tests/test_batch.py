@@ -0,0 +1,71 @@
+import asyncio
+
+import httpx
+
+from benchmarks.bench_concurrency import StaticAuth
+from m365_assistant.core.config import Settings
+from m365_assistant.core.graph_client import GraphClient
+from m365_assistant.services.mail_service import MailService
+
+
+def _client(post):
+    settings = Settings(client_id="test", authority="https://login.microsoftonline.com/common")
+    client = GraphClient(StaticAuth(), settings)
+    client.post = post
+    return client
+
+
+def _ok(envelope):
+    return {"responses": [{"id": r["id"], "status": 200, "body": {"id": f"new-{r['id']}"}}
+                          for r in envelope]}
+
+
+def test_failed_envelope_becomes_per_item_errors():
+    async def post(path, json=None):
+        envelope = json["requests"]
+        if envelope[0]["id"] == "20":
+            request = httpx.Request("POST", "https://graph.microsoft.com/v1.0/$batch")
+            raise httpx.HTTPStatusError(
+                "Server error", request=request, response=httpx.Response(503, request=request),
+            )
+        return _ok(envelope)
+
+    async def scenario():
+        client = _client(post)
+        try:
+            return await client.batch(
+                [{"method": "PATCH", "url": f"/me/messages/msg-{i}", "body": {}} for i in range(25)]
+            )
+        finally:
+            await client.aclose()
+
+    results = asyncio.run(scenario())
+
+    assert [r["status"] for r in results] == [200] * 20 + [503] * 5
+    assert results[24]["body"]["error"]["code"] == "HTTPStatusError"
+
+
+def test_duplicate_email_ids_are_sent_once():
+    sent = []
+
+    async def post(path, json=None):
+        sent.extend(json["requests"])
+        return _ok(json["requests"])
+
+    async def scenario():
+        client = _client(post)
+        try:
+            mail = MailService(client)
+            read = await mail.mark_emails_read(["msg-1", "msg-2", "msg-1"])
+            moved = await mail.move_emails(["msg-3", "msg-3"], "archive")
+            return read, moved
+        finally:
+            await client.aclose()
+
+    read, moved = asyncio.run(scenario())
+
+    assert read == {"msg-1": {"status": "marked_as_read"}, "msg-2": {"status": "marked_as_read"}}
+    assert moved == {"msg-3": {"status": "moved", "new_id": "new-0"}}
+    assert [r["url"] for r in sent] == [
+        "/me/messages/msg-1", "/me/messages/msg-2", "/me/messages/msg-3/move",
+    ]
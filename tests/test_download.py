@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+import pytest
+
+from benchmarks.bench_concurrency import StaticAuth
+from benchmarks.mock_graph import MockGraph, attachment_bytes
+from m365_assistant.core.config import Settings
+from m365_assistant.core.graph_client import GraphClient
+from m365_assistant.services.mail_service import MailService
+
+SIZE = 256 * 1024
+VALUE = "/me/messages/msg-1/attachments/att-0/$value"
+
+
+def _expected(size: int = SIZE) -> bytes:
+    return b"".join(attachment_bytes(0, size))
+
+
+@pytest.fixture
+def graph():
+    with MockGraph(messages=5, events=0, attachment_size=SIZE) as graph:
+        yield graph
+
+
+def _run(graph, tmp_path, action):
+    settings = Settings(
+        client_id="test",
+        authority="https://login.microsoftonline.com/common",
+        graph_base_url=graph.base_url,
+        attachment_dir=tmp_path,
+    )
+
+    async def scenario():
+        client = GraphClient(StaticAuth(), settings)
+        try:
+            return await action(client)
+        finally:
+            await client.aclose()
+
+    return asyncio.run(scenario())
+
+
+def _leave_part(dest, data: bytes, resource: str, validator: str):
+    dest.with_name(dest.name + ".part").write_bytes(data)
+    dest.with_name(dest.name + ".part.json").write_text(
+        json.dumps({"resource": resource, "validator": validator})
+    )
+
+
+def test_dropped_download_resumes_from_the_part(graph, tmp_path):
+    dest = tmp_path / "file.bin"
+    graph.drop_value_after = SIZE // 2
+
+    size = _run(graph, tmp_path, lambda client: client.download(VALUE, dest, chunk_size=4096))
+
+    assert size == SIZE
+    assert dest.read_bytes() == _expected()
+    # The second request only fetched the missing half
+    assert graph.bytes_sent < SIZE * 1.6
+    assert not (tmp_path / "file.bin.part").exists()
+    assert not (tmp_path / "file.bin.part.json").exists()
+
+
+def test_part_of_another_resource_is_discarded(graph, tmp_path):
+    dest = tmp_path / "file.bin"
+    _leave_part(dest, b"x" * 1000, "/me/messages/msg-2/attachments/att-0/$value",
+                f'"attachment-{SIZE}"')
+
+    _run(graph, tmp_path, lambda client: client.download(VALUE, dest))
+
+    assert dest.read_bytes() == _expected()
+
+
+def test_changed_resource_is_downloaded_again(graph, tmp_path):
+    dest = tmp_path / "file.bin"
+    # Same resource, but the part was written under another ETag: the
+    # server ignores the Range and the part must not be appended to
+    _leave_part(dest, b"x" * 1000, VALUE, '"attachment-old"')
+
+    _run(graph, tmp_path, lambda client: client.download(VALUE, dest))
+
+    assert dest.read_bytes() == _expected()
+
+
+def test_existing_file_is_never_overwritten(graph, tmp_path):
+    dest = tmp_path / "file.bin"
+    dest.write_bytes(b"mine")
+
+    with pytest.raises(FileExistsError):
+        _run(graph, tmp_path, lambda client: client.download(VALUE, dest))
+    assert dest.read_bytes() == b"mine"
+
+    result = _run(graph, tmp_path, lambda client: MailService(client).download_attachment(
+        "msg-1", "att-0", "file.bin",
+    ))
+
+    assert result["path"] == str(tmp_path / "file (1).bin")
+    assert (tmp_path / "file (1).bin").read_bytes() == _expected()
+    assert dest.read_bytes() == b"mine"
@@ -0,0 +1,103 @@
+import json
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from m365_assistant.agent.history import ELIDED_MARK, PLACEHOLDER, HistoryManager
+
+
+def _count(text: str) -> int:
+    return len(text) // 4
+
+
+def _round(i: int, items: int = 10):
+    call = {"name": "list_emails", "args": {"limit": items}, "id": f"call-{i}"}
+    ai = AIMessage(content="", tool_calls=[call])
+    emails = [
+        {
+            "id": f"msg-{i}-{n}",
+            "subject": f"Subject {n}",
+            "from": "someone@example.com",
+            "receivedDateTime": "2026-10-18T09:00:00Z",
+            "bodyPreview": "lorem ipsum " * 20,
+            "isRead": False,
+        }
+        for n in range(items)
+    ]
+    return ai, ToolMessage(content=json.dumps(emails), tool_call_id=f"call-{i}", name="list_emails")
+
+
+def _loop(rounds: int, duplicate_ai: bool = False):
+    messages = [SystemMessage(content="system"), HumanMessage(content="Plan my day")]
+    for i in range(rounds):
+        ai, tool = _round(i)
+        messages.append(ai)
+        if duplicate_ai:
+            # fetch_context used to append the same response per tool call
+            messages.append(ai)
+        messages.append(tool)
+    return messages
+
+
+def _assert_paired(messages):
+    calls = []
+    for message in messages:
+        if isinstance(message, AIMessage):
+            calls.extend(call["id"] for call in message.tool_calls)
+        elif isinstance(message, ToolMessage):
+            # A result always follows the AIMessage that asked for it
+            assert message.tool_call_id in calls
+    results = {m.tool_call_id for m in messages if isinstance(m, ToolMessage)}
+    assert results == set(calls)
+    assert len(calls) == len(set(calls))
+
+
+def test_compaction_keeps_tool_calls_paired_with_results():
+    history = HistoryManager(budget=2000, count_tokens=_count)
+
+    compacted = history.compact(_loop(12, duplicate_ai=True))
+
+    _assert_paired(compacted)
+    ai_messages = [m for m in compacted if isinstance(m, AIMessage)]
+    assert len(ai_messages) == 12
+    assert [m.tool_call_id for m in compacted if isinstance(m, ToolMessage)] == \
+        [f"call-{i}" for i in range(12)]
+
+
+def test_compaction_stays_within_the_budget():
+    messages = _loop(12)
+    history = HistoryManager(budget=3000, count_tokens=_count)
+    assert history.count(messages) > 3000
+
+    compacted = history.compact(messages)
+
+    assert history.count(compacted) <= 3000
+    assert history.stats()["tokens_out"] == history.count(compacted)
+    # The system prompt, the request and the last round are untouched
+    assert compacted[:2] == messages[:2]
+    assert compacted[-2:] == messages[-2:]
+
+
+def test_history_under_budget_is_unchanged():
+    messages = _loop(2)
+    history = HistoryManager(budget=10**6, count_tokens=_count)
+
+    assert history.compact(messages) == messages
+    assert history.stats()["elided"] == 0
+
+
+def test_placeholder_is_inserted_once_across_loop_iterations():
+    history = HistoryManager(budget=1500, count_tokens=_count)
+    messages = _loop(1)
+
+    # Each executor turn compacts the list again after adding a round
+    for i in range(1, 15):
+        ai, tool = _round(i)
+        messages = history.compact(messages + [ai, tool])
+
+    _assert_paired(messages)
+    for message in messages:
+        if isinstance(message, ToolMessage):
+            assert message.content.count(PLACEHOLDER) <= 1
+            assert message.content.count(ELIDED_MARK) <= 1
+    assert any(PLACEHOLDER in m.content for m in messages if isinstance(m, ToolMessage))
+    assert history.count(messages) <= 1500
@@ -0,0 +1,87 @@
+import asyncio
+
+import httpx
+
+from benchmarks.bench_concurrency import StaticAuth
+from m365_assistant.core.config import Settings
+from m365_assistant.core.graph_client import GraphClient
+
+BASE = "https://graph.test/v1.0"
+PATH = "/me/mailFolders/inbox/messages"
+
+
+class Feed:
+    """A collection of ``items`` served in pages of the requested size."""
+
+    def __init__(self, items: int):
+        self.items = [{"id": f"msg-{i}"} for i in range(items)]
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+
+        size = int(request.url.params["$top"])
+        skip = int(request.url.params.get("$skip", 0))
+        page = {"value": self.items[skip:skip + size]}
+
+        if skip + size < len(self.items):
+            page["@odata.nextLink"] = str(request.url.copy_merge_params({"$skip": skip + size}))
+
+        return httpx.Response(200, json=page)
+
+
+def _collect(feed, **kwargs):
+    settings = Settings(client_id="test", authority="https://login.microsoftonline.com/common",
+                        graph_base_url=BASE, graph_page_size=10, response_cache_bytes=0)
+
+    async def run():
+        http = httpx.AsyncClient(transport=httpx.MockTransport(feed))
+        client = GraphClient(StaticAuth(), settings, http=http)
+        try:
+            return [item["id"] async for item in client.paginate(PATH, **kwargs)]
+        finally:
+            await http.aclose()
+
+    return asyncio.run(run())
+
+
+def test_pages_stop_at_the_limit():
+    feed = Feed(35)
+
+    ids = _collect(feed, limit=15)
+
+    assert ids == [f"msg-{i}" for i in range(15)]
+    # Two pages for 15 items; the third page's nextLink is never followed
+    assert len(feed.requests) == 2
+
+
+def test_limit_on_a_page_boundary_fetches_no_further_page():
+    feed = Feed(35)
+
+    assert len(_collect(feed, limit=10)) == 10
+    assert len(feed.requests) == 1
+
+
+def test_small_limit_shrinks_the_page():
+    feed = Feed(35)
+
+    assert len(_collect(feed, limit=3)) == 3
+
+    request = feed.requests[0]
+    assert request.url.params["$top"] == "3"
+    assert request.headers["Prefer"] == "odata.maxpagesize=3"
+
+
+def test_without_limit_every_page_is_walked():
+    feed = Feed(35)
+
+    ids = _collect(feed, params={"$select": "id"})
+
+    assert len(ids) == 35
+    assert len(feed.requests) == 4
+    first = feed.requests[0]
+    assert first.url.params["$top"] == "10"
+    assert first.url.params["$select"] == "id"
+    assert first.headers["Prefer"] == "odata.maxpagesize=10"
+    # nextLinks carry their own query and are requested as they are
+    assert feed.requests[1].url.params["$skip"] == "10"
@@ -0,0 +1,71 @@
+from datetime import date
+
+from m365_assistant.agent import plan_cache
+from m365_assistant.agent.plan_cache import PlanCache
+
+PROMPT = "Plan my day"
+DAY = date(2026, 10, 19)
+
+
+def _cache(tmp_path):
+    return PlanCache(tmp_path / "plans.db")
+
+
+def test_repeated_prompt_is_a_hit(tmp_path):
+    cache = _cache(tmp_path)
+    key = PlanCache.key(PROMPT, "fp-1", day=DAY)
+
+    assert cache.get(key) is None
+    cache.put(key, PROMPT, "09:00 Standup", seconds=4.0, day=DAY)
+
+    # Case and spacing are not part of the request
+    again = PlanCache.key("  plan MY   day ", "fp-1", day=DAY)
+    assert again == key
+    assert cache.get(again)["final_schedule"] == "09:00 Standup"
+    assert cache.get(again)["final_schedule"] == "09:00 Standup"
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    assert stats["hit_rate"] == 2 / 3
+    assert stats["saved_seconds"] == 8.0
+    cache.close()
+
+
+def test_any_input_change_is_a_miss(tmp_path, monkeypatch):
+    cache = _cache(tmp_path)
+    key = PlanCache.key(PROMPT, "fp-1", day=DAY)
+    cache.put(key, PROMPT, "09:00 Standup", seconds=4.0, day=DAY)
+
+    # A new email or event changes the fingerprint
+    assert cache.get(PlanCache.key(PROMPT, "fp-2", day=DAY)) is None
+    # So do another request, another day and the other pipeline mode
+    assert cache.get(PlanCache.key("Plan my week", "fp-1", day=DAY)) is None
+    assert cache.get(PlanCache.key(PROMPT, "fp-1", day=date(2026, 10, 20))) is None
+    assert cache.get(PlanCache.key(PROMPT, "fp-1", mode="planner", day=DAY)) is None
+    # And an edit of the system prompts
+    monkeypatch.setattr(plan_cache, "_PROMPTS", "edited")
+    assert cache.get(PlanCache.key(PROMPT, "fp-1", day=DAY)) is None
+
+    assert cache.stats()["misses"] == 5
+    assert cache.stats()["hits"] == 0
+    cache.close()
+
+
+def test_counters_survive_a_reopen_and_old_plans_are_dropped(tmp_path):
+    cache = _cache(tmp_path)
+    old = PlanCache.key(PROMPT, "fp-1", day=date(2026, 10, 1))
+    cache.put(old, PROMPT, "old", seconds=2.0, pregenerated=True, day=date(2026, 10, 1))
+    cache.get(old)
+    cache.close()
+
+    cache = _cache(tmp_path)
+    cache.put(PlanCache.key(PROMPT, "fp-1", day=DAY), PROMPT, "new", seconds=6.0, day=DAY)
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["pregenerated"] == 1
+    # More than a week older than the new plan
+    assert cache.get(old, count=False) is None
+    assert stats["plans"] == 1
+    assert stats["mean_build_seconds"] == 6.0
+    cache.close()
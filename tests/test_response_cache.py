@@ -0,0 +1,140 @@
+import asyncio
+
+import httpx
+
+from benchmarks.bench_concurrency import StaticAuth
+from m365_assistant.core.config import Settings
+from m365_assistant.core.graph_client import GraphClient
+from m365_assistant.core.response_cache import ResponseCache
+
+BASE = "https://graph.test/v1.0"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeGraph:
+    """
+    Answers every request with its path as JSON and ETag "v1", and a
+    conditional GET for "v1" with 304.
+    """
+
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append((request.method, request.url.path, request.headers.get("If-None-Match")))
+
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+
+        return httpx.Response(200, json={"path": request.url.path}, headers={"ETag": '"v1"'})
+
+
+def _run(scenario, cache):
+    graph = FakeGraph()
+    settings = Settings(client_id="test", authority="https://login.microsoftonline.com/common",
+                        graph_base_url=BASE)
+
+    async def run():
+        http = httpx.AsyncClient(transport=httpx.MockTransport(graph))
+        client = GraphClient(StaticAuth(), settings, http=http, cache=cache)
+        try:
+            await scenario(client, graph)
+        finally:
+            await http.aclose()
+
+    asyncio.run(run())
+    return graph
+
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    cache = ResponseCache(max_bytes=100)
+    for key in ("a", "b", "c"):
+        cache.put(key, "me", "/me/messages/" + key, b"x" * 40, None, 60)
+
+    # 120 bytes > 100: "a" went first
+    assert cache.lookup("a") is None
+    assert cache.stats()["bytes"] == 80
+
+    # Touching "b" makes "c" the oldest
+    cache.lookup("b")
+    cache.put("d", "me", "/me/messages/d", b"x" * 40, None, 60)
+    assert cache.lookup("c") is None
+    assert cache.lookup("b") is not None
+    assert cache.stats()["evictions"] == 2
+
+    # Larger than the whole cache: never stored
+    cache.put("big", "me", "/me/messages/big", b"x" * 101, None, 60)
+    assert cache.lookup("big") is None
+    assert cache.lookup("b") is not None
+
+
+def test_writes_invalidate_the_affected_prefixes():
+    cache = ResponseCache(clock=Clock())
+
+    async def scenario(client, graph):
+        await client.get("/me/messages/msg-1")
+        await client.get("/me/calendarView")
+        await client.get("/me/messages/msg-1")
+        await client.get("/me/calendarView")
+        assert len(graph.requests) == 2
+
+        # A mail write drops cached mail, not the calendar
+        await client.patch("/me/messages/msg-1", json={"isRead": True})
+        await client.get("/me/messages/msg-1")
+        await client.get("/me/calendarView")
+        assert [path for _, path, _ in graph.requests[-2:]] == [
+            "/v1.0/me/messages/msg-1", "/v1.0/me/messages/msg-1",
+        ]
+
+        # And an event write drops the calendar
+        await client.post("/me/events", json={"subject": "Review"})
+        await client.get("/me/calendarView")
+        assert graph.requests[-1][:2] == ("GET", "/v1.0/me/calendarView")
+
+    _run(scenario, cache)
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_delta_responses_are_never_cached():
+    cache = ResponseCache(clock=Clock())
+
+    async def scenario(client, graph):
+        await client.get("/me/mailFolders/inbox/messages/delta")
+        await client.get("/me/mailFolders/inbox/messages/delta")
+
+    graph = _run(scenario, cache)
+    assert len(graph.requests) == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_304_serves_the_entry_and_refreshes_it():
+    clock = Clock()
+    cache = ResponseCache(clock=clock)
+
+    async def scenario(client, graph):
+        first = await client.get("/me/messages/msg-1")
+
+        # Stale: revalidated with the ETag, body from the cache
+        clock.now += 61
+        assert await client.get("/me/messages/msg-1") == first
+        assert graph.requests[-1] == ("GET", "/v1.0/me/messages/msg-1", '"v1"')
+
+        # The 304 made the entry fresh again
+        clock.now += 30
+        assert await client.get("/me/messages/msg-1") == first
+        assert len(graph.requests) == 2
+
+    _run(scenario, cache)
+
+    stats = cache.stats()
+    assert stats["revalidated"] == 1
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["bytes_saved"] == 2 * stats["bytes"]
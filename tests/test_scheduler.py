@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+import httpx
+
+from m365_assistant.core.scheduler import RequestScheduler
+
+
+def _ok():
+    async def send():
+        await asyncio.sleep(0.01)
+        return httpx.Response(200)
+    return send
+
+
+def test_paused_mailbox_does_not_hold_global_slots():
+    async def scenario():
+        scheduler = RequestScheduler(max_concurrency=2, mailbox_concurrency=2)
+        # alice is under a Retry-After; her requests wait in her bucket
+        scheduler._mailbox("alice").bucket.pause(1.0)
+        alice = [
+            asyncio.create_task(scheduler.send("alice", "GET", _ok()))
+            for _ in range(4)
+        ]
+        await asyncio.sleep(0.05)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(scheduler.send("bob", "GET", _ok()) for _ in range(20)))
+        bob_seconds = time.perf_counter() - start
+
+        await asyncio.gather(*alice)
+        return bob_seconds
+
+    # 20 requests, 2 at a time, 10 ms each: ~0.1 s, not alice's 1 s pause
+    assert asyncio.run(scenario()) < 0.5
+
+
+def test_429_is_retried_after_retry_after():
+    async def scenario():
+        scheduler = RequestScheduler()
+        responses = iter([
+            httpx.Response(429, headers={"Retry-After": "0.05"}),
+            httpx.Response(200),
+        ])
+
+        async def send():
+            return next(responses)
+
+        response = await scheduler.send("alice", "POST", send)
+        return response.status_code, scheduler.metrics()
+
+    status, metrics = asyncio.run(scenario())
+    assert status == 200
+    assert metrics["throttled"] == 1
+    assert metrics["retried"] == 1
+    assert metrics["completed"] == 1
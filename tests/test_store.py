@@ -0,0 +1,75 @@
+import asyncio
+import sqlite3
+
+from fastmcp import Client
+
+from m365_assistant.mcp import tools
+from m365_assistant.sync.store import LocalStore
+
+
+def _message(**overrides):
+    message = {
+        "id": "msg-1",
+        "receivedDateTime": "2026-10-01T09:00:00Z",
+        "subject": "Quarterly numbers",
+        "from": {"emailAddress": {"name": "Alice", "address": "alice@contoso.com"}},
+        "isRead": False,
+        "bodyPreview": "Hi all, the figures are attached",
+    }
+    message.update(overrides)
+    return message
+
+
+def _found(store, query):
+    return [message["id"] for message in store.search_messages(query)]
+
+
+def test_indexed_body_survives_delta_upserts(tmp_path):
+    store = LocalStore(tmp_path / "store.db")
+    store.upsert_messages([_message()])
+    store.index_body("msg-1", {"contentType": "html",
+                               "content": "<p>Revenue grew in <b>Lisbon</b></p>"})
+    assert _found(store, "lisbon") == ["msg-1"]
+
+    # Read, flagged, moved: the content is the same, the body stays
+    store.upsert_messages([_message(isRead=True, flag={"flagStatus": "flagged"})])
+    assert _found(store, "lisbon") == ["msg-1"]
+    assert _found(store, "figures") == ["msg-1"]
+
+    # An edited draft: the preview no longer matches the indexed body
+    store.upsert_messages([_message(bodyPreview="Hi all, new figures")])
+    assert _found(store, "lisbon") == []
+    assert _found(store, "new") == ["msg-1"]
+
+    store.close()
+
+
+def test_store_of_an_older_schema_is_rebuilt(tmp_path):
+    path = tmp_path / "store.db"
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE messages (id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+    db.execute("CREATE TABLE sync_state (scope TEXT PRIMARY KEY, delta_link TEXT)")
+    db.execute("INSERT INTO sync_state VALUES ('mail', 'https://graph/delta')")
+    db.commit()
+    db.close()
+
+    store = LocalStore(path)
+
+    # The old delta token is gone, so the next sync starts from scratch
+    assert store.get_sync_state("mail") is None
+    store.upsert_messages([_message()])
+    assert _found(store, "figures") == ["msg-1"]
+    store.close()
+
+
+def test_search_has_no_folder_filter():
+    # Only the Inbox is synced, so a folder filter could only ever
+    # match the Inbox or nothing
+    async def search_tool():
+        async with Client(tools.mcp) as client:
+            return {tool.name: tool for tool in await client.list_tools()}["search_emails"]
+
+    tool = asyncio.run(search_tool())
+
+    assert "folder" not in tool.inputSchema["properties"]
+    assert "Inbox" in tool.description
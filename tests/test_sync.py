@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from benchmarks.bench_concurrency import StaticAuth
+from benchmarks.mock_graph import MockGraph
+from m365_assistant.core.config import Settings
+from m365_assistant.core.graph_client import GraphClient
+from m365_assistant.services.calendar_service import CalendarService
+from m365_assistant.sync.engine import MAIL_SCOPE, SyncEngine
+from m365_assistant.sync.store import LocalStore
+
+
+@pytest.fixture
+def graph():
+    with MockGraph(messages=30, events=10) as graph:
+        yield graph
+
+
+def _run(graph, tmp_path, scenario):
+    settings = Settings(
+        client_id="test",
+        authority="https://login.microsoftonline.com/common",
+        graph_base_url=graph.base_url,
+        graph_page_size=10,
+        # Every delta round-trip must reach the mock server
+        response_cache_bytes=0,
+    )
+
+    async def run():
+        client = GraphClient(StaticAuth(), settings)
+        store = LocalStore(tmp_path / "store.db")
+        try:
+            return await scenario(SyncEngine(client, store), store)
+        finally:
+            store.close()
+            await client.aclose()
+
+    return asyncio.run(run())
+
+
+def _ids(store):
+    return {message["id"] for message in store.list_messages("2000-01-01T00:00:00Z")}
+
+
+def test_removed_tombstones_delete_the_local_copy(graph, tmp_path):
+    async def scenario(sync, store):
+        await sync.sync_mail()
+        graph.remove_message("msg-3")
+        graph.touch("msg-4")
+        stats = await sync.sync_mail()
+        return stats, _ids(store), store.search_messages("Synthetic message 3")
+
+    stats, ids, hits = _run(graph, tmp_path, scenario)
+
+    assert stats == {"upserted": 1, "removed": 1, "pages": 1}
+    assert "msg-3" not in ids
+    assert len(ids) == 29
+    # The full-text index drops it too
+    assert all(hit["id"] != "msg-3" for hit in hits)
+
+
+def test_expired_delta_token_resyncs_the_scope(graph, tmp_path):
+    async def scenario(sync, store):
+        await sync.sync_mail()
+        first_link = store.get_sync_state(MAIL_SCOPE)["delta_link"]
+
+        # Changes made while the token expires are only seen by a resync
+        graph.remove_message("msg-5")
+        graph.expire_delta_tokens()
+        resync = await sync.sync_mail()
+        state = store.get_sync_state(MAIL_SCOPE)
+
+        graph.touch("msg-6")
+        incremental = await sync.sync_mail()
+        return first_link, resync, state, incremental, _ids(store)
+
+    first_link, resync, state, incremental, ids = _run(graph, tmp_path, scenario)
+
+    # 410 Gone → the scope is reset and walked from the start
+    assert resync["upserted"] == 29
+    assert resync["pages"] == 3
+    assert state["delta_link"] != first_link
+    assert "msg-5" not in ids and len(ids) == 29
+    # The new delta link works for later changes
+    assert incremental == {"upserted": 1, "removed": 0, "pages": 1}
+
+
+def test_expired_calendar_delta_token_resyncs(graph, tmp_path):
+    async def scenario(sync, store):
+        await sync.sync_calendar()
+        graph.expire_delta_tokens()
+        return await sync.sync_calendar()
+
+    stats = _run(graph, tmp_path, scenario)
+
+    assert stats["pages"] >= 1
+    assert stats["upserted"] == 10
+
+
+def test_stored_events_have_the_direct_path_shape(graph, tmp_path):
+    async def scenario(sync, store):
+        stored = await sync.list_events(days_ahead=7, limit=None)
+        direct = [
+            event async for event in
+            CalendarService(sync.client).iter_upcoming_events(days_ahead=7)
+        ]
+        return stored, direct
+
+    stored, direct = _run(graph, tmp_path, scenario)
+
+    assert stored and direct
+    assert {tuple(sorted(event)) for event in stored} == \
+        {tuple(sorted(event)) for event in direct}
+    assert "body" not in stored[0] and "attendees" not in stored[0]
@@ -0,0 +1,123 @@
+import threading
+import time
+
+from m365_assistant.core.token_holder import TokenHolder
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Refresh:
+    """
+    MSAL stand-in handing out token-1, token-2... valid for an hour.
+    ``release`` holds each refresh until it is set.
+    """
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+        self.done = threading.Event()
+
+    def __call__(self, force_refresh):
+        self.calls.append(force_refresh)
+        self.release.wait(5)
+        try:
+            if self.fail:
+                raise RuntimeError("AADSTS50173: refresh token expired")
+            return {"access_token": f"token-{len(self.calls)}", "expires_in": 3600}
+        finally:
+            self.done.set()
+
+
+def test_cold_concurrent_callers_share_one_refresh():
+    refresh = Refresh()
+    holder = TokenHolder(refresh, clock=Clock())
+    refresh.release.clear()
+
+    tokens = []
+    callers = [threading.Thread(target=lambda: tokens.append(holder.get())) for _ in range(50)]
+    for caller in callers:
+        caller.start()
+    time.sleep(0.05)
+    refresh.release.set()
+    for caller in callers:
+        caller.join(5)
+
+    assert tokens == ["token-1"] * 50
+    assert refresh.calls == [False]
+    assert holder.stats()["refreshes"] == 1
+
+
+def test_token_inside_the_margin_is_served_while_one_refresh_runs():
+    clock = Clock()
+    refresh = Refresh()
+    holder = TokenHolder(refresh, refresh_margin=300, clock=clock)
+    assert holder.get() == "token-1"
+
+    # Not yet inside the margin: memory only
+    clock.now += 3000
+    assert holder.get() == "token-1"
+    assert len(refresh.calls) == 1
+
+    # Inside the margin: the old token comes back at once, and one
+    # background refresh replaces it
+    clock.now += 400
+    refresh.release.clear()
+    refresh.done.clear()
+    assert [holder.get() for _ in range(10)] == ["token-1"] * 10
+    refresh.release.set()
+    assert refresh.done.wait(5)
+    for _ in range(100):
+        if holder.stats()["background_refreshes"]:
+            break
+        time.sleep(0.01)
+
+    assert refresh.calls == [False, True]
+    assert holder.get() == "token-2"
+    assert holder.stats()["background_refreshes"] == 1
+
+
+def test_failed_refresh_returns_none_and_is_retried():
+    clock = Clock()
+    refresh = Refresh(fail=True)
+    holder = TokenHolder(refresh, clock=clock)
+
+    assert holder.get() is None
+    assert holder.get() is None
+    assert len(refresh.calls) == 2
+    assert holder.stats()["refresh_failures"] == 2
+
+    # Once MSAL recovers the next call gets a token
+    refresh.fail = False
+    assert holder.get() == "token-3"
+
+
+def test_failed_background_refresh_keeps_the_valid_token():
+    clock = Clock()
+    refresh = Refresh()
+    holder = TokenHolder(refresh, refresh_margin=300, clock=clock)
+    holder.get()
+
+    clock.now += 3500
+    refresh.fail = True
+    refresh.done.clear()
+    assert holder.get() == "token-1"
+    assert refresh.done.wait(5)
+    for _ in range(100):
+        if holder.stats()["refresh_failures"]:
+            break
+        time.sleep(0.01)
+
+    assert holder.stats()["refresh_failures"] == 1
+    assert holder.get() == "token-1"
+
+    # Expired for real: callers no longer get it
+    clock.now += 200
+    assert holder.get() is None
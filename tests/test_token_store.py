@@ -0,0 +1,95 @@
+import base64
+import json
+import time
+
+from m365_assistant.core.token_store import FileTokenStore, PersistentTokenCache
+
+TOKEN_ENDPOINT = "https://login.microsoftonline.com/common/oauth2/v2.0/token"
+
+
+class CountingStore(FileTokenStore):
+    def __init__(self, path):
+        super().__init__(path)
+        self.saves = 0
+        self.locked_saves = 0
+
+    def save(self, data):
+        self.saves += 1
+        self.locked_saves += self._depth > 0
+        super().save(data)
+
+
+def _id_token(username: str) -> str:
+    claims = {
+        "iss": "https://login.microsoftonline.com/tenant/v2.0",
+        "sub": username, "oid": f"oid-{username}", "tid": "tenant",
+        "preferred_username": username, "aud": "client",
+        "exp": int(time.time()) + 3600,
+    }
+    body = base64.urlsafe_b64encode(json.dumps(claims).encode()).decode().rstrip("=")
+    return f"e30.{body}.sig"
+
+
+def _event(username: str, access_token: str, refresh_token: str):
+    return {
+        "client_id": "client",
+        "scope": ["https://graph.microsoft.com/.default"],
+        "token_endpoint": TOKEN_ENDPOINT,
+        "grant_type": "device_code",
+        "params": {},
+        "data": {},
+        "response": {
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "id_token": _id_token(username),
+            "client_info": base64.urlsafe_b64encode(json.dumps(
+                {"uid": f"oid-{username}", "utid": "tenant"}
+            ).encode()).decode().rstrip("="),
+            "token_type": "Bearer",
+            "expires_in": 3600,
+            "scope": "https://graph.microsoft.com/.default",
+        },
+    }
+
+
+def test_add_saves_once_under_the_lock(tmp_path):
+    store = CountingStore(tmp_path / "cache.json")
+    cache = PersistentTokenCache(store)
+
+    cache.add(_event("alice@contoso.com", "at-1", "rt-1"))
+    assert store.saves == 1
+
+    # A refresh replaces the access and refresh tokens through modify()
+    cache.add(_event("alice@contoso.com", "at-2", "rt-2"))
+    assert store.saves == 2
+    assert store.locked_saves == store.saves
+
+
+def test_saved_cache_holds_the_whole_add(tmp_path):
+    cache = PersistentTokenCache(FileTokenStore(tmp_path / "cache.json"))
+    cache.add(_event("alice@contoso.com", "at-1", "rt-1"))
+    cache.add(_event("alice@contoso.com", "at-2", "rt-2"))
+
+    reloaded = PersistentTokenCache(FileTokenStore(tmp_path / "cache.json"))
+    tokens = {
+        kind: [entry["secret"] for entry in reloaded.search(kind)]
+        for kind in (reloaded.CredentialType.ACCESS_TOKEN, reloaded.CredentialType.REFRESH_TOKEN)
+    }
+
+    assert tokens[reloaded.CredentialType.ACCESS_TOKEN] == ["at-2"]
+    assert tokens[reloaded.CredentialType.REFRESH_TOKEN] == ["rt-2"]
+    assert [a["username"] for a in reloaded.search(reloaded.CredentialType.ACCOUNT)] == \
+        ["alice@contoso.com"]
+
+
+def test_modify_outside_add_saves(tmp_path):
+    store = CountingStore(tmp_path / "cache.json")
+    cache = PersistentTokenCache(store)
+    cache.add(_event("alice@contoso.com", "at-1", "rt-1"))
+
+    token = next(iter(cache.search(cache.CredentialType.REFRESH_TOKEN)))
+    cache.remove_rt(token)
+
+    assert store.saves == 2
+    reloaded = PersistentTokenCache(FileTokenStore(tmp_path / "cache.json"))
+    assert list(reloaded.search(cache.CredentialType.REFRESH_TOKEN)) == []
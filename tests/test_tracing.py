@@ -0,0 +1,47 @@
+import asyncio
+
+import httpx
+
+from benchmarks.bench_concurrency import StaticAuth
+from m365_assistant.core import tracing
+from m365_assistant.core.config import Settings
+from m365_assistant.core.graph_client import GraphClient
+
+
+def _get(path: str):
+    settings = Settings(client_id="test", authority="https://login.microsoftonline.com/common",
+                        graph_base_url="https://graph.test/v1.0", response_cache_bytes=0)
+
+    async def run():
+        http = httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, json={})
+        ))
+        client = GraphClient(StaticAuth(), settings, http=http)
+        try:
+            await client.get(path)
+        finally:
+            await http.aclose()
+
+    asyncio.run(run())
+
+
+def test_request_spans_cost_nothing_when_tracing_is_off(monkeypatch):
+    tracing.configure("off")
+
+    def path_template(path):
+        raise AssertionError("span name built with tracing off")
+
+    monkeypatch.setattr(tracing, "path_template", path_template)
+    _get("/me/messages/AAMkADk0")
+
+
+def test_request_spans_are_named_by_endpoint(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracing.configure("jsonl", path)
+    try:
+        _get("/me/messages/AAMkADk0/attachments")
+    finally:
+        tracing.configure("off")
+
+    names = [record["name"] for record in tracing.load(path, kind="graph")]
+    assert names == ["GET /me/messages/{id}/attachments"]
@@ -0,0 +1,48 @@
+from datetime import datetime, timezone
+
+from m365_assistant.services.triage import score_email, triage
+
+NOW = datetime(2026, 10, 18, 9, 0, tzinfo=timezone.utc)
+
+
+def _email(preview="", **fields):
+    return dict({
+        "id": "msg-1",
+        "subject": "Status",
+        "bodyPreview": preview,
+        "isRead": True,
+        "receivedDateTime": "2026-10-01T09:00:00Z",
+    }, **fields)
+
+
+def test_flag_due_date_uses_its_time_zone():
+    email = _email(flag={
+        "flagStatus": "flagged",
+        "dueDateTime": {"dateTime": "2026-10-18T23:00:00.0000000",
+                        "timeZone": "America/Los_Angeles"},
+    })
+
+    result = triage([email], [], now=NOW)
+
+    # 23:00 in Los Angeles is 06:00 UTC the next day
+    assert result["deadlines"][0]["due"] == "2026-10-19T06:00Z"
+
+
+def test_past_dates_in_the_text_are_not_deadlines():
+    email = _email("As agreed on 2026-10-01, the draft is attached.")
+
+    score, reasons = score_email(email, NOW)
+
+    assert "due within 2 days" not in reasons
+    assert triage([email], [], now=NOW)["deadlines"] == []
+
+
+def test_only_dates_within_two_days_score_as_due_soon():
+    soon = _email("Replying to 2026-09-30: send it by 2026-10-19 please")
+    later = _email("Send it by 2026-11-30")
+
+    assert "due within 2 days" in score_email(soon, NOW)[1]
+    assert "due within 2 days" not in score_email(later, NOW)[1]
+
+    deadlines = triage([later], [], now=NOW)["deadlines"]
+    assert deadlines[0]["due"] == "2026-11-30T23:59Z"
@@ -0,0 +1,42 @@
+import pytest
+
+from m365_assistant.core.config import Settings
+from m365_assistant.core.graph_client import new_response_cache, new_scheduler
+from m365_assistant.core.scheduler import MAILBOX_RATE
+from m365_assistant.mcp.server import serve
+
+
+def _settings(**overrides):
+    return Settings(
+        client_id="test",
+        authority="https://login.microsoftonline.com/common",
+        **overrides,
+    )
+
+
+def test_workers_split_the_graph_limits():
+    scheduler = new_scheduler(_settings(workers=4))
+
+    # Four workers together: 16 in flight, 4 per mailbox, Graph's rate
+    assert scheduler._global._value == 4
+    assert scheduler.mailbox_concurrency == 1
+    assert scheduler.mailbox_rate == pytest.approx(MAILBOX_RATE / 4)
+
+    single = new_scheduler(_settings())
+    assert single.mailbox_concurrency == 4
+    assert single.mailbox_rate == pytest.approx(MAILBOX_RATE)
+
+
+def test_workers_revalidate_every_cached_response():
+    assert not new_response_cache(_settings()).always_revalidate
+
+    cache = new_response_cache(_settings(workers=2))
+    cache.put("key", "me", "/me/messages/1", b"{}", '"etag"', ttl=60)
+    assert not cache.is_fresh(cache.lookup("key"))
+
+
+def test_serve_refuses_more_workers_than_mailbox_slots(monkeypatch):
+    monkeypatch.delenv("M365_GRAPH_MAILBOX_CONCURRENCY", raising=False)
+
+    with pytest.raises(ValueError, match="At most 4 workers"):
+        serve(workers=5)